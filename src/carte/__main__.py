@@ -1,71 +1,8 @@
-import asyncio
-import shelve
-import urllib.parse
-from pathlib import Path
-from weakref import WeakSet, WeakValueDictionary
-
-import aiohttp
-import aiohttp_jinja2
-import jinja2
 from aiohttp import web
 from typenv import Env
 
-from carte import app_keys
-from carte.games import BaseGame
-from carte.routes import routes
-
-
-async def cookie_ctx_processor(request: web.Request) -> dict[str, str]:
-    defaults = {
-        "card_type": "piacentine",
-        "theme": "theme-system",
-        "username": "",
-    }
-    return {
-        key: urllib.parse.unquote(request.cookies.get(key, val))
-        for key, val in defaults.items()
-    }
-
-
-async def cleanup_saved_games(app: web.Application) -> None:
-    async def _cleanup_saved_games() -> None:
-        while True:
-            with shelve.open(app[app_keys.games_shelf_path]) as shelf:
-                for key in shelf:
-                    try:
-                        saved_game = shelf[key]
-                    except Exception:
-                        del shelf[key]
-                    else:
-                        if not saved_game.is_valid:
-                            del shelf[key]
-
-            await asyncio.sleep(12 * 60 * 60)
-
-    app[app_keys.cleanup_task] = asyncio.create_task(_cleanup_saved_games())
-
-
-async def add_headers(
-    request: web.Request,  # noqa: ARG001
-    response: web.StreamResponse,
-) -> None:
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'none'; "
-        "connect-src 'self'; "
-        "manifest-src 'self'; "
-        "img-src 'self'; "
-        "script-src 'self'; "
-        "style-src 'self'; "
-        "base-uri 'none'; "
-        "form-action 'none'; "
-    )
-
-
-async def close_websockets(app: web.Application) -> None:
-    async with asyncio.TaskGroup() as tg:
-        websockets = app[app_keys.websockets]
-        for ws in set(websockets):
-            tg.create_task(ws.close(code=aiohttp.WSCloseCode.GOING_AWAY))
+from carte import workers
+from carte.app import create_app, create_matchmaker
 
 
 def main() -> None:
@@ -73,34 +10,10 @@ def main() -> None:
     env.read_env()
 
     port = env.int("PORT")
-    data_path = Path(__file__).parent.parent.parent
-    if data_path_ := env.str("DATA_PATH", default=""):
-        data_path = Path(data_path_)
-
-    app = web.Application()
-
-    jinja_env = aiohttp_jinja2.setup(
-        app,
-        context_processors=[cookie_ctx_processor],
-        loader=jinja2.PackageLoader("carte"),
-    )
-    jinja_env.globals["games"] = {k: v.game_name for k, v in BaseGame.GAMES.items()}
-    app.add_routes(routes)
-
-    app[aiohttp_jinja2.static_root_key] = "/static"
-    app.router.add_static("/static", Path(__file__).parent / "static", name="static")
-
-    app.on_startup.append(cleanup_saved_games)
-
-    app.on_response_prepare.append(add_headers)
-
-    app[app_keys.websockets] = WeakSet()
-    app.on_shutdown.append(close_websockets)
-
-    app[app_keys.games] = WeakValueDictionary()
-    app[app_keys.games_shelf_path] = data_path / "games"
-
-    web.run_app(app, port=port)
+    if (number_of_workers := env.int("WORKERS", default=1)) > 1:
+        workers.run(port, number_of_workers, create_app, create_matchmaker(env))
+    else:
+        web.run_app(create_app(env), port=port)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import urllib.parse
+from datetime import UTC, datetime
+from pathlib import Path
+from weakref import WeakSet, WeakValueDictionary
+
+import aiohttp
+import aiohttp_jinja2
+import jinja2
+from aiohttp import web
+from typenv import Env
+
+from carte import app_keys
+from carte.bots import BotPool
+from carte.games import BaseGame
+from carte.idle_games import IdleGames
+from carte.matchmaking import Matchmaker
+from carte.monitor import LoopLagMonitor
+from carte.routes import routes
+from carte.send_queue import SlowConsumerPolicy
+from carte.store import SqliteGameStore
+from carte.types import SavedGame
+from carte.workers import Worker
+
+
+async def cookie_ctx_processor(request: web.Request) -> dict[str, str]:
+    defaults = {
+        "card_type": "piacentine",
+        "theme": "theme-system",
+        "username": "",
+    }
+    return {
+        key: urllib.parse.unquote(request.cookies.get(key, val))
+        for key, val in defaults.items()
+    }
+
+
+async def cleanup_saved_games(app: web.Application) -> None:
+    if (worker := app.get(app_keys.worker)) is not None and worker.index != 0:
+        # the first worker expires the games of all of them
+        return
+
+    async def _cleanup_saved_games() -> None:
+        store = app[app_keys.games_store]
+        batch_size = 500
+        while True:
+            before = datetime.now(UTC) - SavedGame.lifetime
+            # expire in small batches, so that the writes of the active games can
+            # interleave with them
+            expired = batch_size
+            while expired == batch_size:
+                expired = await store.expire(before, limit=batch_size)
+                await asyncio.sleep(0.1)
+
+            await asyncio.sleep(60 * 60)
+
+    app[app_keys.cleanup_task] = asyncio.create_task(_cleanup_saved_games())
+
+
+async def start_loop_lag_monitor(app: web.Application) -> None:
+    app[app_keys.loop_lag_monitor].start()
+
+
+async def stop_loop_lag_monitor(app: web.Application) -> None:
+    await app[app_keys.loop_lag_monitor].stop()
+
+
+async def start_matchmaker(app: web.Application) -> None:
+    app[app_keys.matchmaker].start()
+
+
+async def stop_matchmaker(app: web.Application) -> None:
+    await app[app_keys.matchmaker].stop()
+
+
+async def start_idle_games(app: web.Application) -> None:
+    app[app_keys.idle_games].start()
+
+
+async def close_idle_games(app: web.Application) -> None:
+    await app[app_keys.idle_games].close()
+
+
+async def close_games_store(app: web.Application) -> None:
+    await app[app_keys.games_store].close()
+
+
+async def close_bot_pool(app: web.Application) -> None:
+    await app[app_keys.bot_pool].close()
+
+
+async def add_headers(
+    request: web.Request,  # noqa: ARG001
+    response: web.StreamResponse,
+) -> None:
+    response.headers["Content-Security-Policy"] = (
+        "default-src 'none'; "
+        "connect-src 'self'; "
+        "manifest-src 'self'; "
+        "img-src 'self'; "
+        "script-src 'self'; "
+        "style-src 'self'; "
+        "base-uri 'none'; "
+        "form-action 'none'; "
+    )
+
+
+async def close_connection(
+    request: web.Request,  # noqa: ARG001
+    response: web.StreamResponse,
+) -> None:
+    # the front process routes a connection by its first request, a websocket sent
+    # on a connection kept alive could reach a worker that doesn't own its game
+    if not isinstance(response, web.WebSocketResponse):
+        response.force_close()
+
+
+async def close_websockets(app: web.Application) -> None:
+    async with asyncio.TaskGroup() as tg:
+        websockets = app[app_keys.websockets]
+        for ws in set(websockets):
+            tg.create_task(ws.close(code=aiohttp.WSCloseCode.GOING_AWAY))
+
+
+def create_matchmaker(env: Env) -> Matchmaker:
+    return Matchmaker(
+        {k: v.number_of_players for k, v in BaseGame.GAMES.items()},
+        timeout=env.float("MATCHMAKING_TIMEOUT", default=30),
+    )
+
+
+def create_app(env: Env, *, worker: Worker | None = None) -> web.Application:
+    data_path = Path(__file__).parent.parent.parent
+    if data_path_ := env.str("DATA_PATH", default=""):
+        data_path = Path(data_path_)
+
+    app = web.Application()
+
+    jinja_env = aiohttp_jinja2.setup(
+        app,
+        context_processors=[cookie_ctx_processor],
+        loader=jinja2.PackageLoader("carte"),
+    )
+    jinja_env.globals["games"] = {k: v.game_name for k, v in BaseGame.GAMES.items()}
+    app.add_routes(routes)
+
+    app[aiohttp_jinja2.static_root_key] = "/static"
+    app.router.add_static("/static", Path(__file__).parent / "static", name="static")
+
+    app.on_startup.append(cleanup_saved_games)
+
+    app[app_keys.loop_lag_monitor] = LoopLagMonitor()
+    app.on_startup.append(start_loop_lag_monitor)
+    app.on_cleanup.append(stop_loop_lag_monitor)
+
+    app.on_response_prepare.append(add_headers)
+    if worker is not None:
+        app[app_keys.worker] = worker
+        app.on_response_prepare.append(close_connection)
+    else:
+        # with several workers, the front process finds the tables
+        app[app_keys.matchmaker] = create_matchmaker(env)
+        app.on_startup.append(start_matchmaker)
+        app.on_cleanup.append(stop_matchmaker)
+
+    app[app_keys.websockets] = WeakSet()
+    app[app_keys.send_queue_size] = env.int("SEND_QUEUE_SIZE", default=1000)
+    app[app_keys.slow_consumer_policy] = SlowConsumerPolicy(
+        env.str("SLOW_CONSUMER_POLICY", default=SlowConsumerPolicy.RESYNC)
+    )
+    app.on_shutdown.append(close_websockets)
+
+    app[app_keys.games] = WeakValueDictionary()
+    app[app_keys.games_store] = SqliteGameStore(data_path / "games.sqlite3")
+    app[app_keys.idle_games] = IdleGames(
+        max_size=env.int("IDLE_GAMES_MEMORY", default=64 * 1024 * 1024),
+        ttl=env.float("IDLE_GAMES_TTL", default=5 * 60),
+    )
+    app.on_startup.append(start_idle_games)
+    # the idle games are saved before closing the store
+    app.on_cleanup.append(close_idle_games)
+    app.on_cleanup.append(close_games_store)
+
+    # searches beyond the number of workers would only wait in the queue of the pool
+    bot_workers = env.int("BOT_WORKERS", default=os.process_cpu_count() or 1)
+    app[app_keys.bot_pool] = BotPool(
+        max_workers=bot_workers,
+        max_searches=env.int("BOT_MAX_SEARCHES", default=bot_workers),
+    )
+    app.on_cleanup.append(close_bot_pool)
+    BaseGame.analyze_endgames = env.bool("ENDGAME_ANALYSIS", default=False)
+
+    return app
@@ -1,13 +1,26 @@
 import asyncio
-from pathlib import Path
 from weakref import WeakSet, WeakValueDictionary
 
 from aiohttp import web
 
+from carte.bots import BotPool
 from carte.games import BaseGame
 from carte.games.base import Player
+from carte.idle_games import IdleGames
+from carte.matchmaking import Matchmaker
+from carte.monitor import LoopLagMonitor
+from carte.send_queue import SlowConsumerPolicy
+from carte.store import GameStore
+from carte.workers import Worker
 
 cleanup_task = web.AppKey("cleanup_task", asyncio.Task[None])
 websockets = web.AppKey("websockets", WeakSet[web.WebSocketResponse])
 games = web.AppKey("games", WeakValueDictionary[tuple[str, str], BaseGame[Player]])
-games_shelf_path = web.AppKey("games_shelf_path", Path)
+games_store = web.AppKey("games_store", GameStore)
+idle_games = web.AppKey("idle_games", IdleGames)
+bot_pool = web.AppKey("bot_pool", BotPool)
+send_queue_size = web.AppKey("send_queue_size", int)
+slow_consumer_policy = web.AppKey("slow_consumer_policy", SlowConsumerPolicy)
+loop_lag_monitor = web.AppKey("loop_lag_monitor", LoopLagMonitor)
+matchmaker = web.AppKey("matchmaker", Matchmaker)
+worker = web.AppKey("worker", Worker)
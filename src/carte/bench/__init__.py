@@ -0,0 +1,13 @@
+from carte.bench.cases import CASES
+from carte.bench.runner import Case, Comparison, Result, compare, dump, load, run
+
+__all__ = [
+    "CASES",
+    "Case",
+    "Comparison",
+    "Result",
+    "compare",
+    "dump",
+    "load",
+    "run",
+]
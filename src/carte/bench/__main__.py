@@ -0,0 +1,54 @@
+import argparse
+import fnmatch
+import sys
+from pathlib import Path
+
+from carte.bench import CASES, Result, compare, dump, load, run
+from carte.bench.runner import format_comparisons, format_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m carte.bench", description="Time the hot paths of the games."
+    )
+    parser.add_argument(
+        "patterns", nargs="*", default=["*"], help="only run the matching benchmarks"
+    )
+    parser.add_argument("-o", "--output", type=Path, help="save the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare with saved results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slowdown from the baseline reported as a regression (default: 0.2)",
+    )
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1)
+    args = parser.parse_args()
+
+    cases = {
+        name: case
+        for name, case in CASES.items()
+        if any(fnmatch.fnmatch(name, pattern) for pattern in args.patterns)
+    }
+
+    def progress(name: str, result: Result) -> None:
+        print(f"{name:<40} {format_time(result.median):>10}", file=sys.stderr)
+
+    results = run(
+        cases, samples=args.samples, min_time=args.min_time, progress=progress
+    )
+    if args.output:
+        dump(results, args.output)
+
+    if args.baseline:
+        comparisons = compare(results, load(args.baseline), args.threshold)
+        print(f"{'benchmark':<40} {'time':>10} {'baseline':>10}")
+        for line in format_comparisons(comparisons):
+            print(line)
+        if any(x.regression for x in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import functools
+import random
+import time
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+
+from carte import codec
+from carte.bench.runner import Case
+from carte.games import BaseGame, Briscola, Scopa
+from carte.games.scopa import capture_values, captures, takeable_cards
+from carte.games.search import card_mask
+from carte.types import Card, CardNumber, GameStatus, SavedGame, Suit
+
+SEED = 42
+
+
+class NullWebsocket(web.WebSocketResponse):
+    """A websocket that drops the frames sent to it, without any I/O."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._closed = False
+        self.frames = 0
+
+    async def send_frame(
+        self,
+        message: bytes,  # noqa: ARG002
+        opcode: aiohttp.WSMsgType,  # noqa: ARG002
+        compress: int | None = None,  # noqa: ARG002
+    ) -> None:
+        self.frames += 1
+
+
+def new_game[T: BaseGame[Any]](
+    game_type: type[T], seed: int = SEED
+) -> tuple[T, list[NullWebsocket]]:
+    """Return a started game, with a connected websocket for each player."""
+    game = game_type("", seed)
+    websockets = []
+    for i in range(game.number_of_players):
+        player = game.add_player(f"player{i}")
+        assert player is not None
+        player.name = f"Player {i}"
+        ws = NullWebsocket()
+        websockets.append(ws)
+        game.websockets.add(ws)
+        player.websockets.add(ws)
+    game.start()
+    return game, websockets
+
+
+def next_move(game: BaseGame[Any], rng: random.Random) -> list[tuple[str, ...]]:
+    """Return the commands of a random move of the current player."""
+    state = game.search_state()
+    return game._move_commands(state.random_move(rng))
+
+
+def play_moves(game: BaseGame[Any], moves: int, rng: random.Random) -> None:
+    for _ in range(moves):
+        for raw_cmd, *raw_args in next_move(game, rng):
+            game.apply(game._current_player_id, raw_cmd, *raw_args)
+
+
+async def handle_cmd(game_type: type[BaseGame[Any]], loops: int) -> float:
+    """Time the commands of whole games, sent through `handle_cmd`."""
+    elapsed = 0.0
+    done = 0
+    rng = random.Random(SEED)
+    while done < loops:
+        game, websockets = new_game(game_type)
+        while done < loops and game.game_status is GameStatus.STARTED:
+            for raw_cmd, *raw_args in next_move(game, rng):
+                player = game.current_player
+                ws = websockets[game._current_player_id]
+                start = time.perf_counter()
+                await game.handle_cmd(ws, player, raw_cmd, *raw_args)
+                elapsed += time.perf_counter() - start
+                done += 1
+    return elapsed
+
+
+async def bind_cmd(loops: int) -> float:
+    """Time the parsing and the dispatch of a command, without running it."""
+    game, websockets = new_game(Briscola)
+    player = game.current_player
+    raw_args = (str(player.hand[0]),)
+    bind = game._bind_cmd
+    start = time.perf_counter()
+    for _ in range(loops):
+        bind(websockets[0], player, "play", raw_args)
+    return time.perf_counter() - start
+
+
+async def fan_out(sockets: int, loops: int) -> float:
+    """Time a message sent to everyone, with `sockets` websockets connected."""
+    game, websockets = new_game(Briscola)
+    # the websockets of the game are only weakly referenced
+    websockets += [NullWebsocket() for _ in range(sockets - len(websockets))]
+    game.websockets.update(websockets)
+    card = game.current_player.hand[0]
+    start = time.perf_counter()
+    for _ in range(loops):
+        game._send("play", 0, card)
+        await game._flush_outbox()
+    return time.perf_counter() - start
+
+
+async def send_current_state(game_type: type[BaseGame[Any]], loops: int) -> float:
+    """Time the state sent to a reconnecting player, halfway through a game."""
+    game, websockets = new_game(game_type)
+    play_moves(game, 10, random.Random(SEED))
+    player = game.current_player
+    ws = websockets[game._current_player_id]
+    start = time.perf_counter()
+    for _ in range(loops):
+        game._send_current_state(ws, player)
+        await game._flush_outbox()
+    return time.perf_counter() - start
+
+
+def adversarial_table() -> list[Card]:
+    """Return a table of low cards, with many ways to sum to the value of a king."""
+    return [
+        Card(suit, number)
+        for suit in (Suit.BASTONI, Suit.COPPE, Suit.DENARI)
+        for number in (
+            CardNumber.ASSO,
+            CardNumber.DUE,
+            CardNumber.TRE,
+            CardNumber.QUATTRO,
+            CardNumber.CINQUE,
+        )
+    ]
+
+
+async def takeable(selected: int, cached: bool, loops: int) -> float:
+    """Time `takeable_cards` for a king on `adversarial_table`."""
+    table = adversarial_table()
+    card = Card(Suit.SPADE, CardNumber.RE)
+    selected_cards = table[:selected]
+    start = time.perf_counter()
+    for _ in range(loops):
+        if not cached:
+            capture_values.cache_clear()
+        takeable_cards(card, table, selected_cards)
+    return time.perf_counter() - start
+
+
+async def search_captures(loops: int) -> float:
+    """Time the enumeration of the captures of a king on `adversarial_table`, as
+    done by the bots."""
+    table = card_mask(card.id for card in adversarial_table())
+    start = time.perf_counter()
+    for _ in range(loops):
+        captures.cache_clear()
+        captures(10, table)
+    return time.perf_counter() - start
+
+
+async def save_load(game_type: type[BaseGame[Any]], loops: int) -> float:
+    """Time encoding and decoding a game, halfway through."""
+    game = new_game(game_type)[0]
+    play_moves(game, 10, random.Random(SEED))
+    saved_game = SavedGame(game)
+    start = time.perf_counter()
+    for _ in range(loops):
+        codec.loads(codec.dumps(saved_game))
+    return time.perf_counter() - start
+
+
+async def full_game(game_type: type[BaseGame[Any]], loops: int) -> float:
+    """Time whole seeded games played with `apply`, choosing the moves included."""
+    start = time.perf_counter()
+    for seed in range(loops):
+        game = game_type("", seed)
+        for i in range(game.number_of_players):
+            game.add_player(f"player{i}")
+        game.start()
+        rng = random.Random(seed)
+        while game.game_status is GameStatus.STARTED:
+            play_moves(game, 1, rng)
+    return time.perf_counter() - start
+
+
+CASES: dict[str, Case] = {
+    "handle_cmd/bind": bind_cmd,
+    "handle_cmd/briscola": functools.partial(handle_cmd, Briscola),
+    "handle_cmd/scopa": functools.partial(handle_cmd, Scopa),
+    **{f"send/fan_out_{n}": functools.partial(fan_out, n) for n in (2, 10, 100)},
+    "scopa/takeable_cold": functools.partial(takeable, 0, False),
+    "scopa/takeable_cached": functools.partial(takeable, 0, True),
+    "scopa/takeable_selected": functools.partial(takeable, 2, False),
+    "scopa/search_captures": search_captures,
+    "send_current_state/briscola": functools.partial(send_current_state, Briscola),
+    "send_current_state/scopa": functools.partial(send_current_state, Scopa),
+    "codec/briscola": functools.partial(save_load, Briscola),
+    "codec/scopa": functools.partial(save_load, Scopa),
+    "game/briscola": functools.partial(full_game, Briscola),
+    "game/scopa": functools.partial(full_game, Scopa),
+}
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import platform
+import statistics
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+# time `loops` operations, without their setup, and return the elapsed seconds
+type Case = Callable[[int], Awaitable[float]]
+
+# bumped when the meaning of the stored results changes
+FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Result:
+    # seconds per operation
+    median: float
+    min: float
+    stdev: float
+    loops: int
+    samples: int
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    result: Result
+    baseline: Result | None
+    threshold: float
+
+    @property
+    def ratio(self) -> float | None:
+        if self.baseline is None:
+            return None
+        return self.result.median / self.baseline.median
+
+    @property
+    def regression(self) -> bool:
+        return self.ratio is not None and self.ratio > 1 + self.threshold
+
+
+async def measure(case: Case, *, samples: int, min_time: float) -> Result:
+    """Time `case`, with enough loops per sample for each to last `min_time`."""
+    loops = 1
+    while (elapsed := await case(loops)) < min_time and loops < 1 << 30:
+        loops *= max(2, min(10, int(min_time / max(elapsed, 1e-9))))
+
+    times = [elapsed / loops]
+    times += [await case(loops) / loops for _ in range(samples - 1)]
+    return Result(
+        median=statistics.median(times),
+        min=min(times),
+        stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+        loops=loops,
+        samples=len(times),
+    )
+
+
+def run(
+    cases: dict[str, Case],
+    *,
+    samples: int = 5,
+    min_time: float = 0.1,
+    progress: Callable[[str, Result], None] | None = None,
+) -> dict[str, Result]:
+    results = {}
+    with asyncio.Runner() as runner:
+        for name, case in cases.items():
+            result = runner.run(measure(case, samples=samples, min_time=min_time))
+            results[name] = result
+            if progress is not None:
+                progress(name, result)
+    return results
+
+
+def dump(results: dict[str, Result], path: Path) -> None:
+    data = {
+        "version": FORMAT_VERSION,
+        "created": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": {name: asdict(result) for name, result in results.items()},
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def load(path: Path) -> dict[str, Result]:
+    data: dict[str, Any] = json.loads(path.read_text())
+    if data.get("version") != FORMAT_VERSION:
+        err = f"Unsupported benchmark results version in {path}"
+        raise ValueError(err)
+    return {name: Result(**result) for name, result in data["benchmarks"].items()}
+
+
+def compare(
+    results: dict[str, Result], baseline: dict[str, Result], threshold: float
+) -> list[Comparison]:
+    """Compare the median times with a baseline.
+
+    A benchmark regressed when it got slower by more than `threshold` (a fraction of
+    the baseline time). Benchmarks missing from the baseline are never regressions.
+    """
+    return [
+        Comparison(name, result, baseline.get(name), threshold)
+        for name, result in results.items()
+    ]
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def format_comparisons(comparisons: Iterable[Comparison]) -> Iterable[str]:
+    for comparison in comparisons:
+        line = f"{comparison.name:<40} {format_time(comparison.result.median):>10}"
+        if comparison.baseline is not None and comparison.ratio is not None:
+            line += f" {format_time(comparison.baseline.median):>10}"
+            line += f" {comparison.ratio:>6.2f}x"
+            if comparison.regression:
+                line += "  REGRESSION"
+        yield line
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from carte.games.endgame import Solution, is_endgame, solve
+from carte.games.search import Budget, SearchState, search
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BotPoolMetrics:
+    searches: int = 0
+    running: int = 0
+    waiting: int = 0
+    max_waiting: int = 0
+    search_seconds: float = 0.0
+    errors: int = 0
+    # endgames solved exactly, by the bots or for the analysis of the results, and
+    # the use of the transposition tables of the workers
+    endgames: int = 0
+    transposition_lookups: int = 0
+    transposition_hits: int = 0
+    transposition_hit_rate: float = 0.0
+
+    def add_solution(self, solution: Solution) -> None:
+        self.endgames += 1
+        self.transposition_lookups += solution.lookups
+        self.transposition_hits += solution.hits
+        if self.transposition_lookups:
+            self.transposition_hit_rate = (
+                self.transposition_hits / self.transposition_lookups
+            )
+
+
+def choose_move(
+    state: SearchState, budget: Budget, seed: int
+) -> tuple[int, Solution | None]:
+    """Pick a move for a bot, solving the endgames if its budget allows it."""
+    if budget.solve_endgames and is_endgame(state):
+        solution = solve(state)
+        return solution.move, solution
+    return search(state, budget, seed), None
+
+
+class BotPool:
+    """Run the searches of the bots in a pool of processes.
+
+    At most `max_searches` searches run at the same time, the others wait for their
+    turn on the event loop instead of piling up in the queue of the pool. The tasks
+    letting the bots of each game play are kept here too.
+    """
+
+    def __init__(self, *, max_workers: int | None = None, max_searches: int) -> None:
+        self.max_searches = max_searches
+        self.metrics = BotPoolMetrics()
+        self._executor = ProcessPoolExecutor(max_workers)
+        self._searches = asyncio.Semaphore(max_searches)
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def search(self, state: SearchState, budget: Budget) -> int:
+        move, solution = await self._run(
+            choose_move, state, budget, secrets.randbits(64)
+        )
+        if solution is not None:
+            self.metrics.add_solution(solution)
+        return move
+
+    async def solve(self, state: SearchState) -> Solution:
+        """Solve an endgame, see `carte.games.endgame.solve`."""
+        solution = await self._run(solve, state)
+        self.metrics.add_solution(solution)
+        return solution
+
+    async def _run[*Ts, R](self, func: Callable[[*Ts], R], *args: *Ts) -> R:
+        loop = asyncio.get_running_loop()
+        self.metrics.waiting += 1
+        self.metrics.max_waiting = max(self.metrics.max_waiting, self.metrics.waiting)
+        try:
+            await self._searches.acquire()
+        finally:
+            self.metrics.waiting -= 1
+
+        self.metrics.running += 1
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._searches.release()
+            self.metrics.running -= 1
+            self.metrics.searches += 1
+            self.metrics.search_seconds += time.perf_counter() - start
+
+    def spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task[None]:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task[None]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            self.metrics.errors += 1
+            logger.error("Bot error", exc_info=e)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
@@ -0,0 +1,129 @@
+"""Compact binary serialization of the saved games.
+
+A saved game starts with `MAGIC` and a version byte, followed by the timestamp of the
+save, the game type, the game id and the state of the game, as written by
+`BaseGame.encode_state`. Cards are stored as their `Card.id` (0-39), one byte each,
+and lists of cards as a length byte followed by the cards. Data without the magic
+prefix is a pickled `SavedGame`, as written by the older versions.
+"""
+
+import pickle
+import struct
+from datetime import UTC, datetime
+
+from carte.games import BaseGame
+from carte.types import CARDS, Card, SavedGame
+
+MAGIC = b"\xca\x27"
+# version 2 added the seed of the game, version 3 the bots
+VERSION = 3
+
+_NO_CARD = 0xFF
+
+
+class Writer:
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buffer)
+
+    def u8(self, value: int) -> None:
+        self._buffer.append(value)
+
+    def flag(self, value: bool) -> None:
+        self._buffer.append(value)
+
+    def u64(self, value: int) -> None:
+        self._buffer += struct.pack("<Q", value)
+
+    def f64(self, value: float) -> None:
+        self._buffer += struct.pack("<d", value)
+
+    def text(self, value: str) -> None:
+        data = value.encode()
+        self._buffer += struct.pack("<H", len(data))
+        self._buffer += data
+
+    def card(self, card: Card) -> None:
+        self._buffer.append(card.id)
+
+    def optional_card(self, card: Card | None) -> None:
+        self._buffer.append(_NO_CARD if card is None else card.id)
+
+    def cards(self, cards: list[Card]) -> None:
+        self._buffer.append(len(cards))
+        self._buffer += bytes(card.id for card in cards)
+
+
+class Reader:
+    def __init__(self, data: bytes, version: int = VERSION) -> None:
+        self.version = version
+        self._data = memoryview(data)
+        self._offset = 0
+
+    def _read(self, size: int) -> memoryview:
+        if self._offset + size > len(self._data):
+            err = "Truncated game data"
+            raise ValueError(err)
+        data = self._data[self._offset : self._offset + size]
+        self._offset += size
+        return data
+
+    def u8(self) -> int:
+        return self._read(1)[0]
+
+    def flag(self) -> bool:
+        return bool(self.u8())
+
+    def u64(self) -> int:
+        value: int = struct.unpack("<Q", self._read(8))[0]
+        return value
+
+    def f64(self) -> float:
+        value: float = struct.unpack("<d", self._read(8))[0]
+        return value
+
+    def text(self) -> str:
+        (size,) = struct.unpack("<H", self._read(2))
+        return bytes(self._read(size)).decode()
+
+    def card(self) -> Card:
+        return CARDS[self.u8()]
+
+    def optional_card(self) -> Card | None:
+        card_id = self.u8()
+        return None if card_id == _NO_CARD else CARDS[card_id]
+
+    def cards(self) -> list[Card]:
+        size = self.u8()
+        return [CARDS[card_id] for card_id in self._read(size)]
+
+
+def dumps(saved_game: SavedGame) -> bytes:
+    writer = Writer()
+    writer.u8(VERSION)
+    writer.f64(saved_game.last_saved.timestamp())
+    writer.text(type(saved_game.game).__name__.lower())
+    writer.text(saved_game.game.game_id)
+    saved_game.game.encode_state(writer)
+    return MAGIC + writer.getvalue()
+
+
+def loads(data: bytes) -> SavedGame:
+    if not data.startswith(MAGIC):
+        saved_game: SavedGame = pickle.loads(data)
+        return saved_game
+
+    reader = Reader(data[len(MAGIC) :])
+    reader.version = reader.u8()
+    if reader.version > VERSION:
+        err = f"Unsupported game data version {reader.version}"
+        raise ValueError(err)
+    last_saved = datetime.fromtimestamp(reader.f64(), UTC)
+    game_type = BaseGame.GAMES[reader.text()]
+    game = game_type(reader.text())
+    game.decode_state(reader)
+    saved_game = SavedGame(game)
+    saved_game.last_saved = last_saved
+    return saved_game
@@ -1,17 +1,58 @@
 import asyncio
-import itertools
+import logging
 import random
+import secrets
 import types
-from collections.abc import Callable, Iterable, Iterator
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from enum import Enum
-from typing import Any, ClassVar, get_args, get_origin, get_type_hints, overload
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Self,
+    get_args,
+    get_origin,
+    get_type_hints,
+    overload,
+)
 from weakref import WeakSet
 
 import aiohttp
 from aiohttp import web
 
 from carte.exc import CmdError
-from carte.types import Card, CardNumber, CmdFunc, Command, GameStatus, Sendable, Suit
+from carte.games.endgame import is_endgame
+from carte.games.search import Difficulty, SearchState
+from carte.replay import Viewer
+from carte.send_queue import SEND_QUEUE
+from carte.types import (
+    CARDS,
+    Card,
+    CmdFunc,
+    Command,
+    Event,
+    GameStatus,
+    JournalEntry,
+    Sendable,
+)
+
+if TYPE_CHECKING:
+    from carte.bots import BotPool
+    from carte.codec import Reader, Writer
+    from carte.journal import Journal
+
+logger = logging.getLogger(__name__)
+
+# set on the websockets of the clients that accept several messages in a single frame,
+# one per line
+MULTILINE_FRAMES = web.ResponseKey("multiline_frames", bool)
+# set on the websockets of the clients that follow the resume protocol: each message is
+# prefixed by its sequence number, and after reconnecting the client asks for the
+# messages after the last one it received
+VIEWER_ID = web.ResponseKey("viewer_id", str)
 
 
 def cmd[F: CmdFunc[...]](
@@ -23,6 +64,72 @@ def cmd[F: CmdFunc[...]](
     return decorator
 
 
+class _Message:
+    """The websocket, the player and the raw arguments of an inbound command.
+
+    Each `bind_*` method binds one argument of the command, see
+    `BaseGame._compile_cmd`.
+    """
+
+    __slots__ = ("player", "raw_args", "ws")
+
+    def __init__(
+        self,
+        ws: web.WebSocketResponse | None,
+        player: Player | None,
+        raw_args: tuple[str, ...],
+    ) -> None:
+        self.ws = ws
+        self.player = player
+        self.raw_args = iter(raw_args)
+
+    def bind_ws(self) -> web.WebSocketResponse | None:
+        return self.ws
+
+    def bind_player(self) -> Player:
+        if self.player is None:
+            err = "You're not a player"
+            raise CmdError(err)
+        return self.player
+
+    def bind_optional_player(self) -> Player | None:
+        return self.player
+
+    def bind_card(self) -> Card:
+        try:
+            return Card.parse(next(self.raw_args))
+        except ValueError as e:
+            raise CmdError(str(e)) from e
+
+    def bind_str(self) -> str:
+        return next(self.raw_args)
+
+
+@dataclass(frozen=True)
+class DispatchEntry:
+    """A command resolved when its game class is created.
+
+    `params` is the number of raw arguments the command takes.
+    """
+
+    cmd: Command[Any]
+    binders: tuple[Callable[[_Message], Any], ...]
+    params: int
+    journaled: bool
+
+
+@dataclass(eq=False)
+class _Mail:
+    """A turn of a game, run by its inbox.
+
+    `run` returns the command to journal, if any. `future` is resolved once the
+    messages sent by the turn are flushed and the command is journaled.
+    """
+
+    run: Callable[[], JournalEntry | None]
+    future: asyncio.Future[None]
+
+
 class Player:
     def __init__(self, token: str, name: str = "") -> None:
         self._token = token
@@ -49,6 +156,21 @@ class Player:
         self.__dict__.update(state)
         self.websockets = WeakSet()
 
+    def encode_state(self, writer: Writer) -> None:
+        writer.text(self._token)
+        writer.text(self.name)
+        writer.flag(self.ready)
+        writer.cards(self.hand)
+        writer.cards(self.points)
+
+    @classmethod
+    def decode_state(cls, reader: Reader) -> Self:
+        player = cls(reader.text(), reader.text())
+        player.ready = reader.flag()
+        player.hand = reader.cards()
+        player.points = reader.cards()
+        return player
+
     def reset(self) -> None:
         self.hand.clear()
         self.points.clear()
@@ -56,21 +178,56 @@ class Player:
 
 class BaseGame[T_Player: Player]:
     GAMES: ClassVar[dict[str, type[BaseGame[Any]]]] = {}
-    WAITING_GAMES_IDS: ClassVar[dict[type[BaseGame[Any]], str]] = {}
+    max_viewers: ClassVar[int] = 32
+    # the most turns run before flushing their messages together
+    inbox_batch_size: ClassVar[int] = 64
+    # whether to solve the endgame of each game, to show the best play with the results
+    analyze_endgames: ClassVar[bool] = False
 
     player_class: type[T_Player]
+    commands: ClassVar[dict[str, DispatchEntry]]
     game_name: str
     number_of_players: int
     hand_size: int
 
-    def __init__(self, game_id: str) -> None:
+    def __init__(self, game_id: str, seed: int | None = None) -> None:
         self.websockets: WeakSet[web.WebSocketResponse] = WeakSet()
+        self.journal: Journal | None = None
+        self.bot_pool: BotPool | None = None
         self._game_id = game_id
-        self._recv_lock = asyncio.Lock()
-        self._send_lock = asyncio.Lock()
+        # the turns waiting for the task that runs them, one at a time: it's the only
+        # one changing the game while a turn is running
+        self._inbox: deque[_Mail] = deque()
+        self._inbox_task: asyncio.Task[None] | None = None
+        self._max_inbox_depth = 0
+        # the failed writes to the websockets without a send queue
+        self._send_errors = 0
+        # messages sent while a command runs, with their sequence numbers, flushed when
+        # it ends
+        self._outbox: dict[web.WebSocketResponse, list[tuple[int, str]]] = {}
+        # sequence numbers are only valid within the same epoch, i.e. until the game is
+        # reloaded from the store
+        self._epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._viewers: dict[str, Viewer] = {}
+        # events emitted by the game logic and not yet taken by `apply` or `handle_cmd`
+        self._events: list[Event] = []
         self._players: list[T_Player] = []
+        self._bots: dict[T_Player, Difficulty] = {}
+        # the task letting the bots play, while it's their turn
+        self._bots_task: asyncio.Task[None] | None = None
+        # the game once all the cards are known, and the final points of the best play
+        # from there
+        self._endgame: SearchState | None = None
+        self._best_play: list[int] | None = None
+        self._analysis_task: asyncio.Task[None] | None = None
         self._deck: list[Card]
-        self._starting_player_id = random.randrange(self.number_of_players)
+        # every random choice is derived from the seed, see `_random`
+        self._seed = secrets.randbits(64) if seed is None else seed
+        self._deals = 0
+        self._starting_player_id = self._random("starting_player").randrange(
+            self.number_of_players
+        )
         self._current_player_id: int
         self._game_status = GameStatus.NOT_STARTED
 
@@ -93,26 +250,126 @@ class BaseGame[T_Player: Player]:
         cls.game_name = game_name or cls.__name__
         cls.number_of_players = number_of_players
         cls.hand_size = hand_size
+        cls.commands = {
+            name.removeprefix("cmd_"): cls._compile_cmd(cmd)
+            for name in dir(cls)
+            if name.startswith("cmd_")
+            and isinstance(cmd := getattr(cls, name), Command)
+        }
         cls.GAMES[cls.__name__.lower()] = cls
 
+    @classmethod
+    def _compile_cmd(cls, cmd: Command[Any]) -> DispatchEntry:
+        binders: list[Callable[[_Message], Any]] = []
+        params = 0
+        for name, type_ in get_type_hints(cmd.func).items():
+            if type_ is web.WebSocketResponse:
+                binders.append(_Message.bind_ws)
+            elif type_ in (T_Player, cls.player_class):  # type: ignore[misc]
+                binders.append(_Message.bind_player)
+            elif type_ in (T_Player | None, cls.player_class | None):  # type: ignore[misc]
+                binders.append(_Message.bind_optional_player)
+            elif type_ is Card:
+                binders.append(_Message.bind_card)
+                params += 1
+            elif name != "return":
+                binders.append(_Message.bind_str)
+                params += 1
+
+        # commands bound to a connection are not journaled, the changes they make to
+        # the game are only persisted by snapshots
+        journaled = _Message.bind_ws not in binders
+        return DispatchEntry(cmd, tuple(binders), params, journaled)
+
     def __getstate__(self) -> dict[str, Any]:
         state = self.__dict__.copy()
         del state["websockets"]
-        del state["_recv_lock"]
-        del state["_send_lock"]
+        del state["journal"]
+        del state["bot_pool"]
+        del state["_bots_task"]
+        del state["_analysis_task"]
+        del state["_inbox"]
+        del state["_inbox_task"]
+        del state["_max_inbox_depth"]
+        del state["_send_errors"]
+        del state["_outbox"]
+        del state["_epoch"]
+        del state["_seq"]
+        del state["_viewers"]
+        del state["_events"]
         return state
 
     def __setstate__(self, state: dict[str, Any]) -> None:
+        # games pickled by older versions have no seed
+        self._seed = secrets.randbits(64)
+        self._deals = 0
+        self._bots = {}
+        self._endgame = None
+        self._best_play = None
         self.websockets = WeakSet()
-        self._recv_lock = asyncio.Lock()
-        self._send_lock = asyncio.Lock()
+        self.journal = None
+        self.bot_pool = None
+        self._bots_task = None
+        self._analysis_task = None
+        self._inbox = deque()
+        self._inbox_task = None
+        self._max_inbox_depth = 0
+        self._send_errors = 0
+        self._outbox = {}
+        self._epoch = secrets.token_hex(4)
+        self._seq = 0
+        self._viewers = {}
+        self._events = []
         self.__dict__.update(state)
 
-    def _shuffle_deck(self) -> list[Card]:
-        cards = [
-            Card(suit, number) for suit, number in itertools.product(Suit, CardNumber)
+    def encode_state(self, writer: Writer) -> None:
+        writer.u8(self._game_status.value)
+        writer.u8(self._starting_player_id)
+        writer.u64(self._seed)
+        writer.u64(self._deals)
+        writer.u8(len(self._players))
+        for player in self._players:
+            player.encode_state(writer)
+        writer.u8(len(self._bots))
+        for bot, difficulty in self._bots.items():
+            writer.u8(self._players.index(bot))
+            writer.text(difficulty)
+        if self._game_status is not GameStatus.NOT_STARTED:
+            writer.u8(self._current_player_id)
+            writer.cards(self._deck)
+
+    def decode_state(self, reader: Reader) -> None:
+        self._game_status = GameStatus(reader.u8())
+        self._starting_player_id = reader.u8()
+        if reader.version >= 2:
+            self._seed = reader.u64()
+            self._deals = reader.u64()
+        self._players = [
+            self.player_class.decode_state(reader) for _ in range(reader.u8())
         ]
-        random.shuffle(cards)
+        if reader.version >= 3:
+            for _ in range(reader.u8()):
+                bot = self._players[reader.u8()]
+                self._bots[bot] = Difficulty(reader.text())
+        if self._game_status is not GameStatus.NOT_STARTED:
+            self._current_player_id = reader.u8()
+            self._deck = reader.cards()
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    def _random(self, stream: str) -> random.Random:
+        """Return a random generator for `stream`, derived from the seed of the game.
+
+        Generators are not kept: a game restored from a snapshot, or replayed from its
+        seed and its commands, makes the same random choices as the original one.
+        """
+        return random.Random(f"{self._seed}:{stream}")
+
+    def _shuffle_deck(self) -> list[Card]:
+        cards = list(CARDS)
+        self._random(f"deck:{self._deals}").shuffle(cards)
         return cards
 
     def add_player(self, session_id: str) -> T_Player | None:
@@ -123,137 +380,311 @@ class BaseGame[T_Player: Player]:
             if len(self._players) >= self.number_of_players:
                 return None
             self._players.append(player)
-            if (
-                len(self._players) >= self.number_of_players
-                and self.WAITING_GAMES_IDS.get(type(self)) == self._game_id
-            ):
-                del self.WAITING_GAMES_IDS[type(self)]
         else:
             player = self._players[idx]
 
         return player
 
+    def add_bot(self, difficulty: Difficulty) -> T_Player | None:
+        """Seat a computer opponent, it plays as soon as it's its turn."""
+        bot = self.add_player(f"bot-{secrets.token_hex()}")
+        if bot is not None:
+            bot.name = f"Computer ({difficulty})"
+            self._bots[bot] = difficulty
+        return bot
+
     def remove_player(self, player: T_Player) -> None:
         self._players.remove(player)
 
+    def add_viewer(
+        self, ws: web.WebSocketResponse, viewer_id: str, player: T_Player | None
+    ) -> None:
+        ws[VIEWER_ID] = viewer_id
+        viewer = self._viewers.pop(viewer_id, None)
+        # a viewer can't be taken over by another player
+        if viewer is None or viewer.player != player:
+            # it can't replay the messages sent before, e.g. when a viewer evicted
+            # by too many others reconnects
+            viewer = Viewer(player, since=self._seq)
+        # keep the viewers ordered from the least recently connected one
+        self._viewers[viewer_id] = viewer
+        while len(self._viewers) > self.max_viewers:
+            del self._viewers[next(iter(self._viewers))]
+
     @property
     def current_player(self) -> T_Player:
         return self._players[self._current_player_id]
 
+    @property
+    def game_id(self) -> str:
+        return self._game_id
+
     @property
     def game_status(self) -> GameStatus:
         return self._game_status
 
+    @property
+    def player_names(self) -> list[str]:
+        return [x.name for x in self._players]
+
+    @property
+    def inbox_depth(self) -> int:
+        return len(self._inbox)
+
+    @property
+    def max_inbox_depth(self) -> int:
+        return self._max_inbox_depth
+
+    @property
+    def send_errors(self) -> int:
+        return self._send_errors
+
+    @property
+    def replay_size(self) -> int:
+        """The estimated memory used by the replay rings of the viewers, in bytes."""
+        return sum(viewer.size for viewer in self._viewers.values())
+
     def _board_state(self, ws_player: T_Player | None) -> Iterator[list[Sendable]]:
         raise NotImplementedError
 
     def _results(self) -> Iterator[list[Sendable]]:
         raise NotImplementedError
 
-    async def _send_str(self, ws: web.WebSocketResponse, msg: str) -> None:
+    def _results_best(self) -> Iterator[list[Sendable]]:
+        """Yield the final points of the best play from the endgame, once solved."""
+        if self._best_play is not None:
+            yield ["results_best", *self._best_play]
+
+    def search_state(self) -> SearchState:
+        """Return a compact copy of the game, for the search of the bots."""
+        raise NotImplementedError
+
+    def _move_commands(self, move: int) -> list[tuple[str, ...]]:
+        """Return the commands playing a move of `search_state`."""
+        raise NotImplementedError
+
+    async def _send_bytes(self, ws: web.WebSocketResponse, data: bytes) -> None:
         try:
-            await ws.send_str(msg)
-        except OSError as e:
-            print(e)
+            await ws.send_frame(data, aiohttp.WSMsgType.TEXT)
+        except OSError:
+            self._send_errors += 1
+            logger.debug("Error sending to a websocket", exc_info=True)
+
+    def _fan_out(
+        self, data: bytes, websockets: Iterable[web.WebSocketResponse]
+    ) -> set[asyncio.Task[None]]:
+        """Write an encoded frame to every websocket.
+
+        Frames for the websockets with a send queue are just queued. The other writes
+        start eagerly, so the ones that don't block complete right away without being
+        scheduled. Return the writes still waiting for a slow socket.
+        """
+        loop = asyncio.get_running_loop()
+        pending = set()
+        for ws in websockets:
+            if ws.closed:
+                continue
+            if (send_queue := ws.get(SEND_QUEUE)) is not None:
+                send_queue.put(data)
+                continue
+            task = asyncio.eager_task_factory(loop, self._send_bytes(ws, data))
+            if not task.done():
+                pending.add(task)
+        return pending
 
     @overload
-    async def _send(
+    def _send(
         self,
         maybe_player_or_ws: T_Player | web.WebSocketResponse,
         *args: Sendable,
     ) -> None: ...
 
     @overload
-    async def _send(
+    def _send(
         self,
         maybe_player_or_ws: Sendable,
         *args: Sendable,
         websockets: Iterable[web.WebSocketResponse] | None = ...,
+        viewers: Iterable[Viewer] = ...,
     ) -> None: ...
 
-    async def _send(
+    def _send(
         self,
         maybe_player_or_ws: T_Player | web.WebSocketResponse | Sendable,
         *args: Sendable,
         websockets: Iterable[web.WebSocketResponse] | None = None,
+        viewers: Iterable[Viewer] = (),
     ) -> None:
+        """Queue a message for some websockets, all of them by default.
+
+        The message is also recorded for `viewers` (all of them by default), including
+        the ones currently disconnected. Queued messages are sent by `_flush_outbox`.
+        """
         if isinstance(maybe_player_or_ws, Player):
-            await self._send(*args, websockets=maybe_player_or_ws.websockets)
+            self._send(
+                *args,
+                websockets=maybe_player_or_ws.websockets,
+                viewers=self._player_viewers(maybe_player_or_ws),
+            )
             return
         if isinstance(maybe_player_or_ws, web.WebSocketResponse):
-            await self._send(*args, websockets=[maybe_player_or_ws])
+            viewer_id = maybe_player_or_ws.get(VIEWER_ID)
+            self._send(
+                *args,
+                websockets=[maybe_player_or_ws],
+                viewers=[self._viewers[viewer_id]]
+                if viewer_id in self._viewers
+                else [],
+            )
             return
 
         args = (maybe_player_or_ws, *args)
-        async with self._send_lock, asyncio.TaskGroup() as tg:
-            msg = "|".join(str(x).replace("|", "") for x in args)
-            if websockets is None:
-                websockets = self.websockets
-            for ws in websockets:
-                if not ws.closed:
-                    tg.create_task(self._send_str(ws, msg))
-
-    async def _send_others(
+        msg = "|".join(str(x).replace("|", "").replace("\n", "") for x in args)
+        self._seq += 1
+        if websockets is None:
+            websockets = self.websockets
+            viewers = self._viewers.values()
+        for viewer in viewers:
+            viewer.record(self._seq, msg)
+        for ws in websockets:
+            self._outbox.setdefault(ws, []).append((self._seq, msg))
+
+    def _player_viewers(self, player: T_Player) -> list[Viewer]:
+        return [x for x in self._viewers.values() if x.player == player]
+
+    async def _flush_outbox(self) -> None:
+        outbox, self._outbox = self._outbox, {}
+
+        # group the websockets receiving the same frames, spectators usually share them
+        frames: dict[tuple[str, ...], list[web.WebSocketResponse]] = {}
+        for ws, seq_msgs in outbox.items():
+            if ws.get(VIEWER_ID) is None:
+                msgs = [msg for _, msg in seq_msgs]
+            else:
+                msgs = [f"{seq}|{msg}" for seq, msg in seq_msgs]
+            if ws.get(MULTILINE_FRAMES, False):
+                frames.setdefault(("\n".join(msgs),), []).append(ws)
+            else:
+                frames.setdefault(tuple(msgs), []).append(ws)
+
+        pending: set[asyncio.Task[None]] = set()
+        for frame_msgs, websockets in frames.items():
+            for msg in frame_msgs:
+                pending |= self._fan_out(msg.encode(), websockets)
+        if pending:
+            await asyncio.wait(pending)
+
+    def _send_others(
         self, player_or_ws: T_Player | web.WebSocketResponse, *args: Sendable
     ) -> None:
-        websockets = (
-            player_or_ws.websockets
-            if isinstance(player_or_ws, Player)
-            else {player_or_ws}
+        websockets: Iterable[web.WebSocketResponse]
+        if isinstance(player_or_ws, Player):
+            websockets = player_or_ws.websockets
+            excluded = self._player_viewers(player_or_ws)
+        else:
+            websockets = {player_or_ws}
+            viewer_id = player_or_ws.get(VIEWER_ID)
+            excluded = [self._viewers[viewer_id]] if viewer_id in self._viewers else []
+        self._send(
+            *args,
+            websockets=self.websockets - websockets,
+            viewers=[x for x in self._viewers.values() if x not in excluded],
         )
-        await self._send(*args, websockets=self.websockets - websockets)
 
-    async def _send_current_state(
+    def _send_current_state(
         self, ws: web.WebSocketResponse, player: T_Player | None = None
     ) -> None:
-        await self._send(ws, "game_id", self._game_id)
+        self._send(ws, "game_id", self._game_id)
+        if ws.get(VIEWER_ID) is not None:
+            self._send(ws, "epoch", self._epoch)
 
-        await self._send(ws, "players", *(x.name for x in self._players))
+        self._send(ws, "players", *self.player_names)
         if player and self._game_status is not GameStatus.NOT_STARTED:
-            await self._send(ws, "player_id", self._players.index(player))
+            self._send(ws, "player_id", self._players.index(player))
 
         if self._game_status is not GameStatus.NOT_STARTED:
-            await self._send(ws, "animations", "off")
-            await self._send(ws, "begin")
+            self._send(ws, "animations", "off")
+            self._send(ws, "begin")
             for args in self._board_state(player):
-                await self._send(ws, *args)
+                self._send(ws, *args)
             if self._game_status is GameStatus.ENDED:
                 for args in self._results():
-                    await self._send(ws, *args)
+                    self._send(ws, *args)
                 if player and player.ready:
-                    await self._send(ws, "rematch_active")
-            await self._send(ws, "animations", "on")
+                    self._send(ws, "rematch_active")
+            self._send(ws, "animations", "on")
 
-    async def _prepare_start(self) -> None:
+    @overload
+    def _emit(self, maybe_player: T_Player, *args: Sendable) -> None: ...
+
+    @overload
+    def _emit(self, maybe_player: Sendable, *args: Sendable) -> None: ...
+
+    def _emit(self, maybe_player: T_Player | Sendable, *args: Sendable) -> None:
+        """Emit a message from the game logic to a player, or to everyone."""
+        if isinstance(maybe_player, Player):
+            self._events.append(Event(args, self._players.index(maybe_player)))
+        else:
+            self._events.append(Event((maybe_player, *args)))
+
+    def _emit_others(self, player: T_Player, *args: Sendable) -> None:
+        self._events.append(Event(args, self._players.index(player), others=True))
+
+    def _take_events(self) -> list[Event]:
+        events, self._events = self._events, []
+        return events
+
+    def _render(self, events: Iterable[Event]) -> None:
+        """Queue the events emitted by the game logic for the websockets."""
+        for event in events:
+            if event.player_id is None:
+                self._send(*event.args)
+            elif event.others:
+                self._send_others(self._players[event.player_id], *event.args)
+            else:
+                self._send(self._players[event.player_id], *event.args)
+
+    def start(self) -> list[Event]:
+        """Start the game, once all the players joined.
+
+        Return the events emitted, like `apply`.
+        """
+        self._random("players").shuffle(self._players)
+        self._prepare_start()
+        return self._take_events()
+
+    def _prepare_start(self) -> None:
         self._deck = self._shuffle_deck()
+        self._deals += 1
         self._current_player_id = self._starting_player_id
         self._game_status = GameStatus.STARTED
+        self._endgame = None
+        self._best_play = None
 
-        await self._send("players", *(x.name for x in self._players))
+        self._emit("players", *self.player_names)
         for player_id, player in enumerate(self._players):
-            await self._send(player, "player_id", player_id)
+            self._emit(player, "player_id", player_id)
 
-        await self._send("begin")
-        await self._start_game()
-        await self._send(self.current_player, "turn")
+        self._emit("begin")
+        self._start_game()
+        self._emit(self.current_player, "turn")
 
-    async def _start_game(self) -> None:
+    def _start_game(self) -> None:
         raise NotImplementedError
 
-    async def _end_game(self) -> None:
+    def _end_game(self) -> None:
         self._game_status = GameStatus.ENDED
         for args in self._results():
-            await self._send(*args)
+            self._emit(*args)
         for player in self._players:
             player.ready = False
 
-    async def _draw_card(self, player: T_Player) -> None:
+    def _draw_card(self, player: T_Player) -> None:
         card = self._deck.pop()
         player.hand.append(card)
         player_id = self._players.index(player)
-        async with asyncio.TaskGroup() as tg:
-            tg.create_task(self._send(player, "draw_card", player_id, card))
-            tg.create_task(self._send_others(player, "draw_card", player_id))
+        self._emit(player, "draw_card", player_id, card)
+        self._emit_others(player, "draw_card", player_id)
 
     def _next_player(self) -> None:
         self._current_player_id = (self._current_player_id + 1) % self.number_of_players
@@ -271,96 +702,303 @@ class BaseGame[T_Player: Player]:
         cmd, *args = msg.data.split("|")
         await self.handle_cmd(ws, player, cmd, *args)
 
-    async def handle_cmd(
+    def _get_cmd(self, raw_cmd: str) -> DispatchEntry:
+        try:
+            return self.commands[raw_cmd]
+        except KeyError as e:
+            err = f"Invalid command {raw_cmd}"
+            raise CmdError(err) from e
+
+    def _parse_args(
         self,
-        ws: web.WebSocketResponse,
+        raw_cmd: str,
+        entry: DispatchEntry,
+        ws: web.WebSocketResponse | None,
+        player: T_Player | None,
+        raw_args_tuple: tuple[str, ...],
+    ) -> list[Any]:
+        if len(raw_args_tuple) < entry.params:
+            err = (
+                f"Invalid number of parameters for command {raw_cmd}: "
+                f"{entry.params} expected, {len(raw_args_tuple)} given"
+            )
+            raise CmdError(err)
+
+        message = _Message(ws, player, raw_args_tuple)
+        return [binder(message) for binder in entry.binders]
+
+    def _bind_cmd(
+        self,
+        ws: web.WebSocketResponse | None,
         player: T_Player | None,
         raw_cmd: str,
-        *raw_args_tuple: str,
-    ) -> None:
-        try:
-            cmd = getattr(self, f"cmd_{raw_cmd}")
-            if not isinstance(cmd, Command):
-                raise TypeError  # noqa: TRY301
-        except (AttributeError, TypeError) as e:
+        raw_args_tuple: tuple[str, ...],
+    ) -> tuple[DispatchEntry, list[Any]]:
+        entry = self._get_cmd(raw_cmd)
+        # the commands bound to a connection (the ones that aren't journaled) can't run
+        # without one
+        if ws is None and not entry.journaled:
             err = f"Invalid command {raw_cmd}"
-            raise CmdError(err) from e
+            raise CmdError(err)
 
         # cmd.check can raise a CmdError
-        cmd.check(self, ws)
+        entry.cmd.check(self, player)
 
-        raw_args = iter(raw_args_tuple)
-        params = get_type_hints(cmd.func)
-        args: list[Any] = []
-        for name, type_ in params.items():
-            if type_ is web.WebSocketResponse:
-                args.append(ws)
-            elif type_ in (T_Player, self.player_class):  # type: ignore[misc]
-                if player is None:
-                    err = "You're not a player"
-                    raise CmdError(err)
-                args.append(player)
-            elif type_ in (T_Player | None, self.player_class | None):  # type: ignore[misc]
-                args.append(player)
-            elif type_ is Card:
-                card = next(raw_args)
+        return entry, self._parse_args(raw_cmd, entry, ws, player, raw_args_tuple)
+
+    def apply(
+        self, player_id: int | None, raw_cmd: str, *raw_args_tuple: str
+    ) -> list[Event]:
+        """Apply a command of a player, or of a spectator if `player_id` is None.
+
+        This is the headless core of the game: it runs synchronously, without an event
+        loop or websockets, and returns the events emitted instead of sending them.
+
+        The game is changed in place, copying it for each command would be too slow for
+        the searches of the bots and the simulations. A command rejected with a
+        `CmdError` leaves the game unchanged: the commands check everything before
+        changing anything.
+        """
+        player = None if player_id is None else self._players[player_id]
+        entry, args = self._bind_cmd(None, player, raw_cmd, raw_args_tuple)
+        try:
+            entry.cmd.func(self, *args)
+        finally:
+            events = self._take_events()
+        return events
+
+    async def handle_cmd(
+        self,
+        ws: web.WebSocketResponse | None,
+        player: T_Player | None,
+        raw_cmd: str,
+        *raw_args_tuple: str,
+    ) -> None:
+        def _run() -> JournalEntry | None:
+            # checked when it runs, the turns before it in the inbox can change the game
+            entry, args = self._bind_cmd(ws, player, raw_cmd, raw_args_tuple)
+            try:
                 try:
-                    suit, number = card.split(":")
-                    args.append(Card(Suit(suit), CardNumber(number)))
-                except ValueError as e:
-                    err = f"Invalid card: {card}"
-                    raise CmdError(err) from e
-            elif name != "return":
-                args.append(next(raw_args))
+                    entry.cmd.func(self, *args)
+                finally:
+                    self._render(self._take_events())
+            except CmdError as e:
+                raise CmdError(str(e), raw_cmd) from e
+            if not entry.journaled:
+                return None
+            player_id = None if player is None else self._players.index(player)
+            return JournalEntry(player_id, raw_cmd, raw_args_tuple)
+
+        await self._post(_run)
+
+    async def _post(self, run: Callable[[], JournalEntry | None]) -> None:
+        """Run a turn of the game after the ones already in the inbox."""
+        loop = asyncio.get_running_loop()
+        mail = _Mail(run, loop.create_future())
+        self._inbox.append(mail)
+        self._max_inbox_depth = max(self._max_inbox_depth, len(self._inbox))
+        if self._inbox_task is None or self._inbox_task.done():
+            # the task only lives while there are turns to run, an idle game can be
+            # garbage collected. Starting it eagerly runs the turns of an idle game
+            # right away
+            self._inbox_task = asyncio.eager_task_factory(loop, self._run_inbox())
+        await mail.future
+
+    async def _run_inbox(self) -> None:
+        batch: list[_Mail] = []
+        try:
+            while self._inbox:
+                batch = []
+                entries: list[JournalEntry] = []
+                game_status = self._game_status
+                while self._inbox and len(batch) < self.inbox_batch_size:
+                    mail = self._inbox.popleft()
+                    batch.append(mail)
+                    previous_status = self._game_status
+                    try:
+                        if (entry := mail.run()) is not None:
+                            entries.append(entry)
+                    except Exception as e:
+                        if not mail.future.done():
+                            mail.future.set_exception(e)
+                    self._analyze_endgame(previous_status)
+                    # the snapshot of a new status must include every command before
+                    # it, and none after it
+                    if self._game_status is not game_status:
+                        break
 
-        cmd_expected_params = len(params) - 1
-        cmd_given_params = len(args)
-        if cmd_expected_params != cmd_given_params:
-            err = (
-                f"Invalid number of parameters for command {raw_cmd}: "
-                f"{cmd_expected_params} expected, {cmd_given_params} given"
+                try:
+                    await self._flush_outbox()
+                    if self.journal is not None:
+                        if self._game_status is not game_status:
+                            await self.journal.snapshot(self)
+                        elif entries:
+                            await self.journal.extend(self, entries)
+                except Exception as e:
+                    for mail in batch:
+                        if not mail.future.done():
+                            mail.future.set_exception(e)
+                for mail in batch:
+                    if not mail.future.done():
+                        mail.future.set_result(None)
+                self._wake_bots()
+        finally:
+            for mail in (*batch, *self._inbox):
+                mail.future.cancel()
+            self._inbox.clear()
+
+    def _analyze_endgame(self, previous_status: GameStatus) -> None:
+        if not self.analyze_endgames or self.bot_pool is None:
+            return
+        if self._game_status is GameStatus.STARTED:
+            if self._endgame is None and not self._deck:
+                state = self.search_state()
+                if is_endgame(state):
+                    self._endgame = state
+        elif previous_status is GameStatus.STARTED and self._endgame is not None:
+            self._analysis_task = self.bot_pool.spawn(
+                self._send_best_play(self._endgame)
             )
-            raise CmdError(err)
 
+    async def _send_best_play(self, endgame: SearchState) -> None:
+        assert self.bot_pool is not None
+        solution = await self.bot_pool.solve(endgame)
+
+        def _run() -> None:
+            # a rematch could have started in the meantime
+            if (
+                self._endgame is not endgame
+                or self._game_status is not GameStatus.ENDED
+            ):
+                return
+            self._best_play = solution.points
+            self._send("results_best", *solution.points)
+
+        await self._post(_run)
+
+    def _next_bot(self) -> T_Player | None:
+        """Return the bot that has to play, or to accept a rematch."""
+        if self._game_status is GameStatus.STARTED:
+            return self.current_player if self.current_player in self._bots else None
+        if self._game_status is GameStatus.ENDED:
+            return next((x for x in self._bots if not x.ready), None)
+        return None
+
+    def _wake_bots(self) -> None:
+        if self.bot_pool is None or self._next_bot() is None:
+            return
+        if self._bots_task is None or self._bots_task.done():
+            self._bots_task = self.bot_pool.spawn(self._play_bots())
+
+    async def _play_bots(self) -> None:
+        while self.bot_pool is not None and (bot := self._next_bot()) is not None:
+            commands: list[tuple[str, ...]]
+            if self._game_status is GameStatus.ENDED:
+                commands = [("rematch",)]
+            else:
+                budget = self._bots[bot].budget
+                move = await self.bot_pool.search(self.search_state(), budget)
+                commands = self._move_commands(move)
+            for raw_cmd, *raw_args in commands:
+                await self.handle_cmd(None, bot, raw_cmd, *raw_args)
+
+    @asynccontextmanager
+    async def _outbound(self) -> AsyncIterator[None]:
+        """Send the messages queued in the block when it ends."""
         try:
-            async with self._recv_lock:
-                await cmd.func(self, *args)
-        except CmdError as e:
-            raise CmdError(str(e), raw_cmd) from e
+            yield
+        finally:
+            await self._flush_outbox()
+
+    async def handle_error(
+        self, ws: web.WebSocketResponse, player: T_Player | None, error: CmdError
+    ) -> None:
+        args = [str(error)]
+        if error.command is not None:
+            args.append(error.command)
+
+        def _run() -> None:
+            if ws.get(VIEWER_ID) is None:
+                self._send_current_state(ws, player)
+            # clients following the resume protocol are in sync, they only need to
+            # know they can play again
+            elif (
+                self._game_status is GameStatus.STARTED
+                and player is not None
+                and player == self.current_player
+            ):
+                self._send(ws, "turn")
+            self._send(ws, "error", *args)
+
+        await self._post(_run)
+
+    def replay_cmd(self, entry: JournalEntry) -> None:
+        """Apply a journaled command again, skipping the checks it already passed."""
+        player = None if entry.player_id is None else self._players[entry.player_id]
+        dispatch_entry = self._get_cmd(entry.cmd)
+        args = self._parse_args(entry.cmd, dispatch_entry, None, player, entry.args)
+        dispatch_entry.cmd.func(self, *args)
+        # nobody is connected to a game being restored
+        self._take_events()
 
     @cmd()
-    async def cmd_current_state(
+    def cmd_current_state(
         self, ws: web.WebSocketResponse, player: T_Player | None
     ) -> None:
-        await self._send_current_state(ws, player)
+        self._send_current_state(ws, player)
 
     @cmd()
-    async def cmd_join(
+    def cmd_join(
         self, ws: web.WebSocketResponse, player: T_Player | None, name: str
     ) -> None:
         if player is None:
-            await self._send_current_state(ws)
+            self._send_current_state(ws)
             return
 
         player.name = name
         player.websockets.add(ws)
-        await self._send_current_state(ws, player)
+        self._send_current_state(ws, player)
 
         if (
             len(self._players) == self.number_of_players
             and self._game_status is GameStatus.NOT_STARTED
             and all(x.name for x in self._players)
         ):
-            random.shuffle(self._players)
-            await self._prepare_start()
+            self._render(self.start())
+
+    @cmd()
+    def cmd_resume(
+        self,
+        ws: web.WebSocketResponse,
+        player: T_Player | None,
+        epoch: str,
+        seq: str,
+        name: str,
+    ) -> None:
+        viewer = self._viewers.get(ws.get(VIEWER_ID, ""))
+        missed = None
+        if viewer is not None and epoch == self._epoch and seq.isdecimal():
+            missed = viewer.missed(int(seq))
+        if missed is None:
+            # the messages are not available anymore, send the whole state
+            self.cmd_join.func(self, ws, player, name)
+            return
+
+        if player is not None:
+            player.websockets.add(ws)
+        if missed:
+            self._outbox.setdefault(ws, []).extend(missed)
+
+        if player is not None and name and name != player.name:
+            self.cmd_name.func(self, player, name)
 
     @cmd()
-    async def cmd_name(self, player: T_Player, name: str) -> None:
+    def cmd_name(self, player: T_Player, name: str) -> None:
         player.name = name
-        await self._send("players", *(x.name for x in self._players))
+        self._emit("players", *self.player_names)
 
     @cmd(game_status=GameStatus.ENDED)
-    async def cmd_rematch(self, player: T_Player) -> None:
+    def cmd_rematch(self, player: T_Player) -> None:
         player.ready = True
         if all(x.ready for x in self._players):
             self._starting_player_id = (
@@ -368,4 +1006,4 @@ class BaseGame[T_Player: Player]:
             ) % self.number_of_players
             for player in self._players:
                 player.reset()
-            await self._prepare_start()
+            self._prepare_start()
@@ -1,30 +1,106 @@
-from collections.abc import Iterator
+import random
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Self
 
 from carte.exc import CmdError
 from carte.games.base import BaseGame, Player, cmd
-from carte.types import Card, CardNumber, GameStatus, Sendable
+from carte.games.search import card_ids, card_mask
+from carte.types import CARDS, Card, CardNumber, GameStatus, Sendable, Suit
+
+if TYPE_CHECKING:
+    from carte.codec import Reader, Writer
+
+
+# from the weakest card to the strongest one
+CARD_POINTS = {
+    CardNumber.DUE: 0,
+    CardNumber.QUATTRO: 0,
+    CardNumber.CINQUE: 0,
+    CardNumber.SEI: 0,
+    CardNumber.SETTE: 0,
+    CardNumber.FANTE: 2,
+    CardNumber.CAVALLO: 3,
+    CardNumber.RE: 4,
+    CardNumber.TRE: 10,
+    CardNumber.ASSO: 11,
+}
+
+# the points of each card, indexed by card id
+POINTS = tuple(CARD_POINTS[card.number] for card in CARDS)
+
+# the strength of each card, indexed by trump suit id and card id: trumps are stronger
+# than any other card
+STRENGTH = tuple(
+    tuple(
+        list(CARD_POINTS).index(card.number) + len(CardNumber) * (card.suit is trump)
+        for card in CARDS
+    )
+    for trump in Suit
+)
+
+
+def suit_id(card_id: int) -> int:
+    return card_id // len(CardNumber)
+
+
+def trick_winner(card_ids: Sequence[int], trump: int) -> int:
+    """Return the index of the winning card of a trick, in playing order.
+
+    A card only beats the winning one if it is stronger and either of the same suit or
+    a trump.
+    """
+    strength = STRENGTH[trump]
+    winner = 0
+    for i in range(1, len(card_ids)):
+        card_id, winning_id = card_ids[i], card_ids[winner]
+        if strength[card_id] > strength[winning_id] and (
+            suit_id(card_id) == suit_id(winning_id) or suit_id(card_id) == trump
+        ):
+            winner = i
+    return winner
 
 
 class Briscola(BaseGame[Player], number_of_players=2, hand_size=3):
-    def __init__(self, game_id: str) -> None:
-        super().__init__(game_id)
-
-        self._card_points = {
-            CardNumber.DUE: 0,
-            CardNumber.QUATTRO: 0,
-            CardNumber.CINQUE: 0,
-            CardNumber.SEI: 0,
-            CardNumber.SETTE: 0,
-            CardNumber.FANTE: 2,
-            CardNumber.CAVALLO: 3,
-            CardNumber.RE: 4,
-            CardNumber.TRE: 10,
-            CardNumber.ASSO: 11,
-        }
+    def __init__(self, game_id: str, seed: int | None = None) -> None:
+        super().__init__(game_id, seed)
 
         self._briscola: Card
         self._briscola_drawn = False
         self._played_cards: dict[Player, Card] = {}
+        # the points taken by each player so far
+        self._scores = [0] * self.number_of_players
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        super().__setstate__(state)
+        if "_scores" not in state:
+            # games pickled by older versions don't keep the scores
+            self._update_scores()
+
+    def _update_scores(self) -> None:
+        self._scores = [
+            sum(POINTS[card.id] for card in player.points) for player in self._players
+        ]
+
+    def encode_state(self, writer: Writer) -> None:
+        super().encode_state(writer)
+        if self._game_status is not GameStatus.NOT_STARTED:
+            writer.card(self._briscola)
+            writer.flag(self._briscola_drawn)
+            writer.u8(len(self._played_cards))
+            for player, card in self._played_cards.items():
+                writer.u8(self._players.index(player))
+                writer.card(card)
+
+    def decode_state(self, reader: Reader) -> None:
+        super().decode_state(reader)
+        if self._game_status is not GameStatus.NOT_STARTED:
+            self._briscola = reader.card()
+            self._briscola_drawn = reader.flag()
+            for _ in range(reader.u8()):
+                player = self._players[reader.u8()]
+                self._played_cards[player] = reader.card()
+        self._update_scores()
 
     def _board_state(self, ws_player: Player | None) -> Iterator[list[Sendable]]:
         for player_id, player in enumerate(self._players):
@@ -55,29 +131,42 @@ class Briscola(BaseGame[Player], number_of_players=2, hand_size=3):
             yield ["turn"]
 
     def _results(self) -> Iterator[list[Sendable]]:
-        results = []
-        for results_player in self._players:
-            points = 0
-            for card in results_player.points:
-                points += self._card_points[card.number]
-            results.append(points)
-        yield ["results", *results]
-
-    async def _start_game(self) -> None:
+        yield ["results", *self._scores]
+        yield from self._results_best()
+
+    def search_state(self) -> BriscolaState:
+        return BriscolaState(
+            hands=[
+                card_mask(card.id for card in player.hand) for player in self._players
+            ],
+            deck=[card.id for card in self._deck],
+            briscola=self._briscola.id,
+            briscola_drawn=self._briscola_drawn,
+            trick=[card.id for card in self._played_cards.values()],
+            player_id=self._current_player_id,
+            scores=self._scores.copy(),
+        )
+
+    def _move_commands(self, move: int) -> list[tuple[str, ...]]:
+        return [("play", str(CARDS[move]))]
+
+    def _start_game(self) -> None:
+        self._scores = [0] * self.number_of_players
+
         for _ in range(self.hand_size):
             for i in range(self.number_of_players):
                 player_id = (self._current_player_id + i) % self.number_of_players
-                await self._draw_card(self._players[player_id])
+                self._draw_card(self._players[player_id])
 
-        await self._show_briscola()
+        self._show_briscola()
 
-    async def _show_briscola(self) -> None:
+    def _show_briscola(self) -> None:
         self._briscola = self._deck.pop()
         self._briscola_drawn = False
-        await self._send("show_briscola", self._briscola)
+        self._emit("show_briscola", self._briscola)
 
     @cmd(current_player=True, game_status=GameStatus.STARTED)
-    async def cmd_play(self, card: Card) -> None:
+    def cmd_play(self, card: Card) -> None:
         try:
             self.current_player.hand.remove(card)
         except ValueError as e:
@@ -85,32 +174,21 @@ class Briscola(BaseGame[Player], number_of_players=2, hand_size=3):
             raise CmdError(msg) from e
 
         self._played_cards[self.current_player] = card
-        await self._send("play_card", self._current_player_id, card)
+        self._emit("play_card", self._current_player_id, card)
 
         if len(self._played_cards) == self.number_of_players:
-            winning_card: Card | None = None
-            winning_player: Player
-            card_order = list(self._card_points)
-            for player, card in self._played_cards.items():
-                if (
-                    winning_card is None
-                    or (
-                        card.suit == winning_card.suit
-                        and card_order.index(card.number)
-                        > card_order.index(winning_card.number)
-                    )
-                    or (
-                        card.suit == self._briscola.suit
-                        and winning_card.suit != self._briscola.suit
-                    )
-                ):
-                    winning_player = player
-                    winning_card = card
+            players = list(self._played_cards)
+            card_ids = [card.id for card in self._played_cards.values()]
+            winner = trick_winner(card_ids, suit_id(self._briscola.id))
+            winning_player = players[winner]
 
             winning_player.points.extend(self._played_cards.values())
             self._played_cards.clear()
             self._current_player_id = self._players.index(winning_player)
-            await self._send("take", self._current_player_id)
+            self._scores[self._current_player_id] += sum(
+                POINTS[card_id] for card_id in card_ids
+            )
+            self._emit("take", self._current_player_id)
 
             if self._deck:
                 for i in range(self.number_of_players):
@@ -118,17 +196,119 @@ class Briscola(BaseGame[Player], number_of_players=2, hand_size=3):
                         (self._current_player_id + i) % self.number_of_players
                     ]
                     if self._deck:
-                        await self._draw_card(player)
+                        self._draw_card(player)
                     else:
                         self._briscola_drawn = True
                         player.hand.append(self._briscola)
-                        await self._send("draw_briscola", self._players.index(player))
+                        self._emit("draw_briscola", self._players.index(player))
 
             elif all(not player.hand for player in self._players):
-                await self._end_game()
+                self._end_game()
                 return
 
         else:
             self._next_player()
 
-        await self._send(self.current_player, "turn")
+        self._emit(self.current_player, "turn")
+
+
+@dataclass(slots=True)
+class BriscolaState:
+    """A game of Briscola, for the search of the bots.
+
+    Hands are bitmasks of card ids, the deck is drawn from the end and the briscola
+    after it. Moves are the ids of the cards played.
+    """
+
+    hands: list[int]
+    deck: list[int]
+    briscola: int
+    briscola_drawn: bool
+    # the cards played in the current trick, in playing order
+    trick: list[int]
+    player_id: int
+    scores: list[int]
+
+    def moves(self) -> list[int]:
+        return card_ids(self.hands[self.player_id])
+
+    def random_move(self, rng: random.Random) -> int:
+        return rng.choice(self.moves())
+
+    def play(self, move: int) -> None:
+        players = len(self.hands)
+        self.hands[self.player_id] &= ~(1 << move)
+        self.trick.append(move)
+        if len(self.trick) < players:
+            self.player_id = (self.player_id + 1) % players
+            return
+
+        leader_id = (self.player_id + 1) % players
+        winner = trick_winner(self.trick, suit_id(self.briscola))
+        self.player_id = (leader_id + winner) % players
+        self.scores[self.player_id] += sum(POINTS[card_id] for card_id in self.trick)
+        self.trick.clear()
+
+        if self.deck:
+            for i in range(players):
+                player_id = (self.player_id + i) % players
+                if self.deck:
+                    self.hands[player_id] |= 1 << self.deck.pop()
+                else:
+                    self.briscola_drawn = True
+                    self.hands[player_id] |= 1 << self.briscola
+
+    def is_over(self) -> bool:
+        return not any(self.hands) and not self.deck
+
+    def points(self) -> list[int]:
+        return self.scores
+
+    def copy(self) -> Self:
+        return type(self)(
+            self.hands.copy(),
+            self.deck.copy(),
+            self.briscola,
+            self.briscola_drawn,
+            self.trick.copy(),
+            self.player_id,
+            self.scores.copy(),
+        )
+
+    def key(self) -> tuple[int, ...]:
+        # the scores only add up, they don't change the rest of the game
+        return (
+            self.player_id,
+            self.briscola,
+            self.briscola_drawn,
+            len(self.trick),
+            *self.trick,
+            *self.hands,
+            *self.deck,
+        )
+
+    def determinize(self, player_id: int, rng: random.Random) -> Self:
+        # the briscola is the only card of the others players that can be known
+        known = 1 << self.briscola if self.briscola_drawn else 0
+        hidden = self.deck.copy()
+        for other_id, hand in enumerate(self.hands):
+            if other_id != player_id:
+                hidden += card_ids(hand & ~known)
+        rng.shuffle(hidden)
+
+        hands = self.hands.copy()
+        for other_id, hand in enumerate(self.hands):
+            if other_id != player_id:
+                size = (hand & ~known).bit_count()
+                hands[other_id] = hand & known | card_mask(hidden[:size])
+                del hidden[:size]
+
+        return type(self)(
+            hands,
+            hidden,
+            self.briscola,
+            self.briscola_drawn,
+            self.trick.copy(),
+            self.player_id,
+            self.scores.copy(),
+        )
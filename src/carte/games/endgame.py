@@ -0,0 +1,166 @@
+import math
+from collections.abc import Hashable
+from dataclasses import dataclass
+from enum import Enum, auto
+
+from carte.games.search import SearchState
+
+
+class Bound(Enum):
+    EXACT = auto()
+    LOWER = auto()
+    UPPER = auto()
+
+
+@dataclass(frozen=True, slots=True)
+class Entry:
+    value: float
+    bound: Bound
+    move: int
+
+
+class TranspositionTable:
+    """The positions already solved, keyed by `SearchState.key`.
+
+    It holds at most `max_entries` positions, the oldest ones are dropped first.
+    Values are stored relative to the points of the position, so that the same cards
+    left to play share an entry when the points taken so far don't matter.
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self._entries: dict[Hashable, Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def get(self, key: Hashable) -> Entry | None:
+        self.lookups += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: Entry) -> None:
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+            self.evictions += 1
+        self._entries[key] = entry
+
+
+# the table used when none is given, shared by the searches of the same process
+TRANSPOSITIONS = TranspositionTable()
+
+
+@dataclass(frozen=True)
+class Solution:
+    move: int
+    # the points of each player at the end of the game, if both play the best moves
+    points: list[int]
+    # the positions visited, and how many of them were looked up in and found in the
+    # transposition table
+    nodes: int
+    lookups: int
+    hits: int
+
+
+def is_endgame(state: SearchState) -> bool:
+    """Return whether no card is hidden anymore: each player can deduce the others'
+    hands from the cards already seen."""
+    return not state.deck
+
+
+def _margin(state: SearchState) -> int:
+    points = state.points()
+    others = (x for i, x in enumerate(points) if i != state.player_id)
+    return points[state.player_id] - max(others)
+
+
+class _Solver:
+    def __init__(self, table: TranspositionTable) -> None:
+        self.table = table
+        self.nodes = 0
+
+    def negamax(self, state: SearchState, alpha: float, beta: float) -> Entry:
+        """Return the final margin of the player to move, and their best move."""
+        self.nodes += 1
+        base = _margin(state)
+        key = state.key()
+        entry = self.table.get(key)
+        moves = state.moves()
+        if entry is not None:
+            value = entry.value + base
+            if entry.bound is Bound.EXACT:
+                return Entry(value, Bound.EXACT, entry.move)
+            if entry.bound is Bound.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return Entry(value, entry.bound, entry.move)
+            # try the best move found so far first
+            moves.remove(entry.move)
+            moves.insert(0, entry.move)
+
+        original_alpha = alpha
+        best = Entry(-math.inf, Bound.EXACT, moves[0])
+        for move in moves:
+            child = state.copy()
+            child.play(move)
+            if child.is_over():
+                value = float(_margin(child))
+                if child.player_id != state.player_id:
+                    value = -value
+            elif child.player_id == state.player_id:
+                value = self.negamax(child, alpha, beta).value
+            else:
+                value = -self.negamax(child, -beta, -alpha).value
+            if value > best.value:
+                best = Entry(value, Bound.EXACT, move)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best.value <= original_alpha:
+            bound = Bound.UPPER
+        elif best.value >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.table.put(key, Entry(best.value - base, bound, best.move))
+        return best
+
+
+def solve(state: SearchState, table: TranspositionTable | None = None) -> Solution:
+    """Find the best move of a two-player endgame, with an alpha-beta search.
+
+    The best move maximizes the difference between the final points of the player
+    and the ones of their opponent. `state` must be an endgame (see `is_endgame`),
+    since the search sees all the cards.
+    """
+    if table is None:
+        table = TRANSPOSITIONS
+    lookups, hits = table.lookups, table.hits
+    solver = _Solver(table)
+    move = solver.negamax(state, -math.inf, math.inf).move
+
+    # follow the best line to the end of the game, most positions are in the table
+    line = state.copy()
+    line.play(move)
+    while not line.is_over():
+        line.play(solver.negamax(line, -math.inf, math.inf).move)
+
+    return Solution(
+        move,
+        line.points(),
+        solver.nodes,
+        table.lookups - lookups,
+        table.hits - hits,
+    )
@@ -1,9 +1,132 @@
-from collections.abc import Iterator
+import random
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
 from enum import StrEnum, auto
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Self
 
 from carte.exc import CmdError
 from carte.games.base import BaseGame, Player, cmd
-from carte.types import Card, CardNumber, GameStatus, Sendable, Suit
+from carte.games.search import card_ids, card_mask
+from carte.types import CARDS, Card, CardNumber, GameStatus, Sendable, Suit
+
+if TYPE_CHECKING:
+    from carte.codec import Reader, Writer
+
+
+CARD_VALUES = {
+    CardNumber.ASSO: 1,
+    CardNumber.DUE: 2,
+    CardNumber.TRE: 3,
+    CardNumber.QUATTRO: 4,
+    CardNumber.CINQUE: 5,
+    CardNumber.SEI: 6,
+    CardNumber.SETTE: 7,
+    CardNumber.FANTE: 8,
+    CardNumber.CAVALLO: 9,
+    CardNumber.RE: 10,
+}
+
+PRIMIERA_VALUES = {
+    CardNumber.SETTE: 21,
+    CardNumber.SEI: 18,
+    CardNumber.ASSO: 16,
+    CardNumber.CINQUE: 15,
+    CardNumber.QUATTRO: 14,
+    CardNumber.TRE: 13,
+    CardNumber.DUE: 12,
+    CardNumber.RE: 10,
+    CardNumber.CAVALLO: 10,
+    CardNumber.FANTE: 10,
+}
+
+
+@lru_cache(maxsize=4096)
+def capture_values(target: int, counts: tuple[int, ...]) -> int:
+    """Return a bitmask of the values that can be part of a capture of `target`.
+
+    `counts[v]` is the number of cards of value `v` on the table. Bit `v` of the result
+    is set when a subset of the table containing a card of value `v` sums to `target`.
+    """
+    mask = (1 << (target + 1)) - 1
+    out = 0
+    for value, count in enumerate(counts):
+        if not count or value > target:
+            continue
+        # bit n of `reachable` is set when some of the other cards sum to n
+        reachable = 1
+        for other_value, other_count in enumerate(counts):
+            if other_value > target:
+                continue
+            for _ in range(other_count - (other_value == value)):
+                reachable = (reachable | reachable << other_value) & mask
+        if reachable >> (target - value) & 1:
+            out |= 1 << value
+    return out
+
+
+def takeable_cards(
+    card: Card, table: Sequence[Card], selected: Sequence[Card] = ()
+) -> list[Card]:
+    """Return the cards on the table that can be taken with `card`.
+
+    Cards with the same number as `card` must be taken if there are any, otherwise a
+    card is takeable when, together with the `selected` ones and some of the others on
+    the table, it sums to the value of `card`.
+    """
+    if not selected:
+        equipollent_cards = [c for c in table if c.number == card.number]
+        if equipollent_cards:
+            return equipollent_cards
+
+    target = CARD_VALUES[card.number] - sum(CARD_VALUES[c.number] for c in selected)
+    counts = [0] * (len(CARD_VALUES) + 1)
+    for c in table:
+        if c not in selected:
+            counts[CARD_VALUES[c.number]] += 1
+    valid_values = capture_values(target, tuple(counts))
+
+    return [c for c in table if valid_values >> CARD_VALUES[c.number] & 1]
+
+
+# the value of each card, indexed by card id
+VALUES = tuple(CARD_VALUES[card.number] for card in CARDS)
+# the best primiera value of the cards of a suit, indexed by their bitmask
+BEST_PRIMIERA = tuple(
+    max(
+        (PRIMIERA_VALUES[CARDS[card_id].number] for card_id in card_ids(suit_mask)),
+        default=0,
+    )
+    for suit_mask in range(1 << len(CardNumber))
+)
+DENARI_MASK = card_mask(card.id for card in CARDS if card.suit is Suit.DENARI)
+SETTEBELLO = Card(Suit.DENARI, CardNumber.SETTE).id
+
+
+@lru_cache(maxsize=65536)
+def captures(value: int, table: int) -> tuple[int, ...]:
+    """Return the bitmasks of all the captures of a card of `value` from `table`.
+
+    Like `takeable_cards`, a card with the same number must be taken if there are
+    any, otherwise any subset of the table summing to the value of the card can be.
+    """
+    table_ids = card_ids(table)
+    equal = [1 << x for x in table_ids if VALUES[x] == value]
+    if equal:
+        return tuple(equal)
+
+    out: list[int] = []
+
+    def extend(start: int, mask: int, target: int) -> None:
+        for i in range(start, len(table_ids)):
+            remaining = target - VALUES[table_ids[i]]
+            if remaining == 0:
+                out.append(mask | 1 << table_ids[i])
+            elif remaining > 0:
+                extend(i + 1, mask | 1 << table_ids[i], remaining)
+
+    extend(0, 0, value)
+    return tuple(out)
 
 
 class ScopaPlayingStatus(StrEnum):
@@ -15,42 +138,66 @@ class ScopaPlayer(Player):
     def __init__(self, token: str, name: str = "") -> None:
         super().__init__(token, name)
         self.scopa_cards: list[Card] = []
+        # running tallies of the taken cards, so that the results don't need to scan
+        # the whole `points` list
+        self.denari = 0
+        self.settebello = False
+        self.primiera: dict[Suit, Card] = {}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        super().__setstate__(state)
+        if "primiera" not in state:
+            # players pickled by older versions don't keep the tallies
+            self.recount()
+
+    def encode_state(self, writer: Writer) -> None:
+        super().encode_state(writer)
+        writer.cards(self.scopa_cards)
+
+    @classmethod
+    def decode_state(cls, reader: Reader) -> Self:
+        player = super().decode_state(reader)
+        player.scopa_cards = reader.cards()
+        player.recount()
+        return player
 
     def reset(self) -> None:
         super().reset()
         self.scopa_cards.clear()
+        self.recount()
+
+    @property
+    def primiera_score(self) -> int:
+        return sum(PRIMIERA_VALUES[card.number] for card in self.primiera.values())
+
+    def take(self, cards: Iterable[Card]) -> None:
+        cards = list(cards)
+        self.points.extend(cards)
+        self._tally(cards)
+
+    def recount(self) -> None:
+        self.denari = 0
+        self.settebello = False
+        self.primiera = {}
+        self._tally(self.points)
+
+    def _tally(self, cards: Iterable[Card]) -> None:
+        for card in cards:
+            if card.suit is Suit.DENARI:
+                self.denari += 1
+                if card.number is CardNumber.SETTE:
+                    self.settebello = True
+            best = self.primiera.get(card.suit)
+            value = PRIMIERA_VALUES[card.number]
+            if best is None or value > PRIMIERA_VALUES[best.number]:
+                self.primiera[card.suit] = card
 
 
 class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
-    def __init__(self, game_id: str) -> None:
-        super().__init__(game_id)
+    def __init__(self, game_id: str, seed: int | None = None) -> None:
+        super().__init__(game_id, seed)
 
         self._table_size = 4
-        self._card_values = {
-            CardNumber.ASSO: 1,
-            CardNumber.DUE: 2,
-            CardNumber.TRE: 3,
-            CardNumber.QUATTRO: 4,
-            CardNumber.CINQUE: 5,
-            CardNumber.SEI: 6,
-            CardNumber.SETTE: 7,
-            CardNumber.FANTE: 8,
-            CardNumber.CAVALLO: 9,
-            CardNumber.RE: 10,
-        }
-        self._primiera_card_values = {
-            CardNumber.SETTE: 21,
-            CardNumber.SEI: 18,
-            CardNumber.ASSO: 16,
-            CardNumber.CINQUE: 15,
-            CardNumber.QUATTRO: 14,
-            CardNumber.TRE: 13,
-            CardNumber.DUE: 12,
-            CardNumber.RE: 10,
-            CardNumber.CAVALLO: 10,
-            CardNumber.FANTE: 10,
-        }
-
         self._table: list[Card] = []
         self._playing_status: ScopaPlayingStatus
 
@@ -60,6 +207,27 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
         self._takeable_cards: list[Card] = []
         self._selected_cards: list[Card] = []
 
+    def encode_state(self, writer: Writer) -> None:
+        super().encode_state(writer)
+        writer.cards(self._table)
+        if self._game_status is not GameStatus.NOT_STARTED:
+            writer.u8(list(ScopaPlayingStatus).index(self._playing_status))
+            writer.u8(self._last_taker_id)
+            writer.optional_card(getattr(self, "_active_card", None))
+            writer.cards(self._takeable_cards)
+            writer.cards(self._selected_cards)
+
+    def decode_state(self, reader: Reader) -> None:
+        super().decode_state(reader)
+        self._table = reader.cards()
+        if self._game_status is not GameStatus.NOT_STARTED:
+            self._playing_status = list(ScopaPlayingStatus)[reader.u8()]
+            self._last_taker_id = reader.u8()
+            if (active_card := reader.optional_card()) is not None:
+                self._active_card = active_card
+            self._takeable_cards = reader.cards()
+            self._selected_cards = reader.cards()
+
     def _board_state(self, ws_player: ScopaPlayer | None) -> Iterator[list[Sendable]]:
         # draw cards
         for player_id, player in enumerate(self._players):
@@ -126,78 +294,109 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
         ]
 
         yield ["results", *results]
+        yield from self._results_best()
+
+    def search_state(self) -> ScopaState:
+        capturing = self._playing_status is ScopaPlayingStatus.CAPTURE
+        return ScopaState(
+            hands=[
+                card_mask(card.id for card in player.hand) for player in self._players
+            ],
+            deck=[card.id for card in self._deck],
+            table=card_mask(card.id for card in self._table),
+            player_id=self._current_player_id,
+            last_taker_id=self._last_taker_id,
+            taken=[
+                card_mask(card.id for card in player.points) for player in self._players
+            ],
+            scope=[len(player.scopa_cards) for player in self._players],
+            active=self._active_card.id if capturing else -1,
+            selected=card_mask(card.id for card in self._selected_cards),
+        )
+
+    def _move_commands(self, move: int) -> list[tuple[str, ...]]:
+        card_id, captured = ScopaState.decode_move(move)
+        commands: list[tuple[str, ...]] = []
+        if self._playing_status is ScopaPlayingStatus.HAND:
+            commands.append(("play", str(CARDS[card_id])))
+        commands.extend(
+            ("take_choice", str(CARDS[x]))
+            for x in card_ids(captured)
+            if CARDS[x] not in self._selected_cards
+        )
+        return commands
 
-    async def _prepare_start(self) -> None:
+    def _prepare_start(self) -> None:
         self._table = []
         self._playing_status = ScopaPlayingStatus.HAND
 
         self._last_taker_id = 0
 
-        await super()._prepare_start()
+        super()._prepare_start()
 
-        await self._send(self.current_player, "turn_status", self._playing_status)
+        self._emit(self.current_player, "turn_status", self._playing_status)
 
-    async def _start_game(self) -> None:
-        await self._draw_full_hands()
+    def _start_game(self) -> None:
+        self._draw_full_hands()
 
         for _ in range(self._table_size):
             card = self._deck.pop()
             self._table.append(card)
 
-            await self._send("add_to_table", card)
+            self._emit("add_to_table", card)
 
-    async def _draw_full_hands(self) -> None:
+    def _draw_full_hands(self) -> None:
         for _ in range(self.hand_size):
             for i in range(self.number_of_players):
                 player_id = (self._current_player_id + i) % self.number_of_players
-                await self._draw_card(self._players[player_id])
+                self._draw_card(self._players[player_id])
 
     @cmd(
         current_player=True,
         game_status=GameStatus.STARTED,
         playing_status=ScopaPlayingStatus.HAND,
     )
-    async def cmd_play(self, card: Card) -> None:
+    def cmd_play(self, card: Card) -> None:
         # card not in hand
         if card not in self.current_player.hand:
             msg = "You don't have that card"
             raise CmdError(msg)
 
         # check if the card should be played or if it should just be activated
-        takeable_cards = self._check_playing_card(card)
+        capture = takeable_cards(card, self._table)
 
         # no cards can be taken: play it into the field
-        if not takeable_cards:
-            await self._send("play_card", self._current_player_id, card)
+        if not capture:
+            self._emit("play_card", self._current_player_id, card)
             self.current_player.hand.remove(card)
             self._table.append(card)
 
-            finished = await self._finish_turn()
+            finished = self._finish_turn()
             if finished:
                 return
         # some cards can be taken: change to the capture status and offer to take them
         else:
             self._active_card = card
-            self._takeable_cards = takeable_cards
+            self._takeable_cards = capture
             self._selected_cards = []
-            await self._send("activate_card", self._current_player_id, card)
+            self._emit("activate_card", self._current_player_id, card)
 
-            await self._send(
+            self._emit(
                 self.current_player, "capture_takeable_cards", *self._takeable_cards
             )
 
             self._playing_status = ScopaPlayingStatus.CAPTURE
 
-        await self._send("turn_status", self._playing_status)
+        self._emit("turn_status", self._playing_status)
 
-        await self._send(self.current_player, "turn")
+        self._emit(self.current_player, "turn")
 
     @cmd(
         current_player=True,
         game_status=GameStatus.STARTED,
         playing_status=ScopaPlayingStatus.CAPTURE,
     )
-    async def cmd_take_choice(self, card: Card) -> None:
+    def cmd_take_choice(self, card: Card) -> None:
         # card not among the takeable ones
         if card not in self._takeable_cards and card not in self._selected_cards:
             msg = "You can't swap that card"
@@ -214,34 +413,31 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
             self._takeable_cards.append(card)
 
         # check if the sum is complete
-        selected_sum = sum(self._card_values[c.number] for c in self._selected_cards)
+        selected_sum = sum(CARD_VALUES[c.number] for c in self._selected_cards)
 
         # still send it, even if it is complete, to update the view
         # incomplete sum: recalculate the takeable cards, excuding the cards
         # that have already been taken
-        new_takeable_cards = self._calculate_takeable(
-            self._active_card, self._selected_cards
+        new_takeable_cards = takeable_cards(
+            self._active_card, self._table, self._selected_cards
         )
 
         # changes in the takeable cards: members EITHER before OR after, not both
         delta_takeable_cards = list(old_takeable_cards ^ set(new_takeable_cards))
 
         self._takeable_cards = new_takeable_cards
-        await self._send(
-            self.current_player, "capture_takeable_cards", *delta_takeable_cards
-        )
-        await self._send("capture_selected_cards", card)
+        self._emit(self.current_player, "capture_takeable_cards", *delta_takeable_cards)
+        self._emit("capture_selected_cards", card)
 
-        if selected_sum == self._card_values[self._active_card.number]:
+        if selected_sum == CARD_VALUES[self._active_card.number]:
             # remove cards from hand/table and add them to the "points" array
             self.current_player.hand.remove(self._active_card)
-            self.current_player.points.append(self._active_card)
             self._table = [c for c in self._table if c not in self._selected_cards]
-            self.current_player.points.extend(self._selected_cards)
+            self.current_player.take([self._active_card, *self._selected_cards])
 
             is_scopa = not self._table
             # format: "take", player id, is scopa
-            await self._send("take", self._current_player_id, int(is_scopa))
+            self._emit("take", self._current_player_id, int(is_scopa))
 
             self._last_taker_id = self._current_player_id
 
@@ -253,99 +449,37 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
             # self._active_card = None
             self._takeable_cards = []
             self._selected_cards = []
-            await self._send("turn_status", self._playing_status)
+            self._emit("turn_status", self._playing_status)
 
-            finished = await self._finish_turn()
+            finished = self._finish_turn()
             if finished:
                 return
 
         # yield back the turn to the current player, whichever the result
-        await self._send(self.current_player, "turn")
+        self._emit(self.current_player, "turn")
 
-    async def _finish_turn(self) -> bool:
+    def _finish_turn(self) -> bool:
         self._next_player()
 
         # check if both players have no cards: the turn is finished
         if all(not player.hand for player in self._players):
             # the deck is still full: play the next turn
             if self._deck:
-                await self._draw_full_hands()
+                self._draw_full_hands()
             # the game is over
             else:
                 # send the remaining cards to the last player that took the cards
                 if self._table:
-                    await self._send("take_all", self._last_taker_id)
-                    self._players[self._last_taker_id].points.extend(self._table)
+                    self._emit("take_all", self._last_taker_id)
+                    self._players[self._last_taker_id].take(self._table)
                     self._table.clear()
 
-                await self._end_game()
+                self._end_game()
                 return True
 
         self._playing_status = ScopaPlayingStatus.HAND
         return False
 
-    # check if the card that is played can be used to take or not
-    # if it can take, then the return value is a list of the cards that may be taken
-    def _check_playing_card(self, card: Card) -> list[Card]:
-        # take with the exact same card
-        equipollent_cards = [c for c in self._table if c.number == card.number]
-        # at least one card: take it compulsorily
-        if equipollent_cards:
-            return equipollent_cards
-
-        return self._calculate_takeable(card)
-
-    def _calculate_takeable(
-        self, card: Card, used: list[Card] | None = None
-    ) -> list[Card]:
-        if used is None:
-            used = []
-
-        card_value = self._card_values[card.number]
-        card_value -= sum(self._card_values[c.number] for c in used)
-
-        # only keep cards with smaller or equal value
-        smaller_card_values = sorted(
-            (
-                v
-                for v in (
-                    self._card_values[c.number] for c in self._table if c not in used
-                )
-                if v <= card_value
-            ),
-            reverse=True,
-        )
-        # check which cards can combine to be captured by card_value
-        valid_values = self._check_combinations(card_value, smaller_card_values)
-
-        return [c for c in self._table if self._card_values[c.number] in valid_values]
-
-    # return any card value that may be combined with other cards on the table
-    # to be taken by the played card (card_value)
-    def _check_combinations(
-        self, card_value: int, values: list[int], starting_index: int = 0
-    ) -> list[int]:
-        out = set()
-        for i, v in enumerate(values[starting_index:], start=starting_index):
-            rem_value = card_value - v
-
-            # the selected card (v) is too big for card_value
-            if rem_value < 0:
-                continue
-
-            # "v" is exactly card_value: consider it takeable; skip the recursive step
-            if rem_value == 0:
-                out.add(v)
-                continue
-
-            # the selected card does not fit perfectly: recurse
-            rec_out = self._check_combinations(rem_value, values, i + 1)
-            if rec_out:
-                out.add(v)
-                out.update(rec_out)
-
-        return sorted(out)
-
     # all of the _results_*() functions return a 2-element tuple.
     # the first element is a list containing the points that each "category" assigns to
     # each player.
@@ -366,10 +500,7 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
         return results, details
 
     def _results_denari(self) -> tuple[list[int], list[Sendable]]:
-        scores = [
-            sum(1 for c in player.points if c.suit == Suit.DENARI)
-            for player in self._players
-        ]
+        scores = [player.denari for player in self._players]
 
         details: list[Sendable] = ["results_detail", "denari", *scores]
 
@@ -382,30 +513,14 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
         return results, details
 
     def _results_primiera(self) -> tuple[list[int], list[Sendable]]:
-        card_numbers: list[list[str]] = []
-        scores = []
-
-        for player in self._players:
-            card_numbers.append([])
-            scores.append(0)
-            for suit in Suit:
-                suit_cards = [card for card in player.points if card.suit == suit]
-                card = None
-                card_score = 0
-                if suit_cards:
-                    card = max(
-                        suit_cards,
-                        key=lambda card: self._primiera_card_values[card.number],
-                    )
-                    card_score = self._primiera_card_values[card.number]
-
-                scores[-1] += card_score
-                card_numbers[-1].append(str(card.number) if card is not None else "0")
-
-        primiera_cards = []
-        for i, suit in enumerate(Suit):
+        scores = [player.primiera_score for player in self._players]
+
+        primiera_cards: list[str] = []
+        for suit in Suit:
             primiera_cards.append(str(suit))
-            primiera_cards.extend(cn[i] for cn in card_numbers)
+            for player in self._players:
+                card = player.primiera.get(suit)
+                primiera_cards.append(str(card.number) if card is not None else "0")
 
         details: list[Sendable] = [
             "results_detail",
@@ -425,10 +540,157 @@ class Scopa(BaseGame[ScopaPlayer], number_of_players=2, hand_size=6):
         return results, details
 
     def _results_settebello(self) -> tuple[list[int], list[Sendable]]:
-        out = [
-            1 if Card(suit=Suit.DENARI, number=CardNumber.SETTE) in player.points else 0
-            for player in self._players
-        ]
+        out = [int(player.settebello) for player in self._players]
         details: list[Sendable] = ["results_detail", "settebello", *out]
 
         return out, details
+
+
+@dataclass(slots=True)
+class ScopaState:
+    """A game of Scopa, for the search of the bots.
+
+    Sets of cards are bitmasks of card ids, the deck is drawn from the end. A move
+    packs the id of the card played with the bitmask of the cards it captures, see
+    `decode_move`.
+    """
+
+    hands: list[int]
+    deck: list[int]
+    table: int
+    player_id: int
+    last_taker_id: int
+    taken: list[int]
+    scope: list[int]
+    # the card being played and the cards already selected, during a capture
+    active: int = -1
+    selected: int = 0
+
+    @staticmethod
+    def decode_move(move: int) -> tuple[int, int]:
+        return move & 0x3F, move >> 6
+
+    def moves(self) -> list[int]:
+        if self.active >= 0:
+            playable = [self.active]
+        else:
+            playable = card_ids(self.hands[self.player_id])
+        out: list[int] = []
+        for card_id in playable:
+            if card_captures := captures(VALUES[card_id], self.table):
+                out.extend(
+                    card_id | captured << 6
+                    for captured in card_captures
+                    if captured & self.selected == self.selected
+                )
+            else:
+                out.append(card_id)
+        return out
+
+    def random_move(self, rng: random.Random) -> int:
+        card_id = rng.choice(card_ids(self.hands[self.player_id]))
+        if card_captures := captures(VALUES[card_id], self.table):
+            return card_id | rng.choice(card_captures) << 6
+        return card_id
+
+    def play(self, move: int) -> None:
+        card_id, captured = self.decode_move(move)
+        players = len(self.hands)
+        self.hands[self.player_id] &= ~(1 << card_id)
+        if captured:
+            self.table &= ~captured
+            self.taken[self.player_id] |= captured | 1 << card_id
+            if not self.table:
+                self.scope[self.player_id] += 1
+            self.last_taker_id = self.player_id
+        else:
+            self.table |= 1 << card_id
+        self.active = -1
+        self.selected = 0
+        self.player_id = (self.player_id + 1) % players
+
+        if not any(self.hands):
+            if self.deck:
+                for _ in range(Scopa.hand_size):
+                    for i in range(players):
+                        player_id = (self.player_id + i) % players
+                        self.hands[player_id] |= 1 << self.deck.pop()
+            else:
+                # the cards left on the table go to the last player that took
+                self.taken[self.last_taker_id] |= self.table
+                self.table = 0
+
+    def is_over(self) -> bool:
+        return not any(self.hands) and not self.deck
+
+    def points(self) -> list[int]:
+        """Return the points of each player, like `Scopa._results`."""
+        points = self.scope.copy()
+        suit_shifts = range(0, len(CARDS), len(CardNumber))
+        suit_mask = (1 << len(CardNumber)) - 1
+        for scores in (
+            [taken.bit_count() for taken in self.taken],
+            [(taken & DENARI_MASK).bit_count() for taken in self.taken],
+            [
+                sum(BEST_PRIMIERA[taken >> shift & suit_mask] for shift in suit_shifts)
+                for taken in self.taken
+            ],
+        ):
+            best = max(scores)
+            if scores.count(best) == 1:
+                points[scores.index(best)] += 1
+        for player_id, taken in enumerate(self.taken):
+            points[player_id] += taken >> SETTEBELLO & 1
+        return points
+
+    def copy(self) -> Self:
+        return type(self)(
+            self.hands.copy(),
+            self.deck.copy(),
+            self.table,
+            self.player_id,
+            self.last_taker_id,
+            self.taken.copy(),
+            self.scope.copy(),
+            self.active,
+            self.selected,
+        )
+
+    def key(self) -> tuple[int, ...]:
+        return (
+            self.player_id,
+            self.last_taker_id,
+            self.active,
+            self.selected,
+            self.table,
+            *self.hands,
+            *self.taken,
+            *self.scope,
+            *self.deck,
+        )
+
+    def determinize(self, player_id: int, rng: random.Random) -> Self:
+        hidden = self.deck.copy()
+        for other_id, hand in enumerate(self.hands):
+            if other_id != player_id:
+                hidden += card_ids(hand)
+        rng.shuffle(hidden)
+
+        hands = self.hands.copy()
+        for other_id, hand in enumerate(self.hands):
+            if other_id != player_id:
+                size = hand.bit_count()
+                hands[other_id] = card_mask(hidden[:size])
+                del hidden[:size]
+
+        return type(self)(
+            hands,
+            hidden,
+            self.table,
+            self.player_id,
+            self.last_taker_id,
+            self.taken.copy(),
+            self.scope.copy(),
+            self.active,
+            self.selected,
+        )
@@ -0,0 +1,203 @@
+import math
+import random
+import time
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Protocol, Self
+
+from carte.types import CARDS
+
+# UCB1 exploration constant, for rewards between 0 and 1
+EXPLORATION = 0.7
+
+
+def card_mask(card_ids: Iterable[int]) -> int:
+    """Return the bitmask of a set of cards, with bit n set for the card with id n."""
+    mask = 0
+    for card_id in card_ids:
+        mask |= 1 << card_id
+    return mask
+
+
+# the ids of the cards in each byte of a bitmask, indexed by byte position and value
+_BYTE_CARD_IDS = tuple(
+    tuple(
+        tuple(position * 8 + i for i in range(8) if value >> i & 1)
+        for value in range(256)
+    )
+    for position in range((len(CARDS) + 7) // 8)
+)
+
+
+def card_ids(mask: int) -> list[int]:
+    """Return the ids of the cards in a bitmask, in increasing order."""
+    out: list[int] = []
+    position = 0
+    while mask:
+        if value := mask & 0xFF:
+            out += _BYTE_CARD_IDS[position][value]
+        mask >>= 8
+        position += 1
+    return out
+
+
+class SearchState(Protocol):
+    """A compact, perfect-information copy of a game, as seen by the search.
+
+    Moves are encoded as integers by each game. The hidden cards of a state are only
+    used through `determinize`, which replaces them with a random guess.
+    """
+
+    player_id: int
+    # the cards left to draw
+    deck: list[int]
+
+    def moves(self) -> list[int]: ...
+
+    def random_move(self, rng: random.Random) -> int:
+        """Return a random move, cheaply: it doesn't need to be uniform."""
+        ...
+
+    def play(self, move: int) -> None: ...
+
+    def is_over(self) -> bool: ...
+
+    def points(self) -> list[int]: ...
+
+    def copy(self) -> Self: ...
+
+    def key(self) -> Hashable:
+        """Return the cards and the turn of the state, packed for a lookup table.
+
+        Two states with the same key have the same moves and, from then on, take the
+        same points.
+        """
+        ...
+
+    def determinize(self, player_id: int, rng: random.Random) -> Self:
+        """Return a copy of the state, with the cards hidden to `player_id` shuffled."""
+        ...
+
+
+@dataclass(frozen=True)
+class Budget:
+    """How long a search can think, as a number of playouts and/or in seconds.
+
+    Once all the cards are known, the bots with `solve_endgames` find the best moves
+    exactly instead (see `carte.games.endgame`).
+    """
+
+    playouts: int | None = None
+    seconds: float | None = None
+    solve_endgames: bool = True
+
+    def __post_init__(self) -> None:
+        if self.playouts is None and self.seconds is None:
+            err = "A budget needs a number of playouts or a time"
+            raise ValueError(err)
+
+
+class Difficulty(StrEnum):
+    EASY = "easy"
+    NORMAL = "normal"
+    HARD = "hard"
+
+    @property
+    def budget(self) -> Budget:
+        return _BUDGETS[self]
+
+
+_BUDGETS = {
+    Difficulty.EASY: Budget(playouts=50, solve_endgames=False),
+    Difficulty.NORMAL: Budget(playouts=500),
+    Difficulty.HARD: Budget(playouts=20000, seconds=1.5),
+}
+
+
+class _Node:
+    __slots__ = ("available", "children", "player_id", "reward", "visits")
+
+    def __init__(self, player_id: int) -> None:
+        # the player that made the move leading to this node
+        self.player_id = player_id
+        self.children: dict[int, _Node] = {}
+        self.visits = 0
+        self.reward = 0.0
+        # how many times the move was legal when its parent was visited
+        self.available = 1
+
+    def ucb(self) -> float:
+        return self.reward / self.visits + EXPLORATION * math.sqrt(
+            math.log(self.available) / self.visits
+        )
+
+    def select(self, moves: list[int]) -> tuple[int, _Node]:
+        for move in moves:
+            self.children[move].available += 1
+        move = max(moves, key=lambda x: self.children[x].ucb())
+        return move, self.children[move]
+
+
+def rewards(points: list[int]) -> list[float]:
+    """Split a win between the players with the most points."""
+    best = max(points)
+    winners = points.count(best)
+    return [1 / winners if x == best else 0.0 for x in points]
+
+
+def search(state: SearchState, budget: Budget, seed: int | None = None) -> int:
+    """Pick a move for the current player of `state`.
+
+    This is a single-observer information set Monte Carlo tree search: each playout
+    guesses the hidden cards again, and walks a tree shared by all the guesses, only
+    following the moves that are legal in the current one. It runs until either limit
+    of `budget` is reached, and returns the most visited move.
+    """
+    moves = state.moves()
+    if len(moves) == 1:
+        return moves[0]
+
+    rng = random.Random(seed)
+    root = _Node(-1)
+    deadline = None
+    if budget.seconds is not None:
+        deadline = time.monotonic() + budget.seconds
+    playouts = 0
+
+    while True:
+        determinized = state.determinize(state.player_id, rng)
+        node = root
+        path = [root]
+        # walk the tree down to a move never tried before
+        while not determinized.is_over():
+            moves = determinized.moves()
+            untried = [x for x in moves if x not in node.children]
+            player_id = determinized.player_id
+            if untried:
+                move = rng.choice(untried)
+                child = node.children[move] = _Node(player_id)
+                determinized.play(move)
+                path.append(child)
+                break
+            move, node = node.select(moves)
+            determinized.play(move)
+            path.append(node)
+
+        # finish the game at random
+        while not determinized.is_over():
+            determinized.play(determinized.random_move(rng))
+
+        playout_rewards = rewards(determinized.points())
+        for node in path:
+            node.visits += 1
+            if node.player_id >= 0:
+                node.reward += playout_rewards[node.player_id]
+
+        playouts += 1
+        if budget.playouts is not None and playouts >= budget.playouts:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+    return max(root.children.items(), key=lambda x: x[1].visits)[0]
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from carte.games import BaseGame
+
+logger = logging.getLogger(__name__)
+
+# the memory used by the objects of a game and its players, measured with tracemalloc.
+# The cards are shared by all the games, and the lists holding them never hold more
+# than the 40 cards of the deck
+GAME_OVERHEAD = 16 * 1024
+
+
+def estimate_size(game: BaseGame[Any]) -> int:
+    """Return a rough estimate of the memory used by `game`, in bytes.
+
+    Besides the fixed overhead, the game grows with the names of its players and the
+    messages recorded for its viewers. The estimate is cheap, the game isn't encoded.
+    """
+    names = sum(sys.getsizeof(name) for name in game.player_names)
+    return GAME_OVERHEAD + names + game.replay_size
+
+
+@dataclass(eq=False)
+class _ParkedGame:
+    game: BaseGame[Any]
+    parked_at: float
+    size: int
+
+
+@dataclass
+class IdleGamesMetrics:
+    games: int = 0
+    # the estimated memory used by the idle games, in bytes, see `estimate_size`
+    size: int = 0
+    # the idle games reconnected to, without touching the store
+    hits: int = 0
+    # the games saved to make room for more recent ones
+    evicted: int = 0
+    # the games saved after being idle for `ttl` seconds
+    expired: int = 0
+    # the saves still running
+    pending: int = 0
+    errors: int = 0
+
+
+class IdleGames:
+    """Keep the games without connections in memory, until they go cold.
+
+    A game whose last connection is closed is parked here instead of being saved right
+    away, so that a player reloading the page finds it in memory. The least recently
+    parked games are saved in the background once their estimated size exceeds
+    `max_size` bytes, or after `ttl` seconds. Their commands are already journaled,
+    saving them only replaces the journal with a snapshot.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 64 * 1024 * 1024,
+        ttl: float = 5 * 60,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        # the least recently parked games first
+        self._games: OrderedDict[tuple[str, str], _ParkedGame] = OrderedDict()
+        self._size = 0
+        self._saves: set[asyncio.Task[None]] = set()
+        self._hits = 0
+        self._evicted = 0
+        self._expired = 0
+        self._errors = 0
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def metrics(self) -> IdleGamesMetrics:
+        return IdleGamesMetrics(
+            games=len(self._games),
+            size=self._size,
+            hits=self._hits,
+            evicted=self._evicted,
+            expired=self._expired,
+            pending=len(self._saves),
+            errors=self._errors,
+        )
+
+    def park(self, key: tuple[str, str], game: BaseGame[Any]) -> None:
+        """Keep `game` in memory, evicting the least recent games beyond the budget."""
+        self._pop(key)
+        parked = self._games[key] = _ParkedGame(
+            game, self._clock(), estimate_size(game)
+        )
+        self._size += parked.size
+        while self._size > self.max_size:
+            self._evicted += 1
+            self._save(self._pop_oldest().game)
+
+    def take(self, key: tuple[str, str]) -> None:
+        """Unpark the game `key`, when a connection to it is opened."""
+        if self._pop(key) is not None:
+            self._hits += 1
+
+    def expire(self) -> None:
+        """Save the games parked for longer than `ttl` seconds."""
+        now = self._clock()
+        while (
+            self._games and now - next(iter(self._games.values())).parked_at > self.ttl
+        ):
+            self._expired += 1
+            self._save(self._pop_oldest().game)
+
+    def start(self, interval: float = 10) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def close(self) -> None:
+        """Save every parked game, and wait for the saves to be done."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._games:
+            self._save(self._pop_oldest().game)
+        await asyncio.gather(*self._saves, return_exceptions=True)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.expire()
+
+    def _pop(self, key: tuple[str, str]) -> _ParkedGame | None:
+        parked = self._games.pop(key, None)
+        if parked is not None:
+            self._size -= parked.size
+        return parked
+
+    def _pop_oldest(self) -> _ParkedGame:
+        _, parked = self._games.popitem(last=False)
+        self._size -= parked.size
+        return parked
+
+    def _save(self, game: BaseGame[Any]) -> None:
+        if game.journal is None:
+            return
+        # the task keeps the game in memory until it's saved, a connection opened in
+        # the meantime finds it there
+        task = asyncio.create_task(game.journal.snapshot(game))
+        self._saves.add(task)
+        task.add_done_callback(self._save_done)
+
+    def _save_done(self, task: asyncio.Task[None]) -> None:
+        self._saves.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            self._errors += 1
+            logger.error("Couldn't save an idle game", exc_info=e)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any
+
+from carte.store import GameStore
+from carte.types import JournalEntry, SavedGame
+
+if TYPE_CHECKING:
+    from carte.games.base import BaseGame, Player
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """Append-only log of the commands accepted by a game.
+
+    Every accepted command is appended to the journal of the game in the store, and a
+    full snapshot replaces the journal every `snapshot_interval` commands, whenever the
+    status of the game changes and when the game goes cold after its last connection is
+    closed.
+
+    Replaying the start of a game is deterministic, its deck is shuffled by a generator
+    derived from the seed of the game. But a game starts when the last player joins,
+    and the players seated by the connections aren't journaled. Snapshotting on status
+    changes also keeps the status and the players listed by the store up to date.
+    """
+
+    def __init__(
+        self,
+        store: GameStore,
+        game_type: str,
+        game_id: str,
+        *,
+        snapshot_interval: int = 50,
+        entries: int = 0,
+    ) -> None:
+        self._store = store
+        self._game_type = game_type
+        self._game_id = game_id
+        self._snapshot_interval = snapshot_interval
+        self._entries = entries
+        # writes must reach the store in order
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def restore(
+        cls, store: GameStore, game_type: str, game_id: str
+    ) -> BaseGame[Player] | None:
+        """Rebuild a game from its last snapshot and the commands journaled after it.
+
+        A journal that can't be decoded or replayed is dropped, and the game is rebuilt
+        from its last snapshot alone: otherwise every new connection would fail the same
+        way.
+        """
+        saved_game = await store.load(game_type, game_id)
+        if saved_game is None or not saved_game.is_valid:
+            return None
+
+        game = saved_game.game
+        try:
+            entries = await store.load_journal(game_type, game_id)
+        except ValueError:
+            logger.exception("Couldn't decode the journal of %s/%s", game_type, game_id)
+            return await cls._drop_journal(store, game_type, game_id)
+        try:
+            for entry in entries:
+                game.replay_cmd(entry)
+        except Exception:
+            logger.exception("Couldn't replay the journal of %s/%s", game_type, game_id)
+            return await cls._drop_journal(store, game_type, game_id)
+
+        game.journal = cls(store, game_type, game_id, entries=len(entries))
+        return game
+
+    @classmethod
+    async def _drop_journal(
+        cls, store: GameStore, game_type: str, game_id: str
+    ) -> BaseGame[Player] | None:
+        # load the snapshot again, a command that failed could have been partially
+        # applied to the game
+        saved_game = await store.load(game_type, game_id)
+        if saved_game is None:
+            return None
+        game = saved_game.game
+        game.journal = cls(store, game_type, game_id)
+        await game.journal.snapshot(game)
+        return game
+
+    async def append(self, game: BaseGame[Any], entry: JournalEntry) -> None:
+        await self.extend(game, [entry])
+
+    async def extend(self, game: BaseGame[Any], entries: list[JournalEntry]) -> None:
+        """Append several commands, `game` being the state after all of them."""
+        if self._entries + len(entries) > self._snapshot_interval:
+            await self.snapshot(game)
+            return
+
+        async with self._lock:
+            for entry in entries:
+                await self._store.append(self._game_type, self._game_id, entry)
+            self._entries += len(entries)
+
+    async def snapshot(self, game: BaseGame[Any]) -> None:
+        async with self._lock:
+            await self._store.save(self._game_type, self._game_id, SavedGame(game))
+            self._entries = 0
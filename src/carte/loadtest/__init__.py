@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import aiohttp
+
+from carte.loadtest.client import Client, ClientStats
+from carte.monitor import LoopLagMetrics, LoopLagMonitor
+
+__all__ = ["Client", "ClientStats", "Report", "run"]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Report:
+    clients: int
+    # the clients that didn't finish their games in time
+    unfinished: int
+    games: int
+    moves: int
+    seconds: float
+    # seconds
+    round_trip_p50: float
+    round_trip_p95: float
+    round_trip_p99: float
+    frames_per_second: float
+    messages_per_second: float
+    reconnects: int
+    unseated: int
+    errors: int
+    # the lag of the event loop of the load generator: when it's high, the clients
+    # are the bottleneck and the other numbers are pessimistic
+    client_loop_lag: LoopLagMetrics
+    # as reported by /status.json, over its most recent samples
+    server_loop_lag: dict[str, Any] | None
+
+
+def percentiles(values: list[float]) -> tuple[float, float, float]:
+    """Return the 50th, 95th and 99th percentiles of `values`."""
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def _server_loop_lag(
+    session: aiohttp.ClientSession, base_url: str
+) -> dict[str, Any] | None:
+    try:
+        async with session.get(f"{base_url}/status.json?limit=1") as response:
+            status: dict[str, Any] = await response.json()
+    except aiohttp.ClientError:
+        return None
+    return status.get("loop_lag")
+
+
+async def run(
+    base_url: str,
+    game_type: str,
+    *,
+    clients: int,
+    games: int = 1,
+    disconnect_rate: float = 0.01,
+    think_time: float = 0.0,
+    duration: float | None = None,
+    seed: int | None = None,
+) -> Report:
+    """Play `games` games with each of `clients` simulated players, in pairs.
+
+    The clients connect at the same time, so that the server pairs them up through
+    the waiting table of `game_type`. They are stopped after `duration` seconds, if
+    they haven't finished yet.
+    """
+    if clients % 2:
+        err = "The clients play in pairs, their number must be even"
+        raise ValueError(err)
+
+    rng = random.Random(seed)
+    monitor = LoopLagMonitor(interval=0.05, window=1_000_000)
+    monitor.start()
+    # each client has its own cookies, i.e. its own session on the server
+    sessions = [
+        aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+        for _ in range(clients)
+    ]
+    try:
+        players = [
+            Client(
+                session,
+                base_url,
+                game_type,
+                games=games,
+                disconnect_rate=disconnect_rate,
+                think_time=think_time,
+                rng=random.Random(rng.randbytes(16)),
+            )
+            for session in sessions
+        ]
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(player.run()) for player in players]
+        done, pending = await asyncio.wait(tasks, timeout=duration)
+        seconds = time.perf_counter() - start
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # the clients that failed are reported as unfinished
+        for task in done:
+            if (e := task.exception()) is not None:
+                logger.error("Client error", exc_info=e)
+
+        server_loop_lag = await _server_loop_lag(sessions[0], base_url)
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+        await monitor.stop()
+
+    stats = [player.stats for player in players]
+    round_trips = [x for s in stats for x in s.round_trips]
+    p50, p95, p99 = percentiles(round_trips)
+    return Report(
+        clients=clients,
+        unfinished=sum(s.games < games for s in stats),
+        games=sum(s.games for s in stats) // 2,
+        moves=len(round_trips),
+        seconds=seconds,
+        round_trip_p50=p50,
+        round_trip_p95=p95,
+        round_trip_p99=p99,
+        frames_per_second=sum(s.frames for s in stats) / seconds,
+        messages_per_second=sum(s.messages for s in stats) / seconds,
+        reconnects=sum(s.reconnects for s in stats),
+        unseated=sum(s.unseated for s in stats),
+        errors=sum(s.errors for s in stats),
+        client_loop_lag=monitor.metrics,
+        server_loop_lag=server_loop_lag,
+    )
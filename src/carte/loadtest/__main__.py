@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import socket
+import sys
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+
+import aiohttp
+
+from carte.games import BaseGame
+from carte.loadtest import Report, run
+
+
+@asynccontextmanager
+async def local_server() -> AsyncIterator[str]:
+    """Start a server in another process, with its own empty data directory."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with tempfile.TemporaryDirectory() as data_path:
+        env = os.environ | {"PORT": str(port), "DATA_PATH": data_path}
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "carte", env=env, stdout=asyncio.subprocess.DEVNULL
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            async with aiohttp.ClientSession() as session:
+                for _ in range(100):
+                    try:
+                        async with session.get(base_url):
+                            break
+                    except aiohttp.ClientConnectionError:
+                        await asyncio.sleep(0.1)
+                else:
+                    err = "The server didn't start"
+                    raise RuntimeError(err)
+            yield base_url
+        finally:
+            process.terminate()
+            await process.wait()
+
+
+def print_report(report: Report) -> None:
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:.1f} ms"
+
+    print(f"clients:          {report.clients} ({report.unfinished} unfinished)")
+    print(f"games:            {report.games} in {report.seconds:.1f}s")
+    print(f"moves:            {report.moves} ({report.moves / report.seconds:,.0f}/s)")
+    print(
+        f"move round trip:  p50 {ms(report.round_trip_p50)}, "
+        f"p95 {ms(report.round_trip_p95)}, p99 {ms(report.round_trip_p99)}"
+    )
+    print(
+        f"frames:           {report.frames_per_second:,.0f}/s "
+        f"({report.messages_per_second:,.0f} messages/s)"
+    )
+    print(f"reconnects:       {report.reconnects}")
+    print(f"unseated:         {report.unseated}")
+    print(f"errors:           {report.errors}")
+    lag = report.client_loop_lag
+    print(f"client loop lag:  p50 {ms(lag.p50)}, p99 {ms(lag.p99)}, max {ms(lag.max)}")
+    if (server_lag := report.server_loop_lag) is not None:
+        print(
+            f"server loop lag:  p50 {ms(server_lag['p50'])}, "
+            f"p99 {ms(server_lag['p99'])}, max {ms(server_lag['max'])}"
+        )
+
+
+async def main_async(args: argparse.Namespace) -> Report:
+    server = local_server() if args.url is None else nullcontext(args.url.rstrip("/"))
+    async with server as base_url:
+        return await run(
+            base_url,
+            args.game,
+            clients=args.clients,
+            games=args.games,
+            disconnect_rate=args.disconnect_rate,
+            think_time=args.think_time,
+            duration=args.duration,
+            seed=args.seed,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m carte.loadtest",
+        description="Play games against a server with simulated clients.",
+    )
+    parser.add_argument("game", choices=BaseGame.GAMES)
+    parser.add_argument("--url", help="the server to test (default: start one locally)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--games", type=int, default=1, help="games per client")
+    parser.add_argument(
+        "--disconnect-rate",
+        type=float,
+        default=0.01,
+        help="chance of reconnecting after each frame received (default: 0.01)",
+    )
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="maximum seconds waited before each move (default: 0)",
+    )
+    parser.add_argument("--duration", type=float, help="stop after some seconds")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-o", "--output", type=Path, help="save the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(dataclasses.asdict(report), indent=2) + "\n")
+    if report.unfinished:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
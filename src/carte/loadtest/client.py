@@ -0,0 +1,215 @@
+import asyncio
+import random
+import secrets
+import time
+from dataclasses import dataclass, field
+
+import aiohttp
+
+
+@dataclass
+class ClientStats:
+    # seconds between sending a move and receiving the first frame after it
+    round_trips: list[float] = field(default_factory=list)
+    frames: int = 0
+    messages: int = 0
+    games: int = 0
+    reconnects: int = 0
+    # connections that found their table already full, and only watched it
+    unseated: int = 0
+    errors: int = 0
+
+
+class Client:
+    """A simulated player, connected like the browser client.
+
+    It follows the messages of the server to know its hand, and plays a random legal
+    move each time it's its turn. After some frames it drops the connection, and
+    reconnects with the resume protocol.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        base_url: str,
+        game_type: str,
+        *,
+        games: int,
+        disconnect_rate: float,
+        think_time: float,
+        rng: random.Random,
+    ) -> None:
+        self.stats = ClientStats()
+        self._session = session
+        self._base_url = base_url
+        self._game_type = game_type
+        self._games = games
+        self._disconnect_rate = disconnect_rate
+        self._think_time = think_time
+        self._rng = rng
+        self._name = f"load-{secrets.token_hex(4)}"
+        self._viewer_id = secrets.token_hex()
+        self._game_id: str | None = None
+        self._epoch: str | None = None
+        self._last_seq: str | None = None
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        # the state of the game, as far as the policy is concerned
+        self._player_id: str | None = None
+        self._hand: set[str] = set()
+        self._briscola: str | None = None
+        self._capturing = False
+        self._takeable: set[str] = set()
+        self._selected: set[str] = set()
+        self._turn = False
+        # whether the results of the current game were received, and whether they
+        # still need a rematch
+        self._game_over = False
+        self._ended = False
+        # the messages between "animations|off" and "animations|on" restore the state
+        # of the game after a reconnection
+        self._restoring = False
+        self._move_sent_at: float | None = None
+        self._resync = False
+        self._unseated = False
+
+    async def run(self) -> None:
+        await self._connect()
+        try:
+            while self.stats.games < self._games:
+                assert self._ws is not None
+                msg = await self._ws.receive()
+                if msg.type is not aiohttp.WSMsgType.TEXT:
+                    # the server closed the connection, join the game again
+                    await self._reconnect()
+                    continue
+                self._on_frame(msg.data)
+
+                if self._unseated:
+                    await self._find_table()
+                    continue
+                if self._rng.random() < self._disconnect_rate:
+                    await self._reconnect()
+                if self._resync:
+                    # the move was refused, the state of the client is wrong
+                    self._resync = False
+                    self._turn = False
+                    await self._send("current_state")
+                if self._ended:
+                    self._ended = False
+                    if self.stats.games < self._games:
+                        await self._send("rematch")
+                if self._turn:
+                    await self._play()
+        finally:
+            if self._ws is not None:
+                await self._ws.close()
+
+    async def _connect(self) -> None:
+        url = f"{self._base_url}/ws/{self._game_type}"
+        if self._game_id is not None:
+            url += f"/{self._game_id}"
+        self._ws = await self._session.ws_connect(
+            url, params={"multiline": "1", "viewer": self._viewer_id}
+        )
+        if self._epoch is not None and self._last_seq is not None:
+            await self._send("resume", self._epoch, self._last_seq, self._name)
+        else:
+            await self._send("join", self._name)
+
+    async def _find_table(self) -> None:
+        self.stats.unseated += 1
+        self._unseated = False
+        self._game_id = self._epoch = self._last_seq = None
+        if self._ws is not None:
+            await self._ws.close()
+        await self._connect()
+
+    async def _reconnect(self) -> None:
+        self.stats.reconnects += 1
+        if self._ws is not None:
+            await self._ws.close()
+        await self._connect()
+
+    async def _send(self, *args: str) -> None:
+        assert self._ws is not None
+        await self._ws.send_str("|".join(args))
+
+    async def _play(self) -> None:
+        if self._think_time:
+            await asyncio.sleep(self._rng.uniform(0, self._think_time))
+        if self._capturing:
+            choices = sorted(self._takeable - self._selected)
+            cmd = "take_choice"
+        else:
+            choices = sorted(self._hand)
+            cmd = "play"
+        if not choices:
+            # out of sync, ask for the whole state again
+            self.stats.errors += 1
+            self._turn = False
+            await self._send("current_state")
+            return
+        self._turn = False
+        self._move_sent_at = time.perf_counter()
+        await self._send(cmd, self._rng.choice(choices))
+
+    def _on_frame(self, data: str) -> None:
+        if self._move_sent_at is not None:
+            self.stats.round_trips.append(time.perf_counter() - self._move_sent_at)
+            self._move_sent_at = None
+        self.stats.frames += 1
+        for line in data.split("\n"):
+            self.stats.messages += 1
+            seq, cmd, *args = line.split("|")
+            self._last_seq = seq
+            self._on_message(cmd, args)
+
+    def _on_message(self, cmd: str, args: list[str]) -> None:
+        match cmd:
+            case "game_id":
+                self._game_id = args[0]
+            case "epoch":
+                self._epoch = args[0]
+            case "player_id":
+                self._player_id = args[0]
+            case "animations":
+                self._restoring = args[0] == "off"
+            case "begin":
+                if self._player_id is None:
+                    self._unseated = True
+                if not self._restoring:
+                    self._game_over = False
+                self._hand.clear()
+                self._capturing = False
+                self._takeable.clear()
+                self._selected.clear()
+                self._turn = False
+            case "turn":
+                self._turn = True
+            case "draw_card" if args[0] == self._player_id and len(args) > 1:
+                self._hand.add(args[1])
+            case "show_briscola":
+                self._briscola = args[0]
+            case "draw_briscola" if args[0] == self._player_id:
+                assert self._briscola is not None
+                self._hand.add(self._briscola)
+            case "play_card" | "activate_card" if args[0] == self._player_id:
+                self._hand.discard(args[1])
+            case "turn_status":
+                self._capturing = args[0] == "capture"
+                if not self._capturing:
+                    self._takeable.clear()
+                    self._selected.clear()
+            case "capture_takeable_cards":
+                # the cards that changed since the last update
+                self._takeable.symmetric_difference_update(args)
+            case "capture_selected_cards":
+                self._selected.symmetric_difference_update(args)
+            case "results" if not self._game_over:
+                self.stats.games += 1
+                self._game_over = True
+                self._ended = True
+                self._turn = False
+            case "error":
+                self.stats.errors += 1
+                self._resync = True
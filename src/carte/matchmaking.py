@@ -0,0 +1,195 @@
+import asyncio
+import secrets
+import statistics
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+
+@dataclass
+class MatchmakingMetrics:
+    # the players with a seat at a table that isn't complete yet
+    waiting: int = 0
+    tables: int = 0
+    # the tables completed since the start
+    matched: int = 0
+    # the tables whose players all left before it was complete
+    abandoned: int = 0
+    # the seats given to a player that never sat down
+    timed_out: int = 0
+    # seconds the players waited for their table to be complete, over the most recent
+    # tables
+    wait_p50: float = 0.0
+    wait_p99: float = 0.0
+    wait_max: float = 0.0
+
+
+@dataclass(eq=False)
+class _Table:
+    game_type: str
+    game_id: str
+    capacity: int
+    # when each seat was given, and whether its player is connected
+    seats: dict[str, tuple[float, bool]] = field(default_factory=dict)
+    # whether the table is in the queue of its game type
+    queued: bool = False
+    emptied_at: float | None = None
+
+    @property
+    def complete(self) -> bool:
+        return len(self.seats) == self.capacity and all(
+            connected for _, connected in self.seats.values()
+        )
+
+
+class Matchmaker:
+    """Seat the players looking for a game at the tables waiting for players.
+
+    Each game type has a queue of tables, the oldest table with a free seat is filled
+    first. A seat is reserved as soon as a table is found, and kept for `timeout`
+    seconds until its player connects. A table whose players all left is offered to the
+    next players for `timeout` seconds, then it's abandoned.
+    """
+
+    def __init__(
+        self,
+        capacities: dict[str, int],
+        *,
+        timeout: float = 30,
+        window: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.timeout = timeout
+        self._capacities = capacities
+        self._clock = clock
+        self._queues: dict[str, deque[_Table]] = {k: deque() for k in capacities}
+        self._tables: dict[tuple[str, str], _Table] = {}
+        self._tickets: dict[tuple[str, str], _Table] = {}
+        self._waits: deque[float] = deque(maxlen=window)
+        self._matched = 0
+        self._abandoned = 0
+        self._timed_out = 0
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def metrics(self) -> MatchmakingMetrics:
+        metrics = MatchmakingMetrics(
+            waiting=len(self._tickets),
+            tables=len(self._tables),
+            matched=self._matched,
+            abandoned=self._abandoned,
+            timed_out=self._timed_out,
+        )
+        if self._waits:
+            waits = sorted(self._waits)
+            metrics.wait_p50 = statistics.median(waits)
+            metrics.wait_p99 = waits[min(len(waits) - 1, int(len(waits) * 0.99))]
+            metrics.wait_max = waits[-1]
+        return metrics
+
+    def find_table(self, game_type: str, session_id: str) -> str:
+        """Reserve a seat for `session_id`, and return the id of its game."""
+        if (table := self._tickets.get((game_type, session_id))) is not None:
+            # the player is already waiting, e.g. after reloading the page
+            return table.game_id
+
+        queue = self._queues[game_type]
+        # the tables that were completed or abandoned are removed lazily
+        while queue and (
+            self._tables.get((game_type, queue[0].game_id)) is not queue[0]
+            or len(queue[0].seats) >= queue[0].capacity
+        ):
+            queue.popleft().queued = False
+        if queue:
+            table = queue[0]
+        else:
+            table = _Table(game_type, secrets.token_hex(), self._capacities[game_type])
+            self._tables[game_type, table.game_id] = table
+            self._enqueue(table)
+
+        self._reserve(table, session_id, connected=False)
+        if len(table.seats) >= table.capacity:
+            queue.popleft().queued = False
+        return table.game_id
+
+    def seated(self, game_type: str, game_id: str, session_id: str) -> None:
+        """Confirm the seat of a player connected to a game that didn't start yet."""
+        table = self._tables.get((game_type, game_id))
+        if table is None:
+            # a private table, or one that was already complete
+            return
+        if session_id not in table.seats:
+            # e.g. the player followed a link to the table
+            if (
+                len(table.seats) >= table.capacity
+                or (game_type, session_id) in self._tickets
+            ):
+                return
+            self._reserve(table, session_id, connected=True)
+        else:
+            reserved_at, _ = table.seats[session_id]
+            table.seats[session_id] = reserved_at, True
+
+        if table.complete:
+            now = self._clock()
+            for sid, (reserved_at, _) in table.seats.items():
+                self._waits.append(now - reserved_at)
+                del self._tickets[game_type, sid]
+            del self._tables[game_type, game_id]
+            self._matched += 1
+
+    def left(self, game_type: str, game_id: str, session_id: str) -> None:
+        """Free the seat of a player that left a game before it started."""
+        table = self._tables.get((game_type, game_id))
+        if table is not None and session_id in table.seats:
+            self._release(table, session_id)
+
+    def expire(self) -> None:
+        """Free the seats reserved for too long, and drop the abandoned tables."""
+        now = self._clock()
+        for table in list(self._tables.values()):
+            for session_id, (reserved_at, connected) in list(table.seats.items()):
+                if not connected and now - reserved_at > self.timeout:
+                    self._release(table, session_id)
+                    self._timed_out += 1
+            if table.emptied_at is not None and now - table.emptied_at > self.timeout:
+                del self._tables[table.game_type, table.game_id]
+                self._abandoned += 1
+
+    def start(self, interval: float = 1) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.expire()
+
+    def _enqueue(self, table: _Table, *, first: bool = False) -> None:
+        if table.queued:
+            return
+        table.queued = True
+        if first:
+            self._queues[table.game_type].appendleft(table)
+        else:
+            self._queues[table.game_type].append(table)
+
+    def _reserve(self, table: _Table, session_id: str, *, connected: bool) -> None:
+        table.seats[session_id] = self._clock(), connected
+        table.emptied_at = None
+        self._tickets[table.game_type, session_id] = table
+
+    def _release(self, table: _Table, session_id: str) -> None:
+        del table.seats[session_id]
+        del self._tickets[table.game_type, session_id]
+        if not table.seats:
+            table.emptied_at = self._clock()
+        # the oldest tables are filled first
+        self._enqueue(table, first=True)
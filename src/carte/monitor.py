@@ -0,0 +1,55 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass
+class LoopLagMetrics:
+    # seconds, over the most recent samples
+    p50: float = 0.0
+    p99: float = 0.0
+    max: float = 0.0
+    samples: int = 0
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up a task sleeping for `interval`.
+
+    The lag is the time every other callback waited for the ones hogging the loop. The
+    last `window` samples are kept, a minute by default.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600) -> None:
+        self.interval = interval
+        self._lags: deque[float] = deque(maxlen=window)
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def metrics(self) -> LoopLagMetrics:
+        if not self._lags:
+            return LoopLagMetrics()
+        lags = sorted(self._lags)
+        return LoopLagMetrics(
+            p50=statistics.median(lags),
+            p99=lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+            max=lags[-1],
+            samples=len(lags),
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._lags.append(max(0.0, time.perf_counter() - start - self.interval))
@@ -0,0 +1,47 @@
+import sys
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from carte.games.base import Player
+
+# the memory used by a recorded message besides its text: the tuple, the sequence number
+# and the slot in the ring
+_RECORD_SIZE = sys.getsizeof((0, "")) + sys.getsizeof(2**32) + 8
+
+
+class Viewer:
+    """A client following a game, identified across its reconnections.
+
+    Every message sent to the viewer is recorded with its sequence number in a bounded
+    ring, so that a client reconnecting with the last sequence number it received can
+    be sent just the messages it missed.
+    """
+
+    def __init__(
+        self, player: Player | None, *, since: int = 0, maxlen: int = 1024
+    ) -> None:
+        self.player = player
+        self._messages: deque[tuple[int, str]] = deque(maxlen=maxlen)
+        # sequence number of the last message pushed out of the ring, or of the last
+        # one sent before the viewer was created
+        self._evicted = since
+        # the estimated memory used by the ring, in bytes. The text of a broadcast is
+        # shared by the viewers, but counted for each of them
+        self.size = 0
+
+    def record(self, seq: int, msg: str) -> None:
+        if len(self._messages) == self._messages.maxlen:
+            self._evicted, evicted_msg = self._messages[0]
+            self.size -= _RECORD_SIZE + sys.getsizeof(evicted_msg)
+        self._messages.append((seq, msg))
+        self.size += _RECORD_SIZE + sys.getsizeof(msg)
+
+    def missed(self, seq: int) -> list[tuple[int, str]] | None:
+        """Return the messages recorded after `seq`.
+
+        Return None if some of them were already pushed out of the ring.
+        """
+        if seq < self._evicted:
+            return None
+        return [(x, msg) for x, msg in self._messages if x > seq]
@@ -1,6 +1,10 @@
+import asyncio
+import base64
+import dataclasses
+import json
 import secrets
-import shelve
 from collections.abc import Mapping
+from datetime import UTC, datetime
 from typing import Any
 
 import aiohttp_jinja2
@@ -9,7 +13,11 @@ from aiohttp import web
 from carte import app_keys
 from carte.exc import CmdError
 from carte.games import BaseGame
-from carte.types import GameStatus, SavedGame
+from carte.games.base import MULTILINE_FRAMES
+from carte.games.search import Difficulty
+from carte.journal import Journal
+from carte.send_queue import SEND_QUEUE, SendQueue
+from carte.types import GameStatus
 
 routes = web.RouteTableDef()
 
@@ -20,19 +28,133 @@ async def index(request: web.Request) -> Mapping[str, Any]:  # noqa: ARG001
     return {}
 
 
+def _encode_cursor(last_saved: datetime, game_type: str, game_id: str) -> str:
+    data = json.dumps([last_saved.timestamp(), game_type, game_id])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str, str]:
+    try:
+        timestamp, game_type, game_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromtimestamp(timestamp, UTC), str(game_type), str(game_id)
+    except (TypeError, ValueError) as e:
+        raise web.HTTPBadRequest from e
+
+
+async def _status(request: web.Request) -> dict[str, Any]:
+    game_type = request.query.get("game_type") or None
+    if game_type is not None and game_type not in BaseGame.GAMES:
+        raise web.HTTPBadRequest
+    try:
+        status = GameStatus[request.query["status"]]
+    except KeyError as e:
+        if request.query.get("status"):
+            raise web.HTTPBadRequest from e
+        status = None
+    try:
+        limit = min(max(int(request.query.get("limit", 50)), 1), 500)
+    except ValueError as e:
+        raise web.HTTPBadRequest from e
+    after = None
+    if cursor := request.query.get("cursor"):
+        after = _decode_cursor(cursor)
+
+    # fetch one more game to know whether there is a next page
+    infos = await request.app[app_keys.games_store].index(
+        game_type=game_type, status=status, after=after, limit=limit + 1
+    )
+    next_cursor = None
+    if len(infos) > limit:
+        infos = infos[:limit]
+        last = infos[-1]
+        next_cursor = _encode_cursor(last.last_saved, last.game_type, last.game_id)
+
+    # the metadata of the games in memory is fresher than the saved one
+    active_games = request.app[app_keys.games]
+    games = []
+    for info in infos:
+        active_game = active_games.get((info.game_type, info.game_id))
+        games.append(
+            {
+                "game_type": info.game_type,
+                "game_id": info.game_id,
+                "game_name": BaseGame.GAMES[info.game_type].game_name,
+                "status": (
+                    active_game.game_status if active_game else info.status
+                ).name,
+                "players": active_game.player_names if active_game else info.players,
+                "last_saved": info.last_saved.isoformat(),
+                "active": active_game is not None,
+                "connections": len(active_game.websockets) if active_game else 0,
+            }
+        )
+
+    return {
+        "active_games": len(active_games),
+        "connections": len(request.app[app_keys.websockets]),
+        "bots": dataclasses.asdict(request.app[app_keys.bot_pool].metrics),
+        "loop_lag": dataclasses.asdict(request.app[app_keys.loop_lag_monitor].metrics),
+        "idle_games": dataclasses.asdict(request.app[app_keys.idle_games].metrics),
+        "games": games,
+        "next_cursor": next_cursor,
+    }
+
+
 @routes.get("/status")
 @aiohttp_jinja2.template("status.html")
 async def status(request: web.Request) -> Mapping[str, Any]:
-    with shelve.open(request.app[app_keys.games_shelf_path]) as shelf:
-        saved_games = {
-            key.partition("__")[::2]: saved_game.game
-            for key, saved_game in shelf.items()
-            if saved_game.is_valid
+    context = await _status(request)
+    # `games` is already a jinja global, listing the available game types
+    context["status_games"] = context.pop("games")
+    if context["next_cursor"] is not None:
+        context["next_url"] = request.rel_url.update_query(
+            cursor=context["next_cursor"]
+        )
+    return context
+
+
+@routes.get("/status.json")
+async def status_json(request: web.Request) -> web.Response:
+    return web.json_response(await _status(request))
+
+
+@routes.get("/status/queues.json")
+async def status_queues_json(request: web.Request) -> web.Response:
+    queues = [
+        {
+            "game_type": game_type,
+            "game_id": game_id,
+            "peer": send_queue.peer,
+            "policy": send_queue.policy,
+            "maxsize": send_queue.maxsize,
+            **dataclasses.asdict(send_queue.metrics),
         }
-    return {
-        "active_games": request.app[app_keys.games],
-        "saved_games": saved_games,
-    }
+        for (game_type, game_id), active_game in request.app[app_keys.games].items()
+        for ws in active_game.websockets
+        if (send_queue := ws.get(SEND_QUEUE)) is not None
+    ]
+    # the connections that struggled the most first
+    queues.sort(key=lambda x: (x["overflows"], x["max_depth"]), reverse=True)
+    inboxes = [
+        {
+            "game_type": game_type,
+            "game_id": game_id,
+            "depth": active_game.inbox_depth,
+            "max_depth": active_game.max_inbox_depth,
+            "send_errors": active_game.send_errors,
+        }
+        for (game_type, game_id), active_game in request.app[app_keys.games].items()
+    ]
+    inboxes.sort(key=lambda x: (x["max_depth"], x["depth"]), reverse=True)
+    return web.json_response({"queues": queues, "inboxes": inboxes})
+
+
+@routes.get("/status/matchmaking.json")
+async def status_matchmaking_json(request: web.Request) -> web.Response:
+    if (matchmaker := request.app.get(app_keys.matchmaker)) is None:
+        # with several workers, the front process answers instead
+        raise web.HTTPMisdirectedRequest
+    return web.json_response(dataclasses.asdict(matchmaker.metrics))
 
 
 @routes.get("/{game_type}", name="game")
@@ -47,41 +169,84 @@ async def game(request: web.Request) -> Mapping[str, Any]:
 @routes.get("/ws/{game_type}")
 @routes.get("/ws/{game_type}/{game_id}")
 async def websocket(request: web.Request) -> web.WebSocketResponse:
+    worker = request.app.get(app_keys.worker)
+    # the table found by the front process, when there are several workers
+    assignment = worker.assignment(request) if worker is not None else None
     try:
         session_id = request.cookies["session_id"]
     except KeyError:
-        session_id = secrets.token_hex()
+        if assignment is not None:
+            session_id = assignment.session_id
+        else:
+            session_id = secrets.token_hex()
+    tables = worker if worker is not None else request.app[app_keys.matchmaker]
 
     game_type = request.match_info["game_type"]
+    if game_type not in BaseGame.GAMES:
+        raise web.HTTPBadRequest
+    difficulty = None
+    if bot := request.query.get("bot"):
+        try:
+            difficulty = Difficulty(bot)
+        except ValueError as e:
+            raise web.HTTPBadRequest from e
     try:
         game_id = request.match_info["game_id"]
     except KeyError:
-        try:
-            game_id = BaseGame.WAITING_GAMES_IDS[BaseGame.GAMES[game_type]]
-        except KeyError:
+        if assignment is not None:
+            game_id = assignment.game_id
+        elif difficulty is not None:
+            # tables against the bots don't wait for other players
             game_id = secrets.token_hex()
-            BaseGame.WAITING_GAMES_IDS[BaseGame.GAMES[game_type]] = game_id
+        elif worker is None:
+            game_id = request.app[app_keys.matchmaker].find_table(game_type, session_id)
+        else:
+            # the front process finds the tables
+            raise web.HTTPMisdirectedRequest from None
+    if worker is not None and not worker.owns(game_id):
+        # only the worker that owns a game may load it
+        raise web.HTTPMisdirectedRequest
 
-    game = request.app[app_keys.games].get((game_type, game_id))
+    games = request.app[app_keys.games]
+    store = request.app[app_keys.games_store]
+    game = games.get((game_type, game_id))
     if game is None:
-        with shelve.open(request.app[app_keys.games_shelf_path]) as shelf:
-            saved_game = shelf.get(f"{game_type}__{game_id}")
-            if saved_game and saved_game.is_valid:
-                game = saved_game.game
-                del shelf[f"{game_type}__{game_id}"]
+        restored_game = await Journal.restore(store, game_type, game_id)
+        # another connection might have restored the same game in the meantime
+        game = games.get((game_type, game_id), restored_game)
     if game is None:
         try:
             game = BaseGame.GAMES[game_type](game_id)
         except (KeyError, ValueError) as e:
             raise web.HTTPBadRequest from e
-    request.app[app_keys.games][game_type, game_id] = game
+        game.journal = Journal(store, game_type, game_id)
+        if difficulty is not None:
+            # leave a seat for the player
+            for _ in range(game.number_of_players - 1):
+                game.add_bot(difficulty)
+    game.bot_pool = request.app[app_keys.bot_pool]
+    games[game_type, game_id] = game
+    request.app[app_keys.idle_games].take((game_type, game_id))
 
     player = game.add_player(session_id)
+    if player is not None and game.game_status is GameStatus.NOT_STARTED:
+        tables.seated(game_type, game_id, session_id)
 
     ws = web.WebSocketResponse(heartbeat=15)
+    ws[MULTILINE_FRAMES] = request.query.get("multiline") == "1"
+    send_queue = ws[SEND_QUEUE] = SendQueue(
+        ws,
+        maxsize=request.app[app_keys.send_queue_size],
+        policy=request.app[app_keys.slow_consumer_policy],
+        resync=lambda: game.handle_cmd(ws, player, "current_state"),
+        peer=request.remote,
+    )
     ws.set_cookie("session_id", session_id, max_age=24 * 60 * 60, samesite="lax")
     await ws.prepare(request)
+    writer = asyncio.create_task(send_queue.run())
 
+    if viewer_id := request.query.get("viewer"):
+        game.add_viewer(ws, viewer_id, player)
     if player:
         player.websockets.add(ws)
     game.websockets.add(ws)
@@ -91,11 +256,7 @@ async def websocket(request: web.Request) -> web.WebSocketResponse:
             try:
                 await game.handle_raw_cmd(ws, player, msg)
             except CmdError as e:
-                await game.handle_cmd(ws, player, "current_state")
-                args = ["error", str(e)]
-                if e.command is not None:
-                    args.append(e.command)
-                await ws.send_str("|".join(x.replace("|", "") for x in args))
+                await game.handle_error(ws, player, e)
 
     finally:
         if player:
@@ -105,12 +266,20 @@ async def websocket(request: web.Request) -> web.WebSocketResponse:
                 and game.game_status is GameStatus.NOT_STARTED
             ):
                 game.remove_player(player)
+                tables.left(game_type, game_id, session_id)
 
         game.websockets.discard(ws)
-        if len(game.websockets) == 0 and game.game_status is not GameStatus.NOT_STARTED:
-            with shelve.open(request.app[app_keys.games_shelf_path]) as shelf:
-                shelf[f"{game_type}__{game_id}"] = SavedGame(game)
+        if (
+            len(game.websockets) == 0
+            and game.game_status is not GameStatus.NOT_STARTED
+            and game.journal is not None
+        ):
+            # every command is already journaled, the game is saved once it's cold
+            request.app[app_keys.idle_games].park((game_type, game_id), game)
 
         request.app[app_keys.websockets].discard(ws)
 
+        send_queue.stop()
+        await writer
+
     return ws
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import StrEnum
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class SlowConsumerPolicy(StrEnum):
+    # drop the queued frames and send the whole state of the game again
+    RESYNC = "resync"
+    # close the connection, the client reconnects and joins the game again
+    CLOSE = "close"
+
+
+@dataclass
+class SendQueueMetrics:
+    depth: int = 0
+    max_depth: int = 0
+    sent_frames: int = 0
+    sent_bytes: int = 0
+    dropped_frames: int = 0
+    overflows: int = 0
+    errors: int = 0
+
+
+class SendQueue:
+    """A bounded queue of the frames to send to a websocket.
+
+    Frames are put without blocking, a writer task (`run`) sends them in order. When a
+    client falls more than `maxsize` frames behind, the queue is dropped and `policy`
+    decides what happens to the connection.
+    """
+
+    def __init__(
+        self,
+        ws: web.WebSocketResponse,
+        *,
+        maxsize: int,
+        policy: SlowConsumerPolicy,
+        resync: Callable[[], Awaitable[None]],
+        peer: str | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.policy = policy
+        self.peer = peer
+        self.metrics = SendQueueMetrics()
+        self._ws = ws
+        self._resync = resync
+        self._frames: deque[bytes] = deque()
+        self._wakeup = asyncio.Event()
+        self._resync_pending = False
+        self._closing = False
+        self._stopped = False
+
+    def put(self, data: bytes) -> None:
+        if self._stopped or self._closing or self._resync_pending:
+            # the frame would be superseded by the resync anyway
+            self.metrics.dropped_frames += 1
+            return
+
+        if len(self._frames) >= self.maxsize:
+            self.metrics.overflows += 1
+            self.metrics.dropped_frames += len(self._frames) + 1
+            self._frames.clear()
+            if self.policy is SlowConsumerPolicy.CLOSE:
+                self._closing = True
+            else:
+                self._resync_pending = True
+        else:
+            self._frames.append(data)
+            self.metrics.max_depth = max(self.metrics.max_depth, len(self._frames))
+        self.metrics.depth = len(self._frames)
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        while not self._stopped and not self._ws.closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            if self._closing:
+                logger.warning("Closing slow connection %s", self.peer)
+                await self._ws.close(
+                    code=aiohttp.WSCloseCode.POLICY_VIOLATION, message=b"Too slow"
+                )
+                return
+
+            if self._resync_pending:
+                logger.warning("Resyncing slow connection %s", self.peer)
+                self._resync_pending = False
+                await self._resync()
+
+            while self._frames and not self._stopped:
+                data = self._frames.popleft()
+                self.metrics.depth = len(self._frames)
+                try:
+                    await self._ws.send_frame(data, aiohttp.WSMsgType.TEXT)
+                except OSError:
+                    self.metrics.errors += 1
+                    logger.exception("Error sending to %s", self.peer)
+                    return
+                self.metrics.sent_frames += 1
+                self.metrics.sent_bytes += len(data)
+
+
+SEND_QUEUE = web.ResponseKey("send_queue", SendQueue)
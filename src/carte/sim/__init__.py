@@ -0,0 +1,13 @@
+from carte.sim.batch import POLICIES, Policy, random_decks
+from carte.sim.briscola import BriscolaResults, simulate_briscola
+from carte.sim.scopa import ScopaResults, simulate_scopa
+
+__all__ = [
+    "POLICIES",
+    "BriscolaResults",
+    "Policy",
+    "ScopaResults",
+    "random_decks",
+    "simulate_briscola",
+    "simulate_scopa",
+]
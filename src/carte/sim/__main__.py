@@ -0,0 +1,64 @@
+import argparse
+import time
+from collections.abc import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from carte.sim import POLICIES, Policy, random_decks, simulate_briscola, simulate_scopa
+
+type Simulator = Callable[
+    [npt.NDArray[np.int8], npt.NDArray[np.intp], Policy, np.random.Generator],
+    npt.NDArray[np.integer],
+]
+
+SIMULATORS: dict[str, Simulator] = {
+    "briscola": lambda *args: simulate_briscola(*args).points,
+    "scopa": lambda *args: simulate_scopa(*args).points,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m carte.sim", description="Simulate batches of games."
+    )
+    parser.add_argument("game", choices=SIMULATORS)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--policy", choices=POLICIES, default="random")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    simulator = SIMULATORS[args.game]
+    policy = POLICIES[args.policy]
+    rng = np.random.default_rng(args.seed)
+
+    # outcomes from the point of view of the starting player
+    wins = losses = 0
+    starting_points = other_points = 0
+    start = time.perf_counter()
+    for offset in range(0, args.games, args.batch_size):
+        games = min(args.batch_size, args.games - offset)
+        starting_player_ids = rng.integers(2, size=games)
+        points = simulator(random_decks(rng, games), starting_player_ids, policy, rng)
+
+        rows = np.arange(games)
+        starting = points[rows, starting_player_ids]
+        other = points[rows, 1 - starting_player_ids]
+        wins += int((starting > other).sum())
+        losses += int((starting < other).sum())
+        starting_points += int(starting.sum())
+        other_points += int(other.sum())
+    elapsed = time.perf_counter() - start
+
+    games = args.games
+    print(f"{games} games in {elapsed:.2f}s ({games / elapsed:,.0f} games/s)")
+    print(f"starting player wins: {wins / games:.2%}")
+    print(f"other player wins:    {losses / games:.2%}")
+    print(f"draws:                {(games - wins - losses) / games:.2%}")
+    print(f"average points:       {starting_points / games:.2f}", end=" - ")
+    print(f"{other_points / games:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from collections.abc import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from carte.types import CARDS
+
+# sets of cards are stored as bitmasks, with bit n set for the card with id n
+type Masks = npt.NDArray[np.uint64]
+type CardIds = npt.NDArray[np.intp]
+# pick one of the candidate cards of each game, `candidates` has a row of booleans
+# indexed by card id for each game
+type Policy = Callable[[np.random.Generator, npt.NDArray[np.bool_]], CardIds]
+
+CARD_BITS = np.arange(len(CARDS), dtype=np.uint64)
+
+
+def expand(masks: Masks) -> npt.NDArray[np.bool_]:
+    """Turn bitmasks into arrays of booleans, indexed by card id on the last axis."""
+    return ((masks[..., None] >> CARD_BITS) & np.uint64(1)).astype(np.bool_)
+
+
+def bits(card_ids: npt.NDArray[np.integer]) -> Masks:
+    return np.uint64(1) << card_ids.astype(np.uint64)
+
+
+def random_decks(rng: np.random.Generator, games: int) -> npt.NDArray[np.int8]:
+    """Shuffle a deck for each game.
+
+    Like `BaseGame._deck`, cards are drawn from the end of each row.
+    """
+    decks = np.tile(np.arange(len(CARDS), dtype=np.int8), (games, 1))
+    return rng.permuted(decks, axis=1)
+
+
+def random_policy(
+    rng: np.random.Generator, candidates: npt.NDArray[np.bool_]
+) -> CardIds:
+    counts = candidates.sum(axis=1)
+    picks = (rng.random(len(candidates)) * counts).astype(np.intp)
+    return (candidates.cumsum(axis=1, dtype=np.int8) > picks[:, None]).argmax(axis=1)
+
+
+def lowest_policy(_: np.random.Generator, candidates: npt.NDArray[np.bool_]) -> CardIds:
+    # deterministic, easy to reproduce with the game classes
+    return candidates.argmax(axis=1)
+
+
+POLICIES: dict[str, Policy] = {
+    "random": random_policy,
+    "lowest": lowest_policy,
+}
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from carte.games import Briscola
+from carte.games.briscola import POINTS, STRENGTH
+from carte.sim.batch import Policy, bits, expand
+from carte.types import CARDS, CardNumber
+
+_POINTS = np.array(POINTS, dtype=np.int16)
+_STRENGTH = np.array(STRENGTH, dtype=np.int8)
+_SUITS = np.arange(len(CARDS)) // len(CardNumber)
+
+
+@dataclass(frozen=True)
+class BriscolaResults:
+    # the points taken by each player, indexed by game and player id
+    points: npt.NDArray[np.int16]
+
+
+def simulate_briscola(
+    decks: npt.NDArray[np.int8],
+    starting_player_ids: npt.NDArray[np.intp],
+    policy: Policy,
+    rng: np.random.Generator,
+) -> BriscolaResults:
+    """Play a batch of games of Briscola, one for each row of `decks`.
+
+    All the games are played in lockstep, following the same rules as `Briscola`.
+    """
+    games = len(decks)
+    rows = np.arange(games)
+    hands = np.zeros((games, Briscola.number_of_players), dtype=np.uint64)
+    points = np.zeros((games, Briscola.number_of_players), dtype=np.int16)
+    current = starting_player_ids.astype(np.intp)
+    deck_size = decks.shape[1]
+
+    for _ in range(Briscola.hand_size):
+        for i in range(Briscola.number_of_players):
+            deck_size -= 1
+            hands[rows, (current + i) % 2] |= bits(decks[:, deck_size])
+
+    deck_size -= 1
+    briscola = decks[:, deck_size]
+    trump = _SUITS[briscola]
+    strength = _STRENGTH[trump]
+
+    for _ in range(len(CARDS) // Briscola.number_of_players):
+        leader, follower = current, 1 - current
+        first = policy(rng, expand(hands[rows, leader]))
+        hands[rows, leader] &= ~bits(first)
+        second = policy(rng, expand(hands[rows, follower]))
+        hands[rows, follower] &= ~bits(second)
+
+        # same as `trick_winner`
+        follower_wins = (strength[rows, second] > strength[rows, first]) & (
+            (_SUITS[second] == _SUITS[first]) | (_SUITS[second] == trump)
+        )
+        current = np.where(follower_wins, follower, leader)
+        points[rows, current] += _POINTS[first] + _POINTS[second]
+
+        if deck_size:
+            deck_size -= 1
+            hands[rows, current] |= bits(decks[:, deck_size])
+            if deck_size:
+                deck_size -= 1
+                hands[rows, 1 - current] |= bits(decks[:, deck_size])
+            else:
+                hands[rows, 1 - current] |= bits(briscola)
+
+    return BriscolaResults(points)
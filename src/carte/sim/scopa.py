@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from carte.games import Scopa
+from carte.games.scopa import CARD_VALUES, PRIMIERA_VALUES, capture_values
+from carte.sim.batch import Masks, Policy, bits, expand
+from carte.types import CARDS, Card, CardNumber, Suit
+
+_VALUES = np.array([CARD_VALUES[card.number] for card in CARDS], dtype=np.intp)
+# counts the cards of each value, the first column is never used
+_VALUE_COUNTS = np.eye(len(CARD_VALUES) + 1, dtype=np.int8)[_VALUES]
+_VALUE_RANGE = np.arange(1, len(CARD_VALUES) + 1)
+# capture keys pack the target in the lowest 4 bits, followed by 3 bits for the count
+# of each value
+_KEY_SHIFTS = 4 + 3 * np.arange(len(CARD_VALUES), dtype=np.int64)
+_capture_masks: dict[int, int] = {}
+_PRIMIERA = np.array([PRIMIERA_VALUES[card.number] for card in CARDS], dtype=np.int16)
+_DENARI = np.array([card.suit is Suit.DENARI for card in CARDS])
+_SETTEBELLO = Card.parse(f"{Suit.DENARI}:{CardNumber.SETTE}").id
+
+
+@dataclass(frozen=True)
+class ScopaResults:
+    # each category is indexed by game and player id
+    cards: npt.NDArray[np.integer]
+    denari: npt.NDArray[np.integer]
+    primiera: npt.NDArray[np.integer]
+    settebello: npt.NDArray[np.bool_]
+    scope: npt.NDArray[np.integer]
+
+    @property
+    def points(self) -> npt.NDArray[np.intp]:
+        return (
+            _majority(self.cards)
+            + _majority(self.denari)
+            + _majority(self.primiera)
+            + self.settebello
+            + self.scope
+        )
+
+
+def _majority(scores: npt.NDArray[np.integer]) -> npt.NDArray[np.intp]:
+    # one point to the player with the highest score, none when it's a tie
+    out = np.zeros(scores.shape, dtype=np.intp)
+    decided = scores[:, 0] != scores[:, 1]
+    out[decided, scores[decided].argmax(axis=1)] = 1
+    return out
+
+
+def _capture_values(
+    targets: npt.NDArray[np.intp], cards: npt.NDArray[np.bool_]
+) -> npt.NDArray[np.int64]:
+    """Return the bitmasks of the values that can be part of a capture of `targets`.
+
+    Games with the same target and the same values on the table share a single lookup
+    in the capture engine. A capture can't use more than `target // value` cards of
+    the same value, so larger counts are capped to share even more of them.
+    """
+    counts = np.minimum(
+        (cards.astype(np.int8) @ _VALUE_COUNTS)[:, 1:], targets[:, None] // _VALUE_RANGE
+    )
+    keys = targets + (counts.astype(np.int64) << _KEY_SHIFTS).sum(axis=1)
+    unique_keys, index, inverse = np.unique(
+        keys, return_index=True, return_inverse=True
+    )
+
+    masks = []
+    for key, i in zip(unique_keys.tolist(), index.tolist(), strict=True):
+        if (mask := _capture_masks.get(key)) is None:
+            mask = capture_values(int(targets[i]), (0, *counts[i].tolist()))
+            _capture_masks[key] = mask
+        masks.append(mask)
+    return np.array(masks, dtype=np.int64)[inverse]
+
+
+def _capture(
+    table: Masks,
+    values: npt.NDArray[np.intp],
+    policy: Policy,
+    rng: np.random.Generator,
+) -> Masks:
+    """Return the cards taken from the table in each game, none if it can't take."""
+    captured = np.zeros_like(table)
+
+    # a card with the same number must be taken
+    equal = expand(table) & (values[:, None] == _VALUES)
+    has_equal = equal.any(axis=1)
+    if has_equal.any():
+        captured[has_equal] = bits(policy(rng, equal[has_equal]))
+
+    # otherwise cards are selected one at a time, like `Scopa.cmd_take_choice`
+    targets = np.where(has_equal, 0, values)
+    remaining = table.copy()
+    active = np.flatnonzero(~has_equal)
+    while len(active):
+        cards = expand(remaining[active])
+        valid_values = _capture_values(targets[active], cards)
+        candidates = cards & ((valid_values[:, None] >> _VALUES) & 1).astype(np.bool_)
+        can_take = candidates.any(axis=1)
+        active, candidates = active[can_take], candidates[can_take]
+
+        choice = policy(rng, candidates)
+        captured[active] |= bits(choice)
+        remaining[active] &= ~bits(choice)
+        targets[active] -= _VALUES[choice]
+        active = active[targets[active] > 0]
+
+    return captured
+
+
+def simulate_scopa(
+    decks: npt.NDArray[np.int8],
+    starting_player_ids: npt.NDArray[np.intp],
+    policy: Policy,
+    rng: np.random.Generator,
+) -> ScopaResults:
+    """Play a batch of games of Scopa, one for each row of `decks`.
+
+    All the games are played in lockstep, following the same rules as `Scopa`.
+    """
+    games = len(decks)
+    rows = np.arange(games)
+    players = Scopa.number_of_players
+    hands = np.zeros((games, players), dtype=np.uint64)
+    taken = np.zeros((games, players), dtype=np.uint64)
+    scope = np.zeros((games, players), dtype=np.int16)
+    table = np.zeros(games, dtype=np.uint64)
+    current = starting_player_ids.astype(np.intp)
+    last_taker = np.zeros(games, dtype=np.intp)
+    deck_size = decks.shape[1]
+
+    table_size = 4
+    turns = Scopa.hand_size * players
+    for deal in range((deck_size - table_size) // turns):
+        for _ in range(Scopa.hand_size):
+            for i in range(players):
+                deck_size -= 1
+                hands[rows, (current + i) % players] |= bits(decks[:, deck_size])
+        if not deal:
+            for _ in range(table_size):
+                deck_size -= 1
+                table |= bits(decks[:, deck_size])
+
+        for _ in range(turns):
+            card = policy(rng, expand(hands[rows, current]))
+            hands[rows, current] &= ~bits(card)
+
+            captured = _capture(table, _VALUES[card], policy, rng)
+            took = captured != 0
+            table = np.where(took, table & ~captured, table | bits(card))
+            taken[rows, current] |= np.where(took, captured | bits(card), 0)
+            scope[rows, current] += took & (table == 0)
+            last_taker = np.where(took, current, last_taker)
+
+            current = (current + 1) % players
+
+    # the cards left on the table go to the last player that took
+    taken[rows, last_taker] |= table
+
+    taken_cards = expand(taken)
+    primiera = taken_cards * _PRIMIERA
+    return ScopaResults(
+        cards=taken_cards.sum(axis=-1),
+        denari=(taken_cards & _DENARI).sum(axis=-1),
+        primiera=primiera.reshape(games, players, len(Suit), -1).max(axis=-1).sum(-1),
+        settebello=taken_cards[..., _SETTEBELLO],
+        scope=scope,
+    )
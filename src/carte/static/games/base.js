@@ -215,6 +215,11 @@ class BaseGame {
     this.gameStarted = false;
     this.playerId = -1;
     this.players = [];
+    // resume protocol: the sequence number of the last message received, only valid
+    // within the same epoch
+    this.viewerId = this.getViewerId();
+    this.epoch = null;
+    this.lastSeq = null;
     this.decks = new Map(
       this.deckGenerators.map(([name, ...args]) => [
         name,
@@ -335,6 +340,16 @@ class BaseGame {
     return rules;
   }
 
+  getViewerId() {
+    let viewerId = sessionStorage.getItem("viewer-id");
+    if (viewerId === null) {
+      const bytes = crypto.getRandomValues(new Uint8Array(16));
+      viewerId = Array.from(bytes, (x) => x.toString(16).padStart(2, "0")).join("");
+      sessionStorage.setItem("viewer-id", viewerId);
+    }
+    return viewerId;
+  }
+
   get playerSide() {
     return Math.max(0, this.playerId);
   }
@@ -372,6 +387,9 @@ class BaseGame {
       url.pathname = `/ws${url.pathname}`;
     }
     url.hash = "";
+    // accept several commands per frame, one per line
+    url.searchParams.set("multiline", "1");
+    url.searchParams.set("viewer", this.viewerId);
     this.ws = new WebSocket(url);
     this.ws.addEventListener("open", this.onWsOpen.bind(this));
     this.ws.addEventListener("message", this.onWsMessage.bind(this));
@@ -387,12 +405,20 @@ class BaseGame {
       this.hideToast(connectionLostToast);
     }
     const name = document.getElementById("username").value;
-    this.send("join", name);
+    if (this.epoch !== null && this.lastSeq !== null) {
+      this.send("resume", this.epoch, this.lastSeq, name);
+    } else {
+      this.send("join", name);
+    }
   }
 
   onWsMessage(event) {
-    console.info(`<< ${event.data}`);
-    this.pendingHandler = this.handleCmd(...event.data.split("|"));
+    for (const line of event.data.split("\n")) {
+      console.info(`<< ${line}`);
+      const [seq, ...msg] = line.split("|");
+      this.lastSeq = seq;
+      this.pendingHandler = this.handleCmd(...msg);
+    }
   }
 
   async onWsClose() {
@@ -613,6 +639,10 @@ class BaseGame {
     document.getElementById("results-table").replaceChildren();
   }
 
+  cmdEpoch(epoch) {
+    this.epoch = epoch;
+  }
+
   cmdGameId(gameId) {
     this.gameId = gameId;
     document.location.hash = this.gameId;
@@ -709,6 +739,15 @@ class BaseGame {
     document.getElementById("results").showPopover();
   }
 
+  cmdResultsBest(...results) {
+    const table = document.getElementById("results-table");
+    const points = results.map(
+      (n, playerId) => `${this.players[playerId]} ${Number.parseInt(n, 10)}`,
+    );
+    table.createCaption().textContent =
+      `Best play from the last cards: ${points.join(", ")}`;
+  }
+
   cmdRematchActive() {
     document.getElementById("results-rematch").classList.add("loading");
   }
@@ -0,0 +1,358 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+from carte import codec
+from carte.types import GameInfo, GameStatus, JournalEntry, SavedGame
+
+logger = logging.getLogger(__name__)
+
+
+class GameStore(ABC):
+    """Persistent storage for the games that are not currently in memory.
+
+    The store is opened once and kept for the whole lifetime of the application. Every
+    method is a coroutine, implementations must never block the event loop.
+    """
+
+    @abstractmethod
+    async def load(self, game_type: str, game_id: str) -> SavedGame | None: ...
+
+    @abstractmethod
+    async def load_journal(self, game_type: str, game_id: str) -> list[JournalEntry]:
+        """Return the commands journaled after the last snapshot, in order."""
+
+    @abstractmethod
+    async def save(self, game_type: str, game_id: str, saved_game: SavedGame) -> None:
+        """Save a snapshot of a game, replacing its journal."""
+
+    @abstractmethod
+    async def append(self, game_type: str, game_id: str, entry: JournalEntry) -> None:
+        """Append a command to the journal of a game."""
+
+    @abstractmethod
+    async def delete(self, game_type: str, game_id: str) -> None: ...
+
+    @abstractmethod
+    async def index(
+        self,
+        *,
+        game_type: str | None = None,
+        status: GameStatus | None = None,
+        after: tuple[datetime, str, str] | None = None,
+        limit: int,
+    ) -> list[GameInfo]:
+        """Return the metadata of the valid saved games, without loading them.
+
+        Games are sorted from the most recently saved one. `after` is the
+        `(last_saved, game_type, game_id)` key of the last game of the previous page.
+        """
+
+    @abstractmethod
+    async def expire(self, before: datetime, limit: int) -> int:
+        """Delete up to `limit` games last saved before `before`.
+
+        Up to `limit` journaled commands of games that were never saved are deleted
+        too, e.g. the renames in a table abandoned before it started. Return the number
+        of deleted games.
+        """
+
+    @abstractmethod
+    async def close(self) -> None: ...
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE games (
+            game_type TEXT NOT NULL,
+            game_id TEXT NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (game_type, game_id)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE journal (
+            game_type TEXT NOT NULL,
+            game_id TEXT NOT NULL,
+            player_id INTEGER,
+            cmd TEXT NOT NULL,
+            args TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX journal_game ON journal (game_type, game_id)")
+
+
+def _add_expiry_index(conn: sqlite3.Connection) -> None:
+    conn.execute("ALTER TABLE games ADD COLUMN last_saved REAL NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE games ADD COLUMN status TEXT NOT NULL DEFAULT ''")
+
+    # unreadable games keep a last_saved of 0, the next expiry deletes them
+    for rowid, data in conn.execute("SELECT rowid, data FROM games").fetchall():
+        try:
+            saved_game: SavedGame = codec.loads(data)
+        except Exception:
+            continue
+        conn.execute(
+            "UPDATE games SET last_saved = ?, status = ? WHERE rowid = ?",
+            (
+                saved_game.last_saved.timestamp(),
+                saved_game.game.game_status.name,
+                rowid,
+            ),
+        )
+
+    conn.execute("CREATE INDEX games_last_saved ON games (last_saved)")
+
+
+def _add_listing_index(conn: sqlite3.Connection) -> None:
+    conn.execute("ALTER TABLE games ADD COLUMN players TEXT NOT NULL DEFAULT '[]'")
+
+    for rowid, data in conn.execute("SELECT rowid, data FROM games").fetchall():
+        try:
+            saved_game: SavedGame = codec.loads(data)
+        except Exception:
+            continue
+        conn.execute(
+            "UPDATE games SET players = ? WHERE rowid = ?",
+            (json.dumps(saved_game.game.player_names), rowid),
+        )
+
+    conn.execute("CREATE INDEX games_type_last_saved ON games (game_type, last_saved)")
+    conn.execute("CREATE INDEX games_status_last_saved ON games (status, last_saved)")
+
+
+# each migration upgrades the schema to the next user_version
+_MIGRATIONS: list[Callable[[sqlite3.Connection], None]] = [
+    _create_tables,
+    _add_expiry_index,
+    _add_listing_index,
+]
+
+
+class SqliteGameStore(GameStore):
+    """A `GameStore` backed by an SQLite database in WAL mode.
+
+    Every blocking call runs in a bounded thread pool, each worker thread owns its own
+    connection to the database.
+    """
+
+    def __init__(self, path: Path, *, max_workers: int = 4) -> None:
+        self._path = path
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="carte-store"
+        )
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        with _transaction(conn):
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            for migration in _MIGRATIONS[version:]:
+                migration(conn)
+            conn.execute(f"PRAGMA user_version = {len(_MIGRATIONS)}")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._local.connection = self._connect()
+        return conn
+
+    async def _run[T](self, func: Callable[[sqlite3.Connection], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: func(self._connection())
+        )
+
+    async def load(self, game_type: str, game_id: str) -> SavedGame | None:
+        def _load(conn: sqlite3.Connection) -> SavedGame | None:
+            row = conn.execute(
+                "SELECT data FROM games WHERE game_type = ? AND game_id = ?",
+                (game_type, game_id),
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                saved_game = codec.loads(row[0])
+            except Exception:
+                logger.warning(
+                    "Couldn't decode the saved game %s/%s",
+                    game_type,
+                    game_id,
+                    exc_info=True,
+                )
+                return None
+            return saved_game
+
+        return await self._run(_load)
+
+    async def load_journal(self, game_type: str, game_id: str) -> list[JournalEntry]:
+        def _load_journal(conn: sqlite3.Connection) -> list[JournalEntry]:
+            return [
+                JournalEntry(player_id, cmd, tuple(json.loads(args)))
+                for player_id, cmd, args in conn.execute(
+                    "SELECT player_id, cmd, args FROM journal "
+                    "WHERE game_type = ? AND game_id = ? ORDER BY rowid",
+                    (game_type, game_id),
+                )
+            ]
+
+        return await self._run(_load_journal)
+
+    async def save(self, game_type: str, game_id: str, saved_game: SavedGame) -> None:
+        data = codec.dumps(saved_game)
+        last_saved = saved_game.last_saved.timestamp()
+        status = saved_game.game.game_status.name
+        players = json.dumps(saved_game.game.player_names)
+
+        def _save(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                conn.execute(
+                    "INSERT OR REPLACE INTO games "
+                    "(game_type, game_id, data, last_saved, status, players) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (game_type, game_id, data, last_saved, status, players),
+                )
+                conn.execute(
+                    "DELETE FROM journal WHERE game_type = ? AND game_id = ?",
+                    (game_type, game_id),
+                )
+
+        await self._run(_save)
+
+    async def append(self, game_type: str, game_id: str, entry: JournalEntry) -> None:
+        args = json.dumps(entry.args)
+
+        def _append(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO journal (game_type, game_id, player_id, cmd, args) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (game_type, game_id, entry.player_id, entry.cmd, args),
+            )
+
+        await self._run(_append)
+
+    async def delete(self, game_type: str, game_id: str) -> None:
+        def _delete(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                conn.execute(
+                    "DELETE FROM games WHERE game_type = ? AND game_id = ?",
+                    (game_type, game_id),
+                )
+                conn.execute(
+                    "DELETE FROM journal WHERE game_type = ? AND game_id = ?",
+                    (game_type, game_id),
+                )
+
+        await self._run(_delete)
+
+    async def index(
+        self,
+        *,
+        game_type: str | None = None,
+        status: GameStatus | None = None,
+        after: tuple[datetime, str, str] | None = None,
+        limit: int,
+    ) -> list[GameInfo]:
+        conditions = ["last_saved >= ?"]
+        params: list[str | float | int] = [
+            (datetime.now(UTC) - SavedGame.lifetime).timestamp()
+        ]
+        if game_type is not None:
+            conditions.append("game_type = ?")
+            params.append(game_type)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status.name)
+        if after is not None:
+            conditions.append("(last_saved, game_type, game_id) < (?, ?, ?)")
+            params.extend((after[0].timestamp(), after[1], after[2]))
+        params.append(limit)
+        query = (
+            "SELECT game_type, game_id, status, players, last_saved FROM games "
+            f"WHERE {' AND '.join(conditions)} "
+            "ORDER BY last_saved DESC, game_type DESC, game_id DESC LIMIT ?"
+        )
+
+        def _index(conn: sqlite3.Connection) -> list[GameInfo]:
+            return [
+                GameInfo(
+                    game_type,
+                    game_id,
+                    GameStatus[status],
+                    tuple(json.loads(players)),
+                    datetime.fromtimestamp(last_saved, UTC),
+                )
+                for game_type, game_id, status, players, last_saved in conn.execute(
+                    query, params
+                )
+            ]
+
+        return await self._run(_index)
+
+    async def expire(self, before: datetime, limit: int) -> int:
+        def _expire(conn: sqlite3.Connection) -> int:
+            with _transaction(conn):
+                expired = conn.execute(
+                    "SELECT game_type, game_id FROM games "
+                    "WHERE last_saved < ? ORDER BY last_saved LIMIT ?",
+                    (before.timestamp(), limit),
+                ).fetchall()
+                conn.executemany(
+                    "DELETE FROM games WHERE game_type = ? AND game_id = ?", expired
+                )
+                conn.executemany(
+                    "DELETE FROM journal WHERE game_type = ? AND game_id = ?", expired
+                )
+                # a game is only restored from a snapshot, without one its journal is
+                # never read again
+                conn.execute(
+                    "DELETE FROM journal WHERE rowid IN ("
+                    "SELECT rowid FROM journal WHERE NOT EXISTS ("
+                    "SELECT 1 FROM games WHERE games.game_type = journal.game_type "
+                    "AND games.game_id = journal.game_id"
+                    ") LIMIT ?)",
+                    (limit,),
+                )
+            return len(expired)
+
+        return await self._run(_expire)
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
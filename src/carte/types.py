@@ -1,10 +1,9 @@
-from collections.abc import Awaitable, Callable
+import itertools
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
 from enum import Enum, StrEnum, auto
-from typing import TYPE_CHECKING, Any
-
-from aiohttp import web
+from typing import TYPE_CHECKING, Any, ClassVar
 
 from carte.exc import CmdError
 
@@ -40,14 +39,48 @@ class CardNumber(StrEnum):
 
 @dataclass(frozen=True)
 class Card:
+    """A playing card.
+
+    Cards are compared by value, but the game code only uses the instances in `CARDS`:
+    the index of a card in the table is its `id`, and its wire string is computed only
+    once.
+    """
+
     suit: Suit
     number: CardNumber
+    id: int = field(init=False, repr=False, compare=False)
+    _wire: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        card_id = list(Suit).index(self.suit) * len(CardNumber)
+        card_id += list(CardNumber).index(self.number)
+        object.__setattr__(self, "id", card_id)
+        object.__setattr__(self, "_wire", f"{self.suit}:{self.number}")
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # cards pickled by older versions only have the suit and the number
+        self.__dict__.update(state)
+        self.__post_init__()
 
     def __str__(self) -> str:
-        return f"{self.suit}:{self.number}"
+        return self._wire
 
+    @staticmethod
+    def parse(raw: str) -> Card:
+        try:
+            return _CARDS_BY_WIRE[raw]
+        except KeyError as e:
+            err = f"Invalid card: {raw}"
+            raise ValueError(err) from e
 
-type CmdFunc[**P] = Callable[P, Awaitable[None]]
+
+CARDS = tuple(
+    Card(suit, number) for suit, number in itertools.product(Suit, CardNumber)
+)
+_CARDS_BY_WIRE = {str(card): card for card in CARDS}
+
+
+type CmdFunc[**P] = Callable[P, None]
 
 
 @dataclass
@@ -56,26 +89,57 @@ class Command[F: CmdFunc[...]]:
     current_player: bool
     other_arguments: dict[str, Enum]
 
-    def check(self, game: BaseGame[Any], ws: web.WebSocketResponse) -> None:
+    def check(self, game: BaseGame[Any], player: Player | None) -> None:
         for name, value in self.other_arguments.items():
             attr = getattr(game, f"_{name}")
             if attr is not value:
                 err = f"Invalid {name.replace('_', ' ')}"
                 raise CmdError(err)
 
-        if self.current_player and ws not in game.current_player.websockets:
+        if self.current_player and player != game.current_player:
             err = "It's not your turn"
             raise CmdError(err)
 
 
 @dataclass
 class SavedGame:
+    lifetime: ClassVar[timedelta] = timedelta(days=7)
+
     game: BaseGame[Player]
     last_saved: datetime = field(default_factory=lambda: datetime.now(UTC), init=False)
 
     @property
     def is_valid(self) -> bool:
-        return self.last_saved + timedelta(days=7) >= datetime.now(UTC)
+        return self.last_saved + self.lifetime >= datetime.now(UTC)
+
+
+@dataclass(frozen=True)
+class GameInfo:
+    game_type: str
+    game_id: str
+    status: GameStatus
+    players: tuple[str, ...]
+    last_saved: datetime
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    player_id: int | None
+    cmd: str
+    args: tuple[str, ...]
 
 
 Sendable = str | int | Card
+
+
+@dataclass(frozen=True, slots=True)
+class Event:
+    """A message emitted by a game.
+
+    It is sent to the player with id `player_id`, or to everyone but them if `others`
+    is set. Messages for everyone have no `player_id`.
+    """
+
+    args: tuple[Sendable, ...]
+    player_id: int | None = None
+    others: bool = False
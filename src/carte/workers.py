@@ -0,0 +1,377 @@
+"""Serve from several processes, each one owning a share of the games.
+
+The front process accepts the connections and peeks at their first request, without
+consuming it. The websockets of a game are handed to the worker that owns the game,
+any other request goes to the next worker in turn. The socket itself is passed to the
+worker, which talks to the client directly from then on.
+
+The front also owns the matchmaker, so that all the players looking for a table wait
+in the same queue whichever worker ends up owning their game.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import http.cookies
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import zlib
+from collections import deque
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+import yarl
+from aiohttp import web
+from typenv import Env
+
+from carte.games import BaseGame
+from carte.matchmaking import Matchmaker
+
+logger = logging.getLogger(__name__)
+
+# the request line and the headers must fit in a single peek
+MAX_HEAD_SIZE = 16 * 1024
+HEAD_TIMEOUT = 10
+MAX_MESSAGE_SIZE = 4096
+
+
+def owner(game_id: str, workers: int) -> int:
+    """Return the index of the worker that owns `game_id`.
+
+    The hash is stable across processes and restarts, unlike `hash()`.
+    """
+    return zlib.crc32(game_id.encode()) % workers
+
+
+async def _wait(sock: socket.socket, *, write: bool = False) -> None:
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def _ready() -> None:
+        if not fut.done():
+            fut.set_result(None)
+
+    if write:
+        loop.add_writer(sock, _ready)
+    else:
+        loop.add_reader(sock, _ready)
+    try:
+        await fut
+    finally:
+        if write:
+            loop.remove_writer(sock)
+        else:
+            loop.remove_reader(sock)
+
+
+async def _send(sock: socket.socket, data: dict[str, Any], fds: list[int]) -> None:
+    msg = json.dumps(data).encode()
+    while True:
+        try:
+            socket.send_fds(sock, [msg], fds)
+        except BlockingIOError:
+            await _wait(sock, write=True)
+        else:
+            return
+
+
+async def _recv(sock: socket.socket) -> tuple[dict[str, Any] | None, list[int]]:
+    """Receive a message, `None` once the other process is gone."""
+    while True:
+        try:
+            msg, fds, _, _ = socket.recv_fds(sock, MAX_MESSAGE_SIZE, 1)
+        except BlockingIOError:
+            await _wait(sock)
+        else:
+            data: dict[str, Any] | None = json.loads(msg) if msg else None
+            return data, fds
+
+
+async def _peek_head(sock: socket.socket) -> bytes:
+    """Return the beginning of the first request, leaving it to be read again."""
+    size = 0
+    while True:
+        await _wait(sock)
+        head = sock.recv(MAX_HEAD_SIZE, socket.MSG_PEEK)
+        if not head:
+            err = "The client closed the connection"
+            raise ConnectionError(err)
+        if b"\r\n\r\n" in head or len(head) >= MAX_HEAD_SIZE:
+            return head
+        if len(head) == size:
+            # the socket stays readable until the data is consumed, wait for more
+            await asyncio.sleep(0.01)
+        size = len(head)
+
+
+def _session_id(head: bytes) -> str | None:
+    for line in head.split(b"\r\n\r\n", 1)[0].split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"cookie":
+            cookie = http.cookies.SimpleCookie(value.decode("latin-1"))
+            if (morsel := cookie.get("session_id")) is not None:
+                return morsel.value
+    return None
+
+
+class Assignment(NamedTuple):
+    game_id: str
+    session_id: str
+
+
+class Front:
+    """Accept the connections, and route them to the workers."""
+
+    def __init__(self, channels: list[socket.socket], matchmaker: Matchmaker) -> None:
+        self.matchmaker = matchmaker
+        self._channels = channels
+        self._next_worker = itertools.cycle(range(len(channels)))
+        self._handlers: set[asyncio.Task[None]] = set()
+
+    def route(self, head: bytes) -> tuple[int, Assignment | None]:
+        """Return the worker for the request starting with `head`.
+
+        A player looking for a table gets a seat from the matchmaker. The table is
+        returned too, along with the session of the player: the worker can't know
+        about them.
+        """
+        try:
+            _, target, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ")
+            url = yarl.URL(target)
+        except ValueError:
+            # a bad request, any worker can refuse it
+            return next(self._next_worker), None
+
+        match url.path.split("/"):
+            case ["", "ws", _, game_id]:
+                return owner(game_id, len(self._channels)), None
+            case ["", "ws", game_type] if game_type in BaseGame.GAMES:
+                session_id = _session_id(head) or secrets.token_hex()
+                if "bot" in url.query:
+                    # tables against the bots don't wait for other players
+                    game_id = secrets.token_hex()
+                else:
+                    game_id = self.matchmaker.find_table(game_type, session_id)
+                worker = owner(game_id, len(self._channels))
+                return worker, Assignment(game_id, session_id)
+            case _:
+                return next(self._next_worker), None
+
+    async def serve(self, listener: socket.socket) -> None:
+        loop = asyncio.get_running_loop()
+        self.matchmaker.start()
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for channel in self._channels:
+                    tg.create_task(self._receive(channel))
+                try:
+                    while True:
+                        conn, _ = await loop.sock_accept(listener)
+                        handler = asyncio.create_task(self._handle(conn))
+                        self._handlers.add(handler)
+                        handler.add_done_callback(self._handlers.discard)
+                finally:
+                    for handler in self._handlers:
+                        handler.cancel()
+        finally:
+            await self.matchmaker.stop()
+
+    async def _receive(self, channel: socket.socket) -> None:
+        while True:
+            data, _ = await _recv(channel)
+            if data is None:
+                err = "A worker exited"
+                raise RuntimeError(err)
+            if seated := data.get("seated"):
+                self.matchmaker.seated(*seated)
+            elif left := data.get("left"):
+                self.matchmaker.left(*left)
+
+    async def _handle(self, conn: socket.socket) -> None:
+        with conn:
+            conn.setblocking(False)
+            try:
+                async with asyncio.timeout(HEAD_TIMEOUT):
+                    head = await _peek_head(conn)
+            except TimeoutError, OSError:
+                return
+            if head.startswith(b"GET /status/matchmaking.json "):
+                # only the front process knows about the tables
+                await self._send_metrics(conn, head)
+                return
+            worker, assignment = self.route(head)
+            data = assignment._asdict() if assignment is not None else {}
+            await _send(self._channels[worker], data, [conn.fileno()])
+
+    async def _send_metrics(self, conn: socket.socket, head: bytes) -> None:
+        # consume the request, closing a socket with unread data resets it
+        conn.recv(len(head))
+        body = json.dumps(dataclasses.asdict(self.matchmaker.metrics)).encode()
+        response = (
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/json; charset=utf-8\r\n"
+            b"Content-Length: %d\r\n"
+            b"Connection: close\r\n"
+            b"\r\n" % len(body)
+        )
+        with contextlib.suppress(OSError):
+            await asyncio.get_running_loop().sock_sendall(conn, response + body)
+
+
+class Worker:
+    """Serve the connections handed over by the front process.
+
+    The front process finds the tables of the players, the worker tells it when they
+    sit down and when they leave.
+    """
+
+    def __init__(self, index: int, workers: int, channel: socket.socket) -> None:
+        self.index = index
+        self.workers = workers
+        self._channel = channel
+        # the table found by the front for the last connection with each descriptor
+        self._assignments: dict[int, Assignment] = {}
+        self._outbox: deque[bytes] = deque()
+
+    def owns(self, game_id: str) -> bool:
+        return owner(game_id, self.workers) == self.index
+
+    def assignment(self, request: web.Request) -> Assignment | None:
+        if request.transport is None:
+            return None
+        sock = request.transport.get_extra_info("socket")
+        return self._assignments.pop(sock.fileno(), None)
+
+    def seated(self, game_type: str, game_id: str, session_id: str) -> None:
+        self._notify({"seated": [game_type, game_id, session_id]})
+
+    def left(self, game_type: str, game_id: str, session_id: str) -> None:
+        self._notify({"left": [game_type, game_id, session_id]})
+
+    def _notify(self, data: dict[str, Any]) -> None:
+        self._outbox.append(json.dumps(data).encode())
+        if len(self._outbox) == 1:
+            self._flush()
+
+    def _flush(self) -> None:
+        # the messages are sent in order, the ones that don't fit in the buffer of the
+        # socket wait for it to be writable
+        loop = asyncio.get_running_loop()
+        while self._outbox:
+            try:
+                self._channel.send(self._outbox[0])
+            except BlockingIOError:
+                loop.add_writer(self._channel, self._flush)
+                return
+            self._outbox.popleft()
+        loop.remove_writer(self._channel)
+
+    async def serve(self, app: web.Application) -> None:
+        """Serve `app` until the front process is gone."""
+        loop = asyncio.get_running_loop()
+        runner = web.AppRunner(app, handle_signals=False)
+        await runner.setup()
+        try:
+            assert runner.server is not None
+            while True:
+                data, fds = await _recv(self._channel)
+                if data is None:
+                    return
+                sock = socket.socket(fileno=fds[0])
+                sock.setblocking(False)
+                if data:
+                    self._assignments[sock.fileno()] = Assignment(**data)
+                else:
+                    self._assignments.pop(sock.fileno(), None)
+                try:
+                    await loop.connect_accepted_socket(runner.server, sock)
+                except OSError:
+                    logger.warning("Couldn't serve a connection", exc_info=True)
+                    sock.close()
+        finally:
+            await runner.cleanup()
+
+
+def _run_worker(
+    index: int,
+    workers: int,
+    channel: socket.socket,
+    app_factory: Callable[..., web.Application],
+) -> None:
+    # the front process stops the workers after an interrupt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    env = Env()
+    env.read_env()
+    channel.setblocking(False)
+    worker = Worker(index, workers, channel)
+    app = app_factory(env, worker=worker)
+
+    async def _serve() -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        await worker.serve(app)
+
+    with contextlib.suppress(asyncio.CancelledError):
+        asyncio.run(_serve())
+
+
+def _graceful_exit(signum: int, frame: object) -> None:  # noqa: ARG001
+    raise web.GracefulExit
+
+
+def run(
+    port: int,
+    workers: int,
+    app_factory: Callable[..., web.Application],
+    matchmaker: Matchmaker,
+) -> None:
+    """Listen on `port`, and serve the apps of `workers` processes."""
+    # share the cores between the bots of every worker
+    os.environ.setdefault(
+        "BOT_WORKERS", str(max(1, (os.process_cpu_count() or 1) // workers))
+    )
+    if socket.has_dualstack_ipv6():
+        listener = socket.create_server(
+            ("", port), family=socket.AF_INET6, dualstack_ipv6=True, backlog=1024
+        )
+    else:
+        listener = socket.create_server(("", port), backlog=1024)
+    listener.setblocking(False)
+
+    context = multiprocessing.get_context("spawn")
+    channels = []
+    processes = []
+    for index in range(workers):
+        front_channel, worker_channel = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_SEQPACKET
+        )
+        front_channel.setblocking(False)
+        channels.append(front_channel)
+        process = context.Process(
+            target=_run_worker,
+            args=(index, workers, worker_channel, app_factory),
+            name=f"carte-worker-{index}",
+        )
+        process.start()
+        worker_channel.close()
+        processes.append(process)
+
+    print(f"======== Running on http://0.0.0.0:{port} with {workers} workers ========")
+    signal.signal(signal.SIGTERM, _graceful_exit)
+    try:
+        asyncio.run(Front(channels, matchmaker).serve(listener))
+    except KeyboardInterrupt, web.GracefulExit:
+        pass
+    finally:
+        listener.close()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
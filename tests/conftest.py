@@ -1,8 +1,7 @@
-import random
 from typing import Any
 
+import aiohttp
 import pytest
-import pytest_asyncio
 from aiohttp import web
 
 from carte.games import BaseGame, Briscola, Scopa
@@ -14,12 +13,24 @@ class DummyWebsocketResponse(web.WebSocketResponse):
         self._closed = False
         self._messages: list[str] = []
 
-    async def send_str(
+    async def send_frame(
         self,
-        data: str,
+        message: bytes,
+        opcode: aiohttp.WSMsgType,  # noqa: ARG002
         compress: int | None = None,  # noqa: ARG002
     ) -> None:
-        self._messages.append(data)
+        self._messages.append(message.decode())
+
+    async def close(
+        self,
+        *,
+        code: int = aiohttp.WSCloseCode.OK,
+        message: bytes = b"",  # noqa: ARG002
+        drain: bool = True,  # noqa: ARG002
+    ) -> bool:
+        self._closed = True
+        self._close_code = code
+        return True
 
     def _get_message(self, cmd: str) -> list[str]:
         return next(
@@ -30,8 +41,8 @@ class DummyWebsocketResponse(web.WebSocketResponse):
 type Game[T: BaseGame[Any]] = tuple[T, list[DummyWebsocketResponse]]
 
 
-def make_game[T: BaseGame[Any]](game_type: type[T]) -> Game[T]:
-    game = game_type("")
+def make_game[T: BaseGame[Any]](game_type: type[T], seed: int | None = None) -> Game[T]:
+    game = game_type("", seed)
     websockets = []
 
     for i in range(game.number_of_players):
@@ -45,22 +56,24 @@ def make_game[T: BaseGame[Any]](game_type: type[T]) -> Game[T]:
     return game, websockets
 
 
+async def start_game(game: BaseGame[Any]) -> None:
+    """Start the game without shuffling the players, and send its events."""
+    game._prepare_start()
+    async with game._outbound():
+        game._render(game._take_events())
+
+
+def get_seed(request: pytest.FixtureRequest) -> int | None:
+    callspec = getattr(request.node, "callspec", None)
+    seed = callspec.params.get("seed") if callspec else None
+    return seed if isinstance(seed, int) else None
+
+
 @pytest.fixture
-def briscola() -> Game[Briscola]:
-    return make_game(Briscola)
+def briscola(request: pytest.FixtureRequest) -> Game[Briscola]:
+    return make_game(Briscola, get_seed(request))
 
 
 @pytest.fixture
-def scopa() -> Game[Scopa]:
-    return make_game(Scopa)
-
-
-@pytest.fixture(autouse=True)
-def set_seed(request: pytest.FixtureRequest) -> None:
-    if (
-        isinstance(request.node, pytest_asyncio.plugin.Coroutine)
-        and request.node.callspec is not None
-    ):
-        seed = request.node.callspec.params.get("seed")
-        if isinstance(seed, int):
-            random.seed(seed)
+def scopa(request: pytest.FixtureRequest) -> Game[Scopa]:
+    return make_game(Scopa, get_seed(request))
@@ -0,0 +1,320 @@
+import asyncio
+import pickle
+from typing import Any
+
+import aiohttp
+import pytest
+
+from carte.codec import Writer
+from carte.exc import CmdError
+from carte.games import BaseGame, Briscola, Scopa
+from carte.games.base import MULTILINE_FRAMES
+from carte.games.scopa import ScopaPlayingStatus
+from carte.types import CARDS, Card, CardNumber, Event, GameStatus, Suit
+from tests.conftest import DummyWebsocketResponse, Game, make_game, start_game
+
+
+def test_cards() -> None:
+    assert len(set(CARDS)) == 40
+    assert [card.id for card in CARDS] == list(range(40))
+
+    card = Card.parse("denari:7")
+    assert card is CARDS[card.id]
+    assert card == Card(Suit.DENARI, CardNumber.SETTE)
+    assert str(card) == "denari:7"
+    assert str(pickle.loads(pickle.dumps(card))) == "denari:7"
+
+    with pytest.raises(ValueError, match="Invalid card"):
+        Card.parse("denari:11")
+
+
+def test_commands() -> None:
+    assert set(Briscola.commands) == {
+        "current_state",
+        "join",
+        "name",
+        "play",
+        "rematch",
+        "resume",
+    }
+    assert set(Scopa.commands) == set(Briscola.commands) | {"take_choice"}
+
+    assert Briscola.commands["play"].params == 1
+    assert Briscola.commands["play"].journaled
+    assert Briscola.commands["join"].params == 1
+    assert not Briscola.commands["join"].journaled
+
+
+async def test_invalid_commands(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    await start_game(game)
+    ws = websockets[game._current_player_id]
+
+    with pytest.raises(CmdError, match="Invalid command"):
+        await game.handle_cmd(ws, game.current_player, "_send")
+    with pytest.raises(CmdError, match="1 expected, 0 given"):
+        await game.handle_cmd(ws, game.current_player, "play")
+    with pytest.raises(CmdError, match="Invalid card"):
+        await game.handle_cmd(ws, game.current_player, "play", "spade")
+    with pytest.raises(CmdError, match="not a player"):
+        await game.handle_cmd(ws, None, "name", "Player")
+
+
+async def test_multiline_frames(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    websockets[0][MULTILINE_FRAMES] = True
+    await start_game(game)
+    websockets[0]._messages.clear()
+    websockets[1]._messages.clear()
+
+    for _ in range(2):
+        player_id = game._current_player_id
+        card = game.current_player.hand[0]
+        await game.handle_cmd(
+            websockets[player_id], game.current_player, "play", str(card)
+        )
+
+    # each command is sent as a single frame to the clients that support it
+    assert len(websockets[0]._messages) == 2
+    lines = "\n".join(websockets[0]._messages).split("\n")
+    assert len(lines) > 2
+    assert lines[0].startswith("play_card|")
+    assert websockets[1]._messages[0] == lines[0]
+    assert len(websockets[1]._messages) > 2
+
+
+async def test_send_errors(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+
+    async def send_frame(*args: object, **kwargs: object) -> None:
+        raise ConnectionResetError
+
+    websockets[0].send_frame = send_frame  # type: ignore[method-assign]
+    websockets[0][MULTILINE_FRAMES] = True
+    await start_game(game)
+    # the other players still get their messages
+    assert game.send_errors == 1
+    assert websockets[1]._messages
+
+
+async def test_resume(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    for i, ws in enumerate(websockets):
+        game.add_viewer(ws, f"viewer{i}", game._players[i])
+    await start_game(game)
+
+    async def play() -> None:
+        player = game.current_player
+        ws = websockets[game._current_player_id]
+        await game.handle_cmd(ws, player, "play", str(player.hand[0]))
+
+    await play()
+
+    # the player waiting for their turn loses the connection while the other one plays
+    player_id = 1 - game._current_player_id
+    player = game._players[player_id]
+    old_ws = websockets[player_id]
+    last_seq = old_ws._messages[-1].split("|")[0]
+    player.websockets.discard(old_ws)
+    game.websockets.discard(old_ws)
+    await play()
+
+    new_ws = websockets[player_id] = DummyWebsocketResponse()
+    game.add_viewer(new_ws, f"viewer{player_id}", player)
+    game.websockets.add(new_ws)
+    await game.handle_cmd(new_ws, player, "resume", game._epoch, last_seq, player.name)
+
+    seqs = [int(x.split("|")[0]) for x in new_ws._messages]
+    assert seqs == sorted(seqs)
+    assert seqs[0] > int(last_seq)
+    assert seqs[-1] <= game._seq
+    msgs = [x.split("|")[1] for x in new_ws._messages]
+    assert "play_card" in msgs
+    assert "begin" not in msgs
+    assert new_ws in player.websockets
+
+    # sequence numbers from another epoch can't be resumed
+    other_ws = DummyWebsocketResponse()
+    game.add_viewer(other_ws, f"viewer{player_id}", player)
+    await game.handle_cmd(other_ws, player, "resume", "epoch", last_seq, player.name)
+    assert any(x.endswith("|begin") for x in other_ws._messages)
+
+
+async def test_resume_evicted_viewer(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    for i, ws in enumerate(websockets):
+        game.add_viewer(ws, f"viewer{i}", game._players[i])
+    await start_game(game)
+
+    # the player waiting for their turn loses the connection while the other one plays
+    player_id = 1 - game._current_player_id
+    player = game._players[player_id]
+    old_ws = websockets[player_id]
+    last_seq = old_ws._messages[-1].split("|")[0]
+    player.websockets.discard(old_ws)
+    card = game.current_player.hand[0]
+    await game.handle_cmd(
+        websockets[1 - player_id], game.current_player, "play", str(card)
+    )
+
+    # and the spectators push their viewer out, with the messages they missed
+    for i in range(game.max_viewers):
+        game.add_viewer(DummyWebsocketResponse(), f"spectator{i}", None)
+    assert f"viewer{player_id}" not in game._viewers
+
+    new_ws = DummyWebsocketResponse()
+    game.add_viewer(new_ws, f"viewer{player_id}", player)
+    await game.handle_cmd(new_ws, player, "resume", game._epoch, last_seq, player.name)
+    msgs = [x.split("|", 1)[1] for x in new_ws._messages]
+    assert "begin" in msgs
+    assert msgs[-2:] == ["turn", "animations|on"]
+
+
+async def test_error_resume(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    for i, ws in enumerate(websockets):
+        game.add_viewer(ws, f"viewer{i}", game._players[i])
+    await start_game(game)
+    ws = websockets[game._current_player_id]
+    ws._messages.clear()
+
+    error = CmdError("Invalid card", "play")
+    await game.handle_error(ws, game.current_player, error)
+
+    assert [x.split("|", 1)[1] for x in ws._messages] == [
+        "turn",
+        "error|Invalid card|play",
+    ]
+
+
+async def test_inbox(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    await start_game(game)
+    first = game.current_player
+    second = game._players[1 - game._current_player_id]
+
+    # the commands are run in the order they are received, an error doesn't stop the
+    # ones after it
+    results = await asyncio.gather(
+        game.handle_cmd(websockets[0], first, "play", str(first.hand[0])),
+        game.handle_cmd(websockets[0], first, "play", "spade"),
+        game.handle_cmd(websockets[1], second, "play", str(second.hand[0])),
+        return_exceptions=True,
+    )
+    assert results[0] is None
+    assert isinstance(results[1], CmdError)
+    assert results[2] is None
+    assert game.inbox_depth == 0
+    assert game.max_inbox_depth >= 1
+
+
+async def test_inbox_checks(briscola: Game[Briscola]) -> None:
+    game, websockets = briscola
+    await start_game(game)
+    player = game.current_player
+    ws = websockets[game._current_player_id]
+    other_ws = websockets[1 - game._current_player_id]
+
+    # the game is busy sending the messages of a command to a slow client
+    sent = asyncio.Event()
+    send_frame = other_ws.send_frame
+
+    async def slow_send_frame(
+        message: bytes, opcode: aiohttp.WSMsgType, compress: int | None = None
+    ) -> None:
+        await sent.wait()
+        await send_frame(message, opcode, compress)
+
+    other_ws.send_frame = slow_send_frame  # type: ignore[method-assign]
+    busy = asyncio.create_task(game.handle_cmd(ws, player, "name", "Player"))
+    await asyncio.sleep(0)
+
+    # two connections of the player play a card each, before any of them runs
+    first = asyncio.create_task(
+        game.handle_cmd(ws, player, "play", str(player.hand[0]))
+    )
+    second = asyncio.create_task(
+        game.handle_cmd(ws, player, "play", str(player.hand[1]))
+    )
+    await asyncio.sleep(0)
+    assert game.inbox_depth == 2
+    sent.set()
+
+    await busy
+    await first
+    with pytest.raises(CmdError, match="not your turn"):
+        await second
+
+
+@pytest.mark.parametrize("seed", [123])
+async def test_headless(briscola: Game[Briscola], seed: int) -> None:
+    game, websockets = briscola
+    game._prepare_start()
+    events = game._take_events()
+    assert Event(("begin",)) in events
+    assert Event(("turn",), game._current_player_id) in events
+
+    with pytest.raises(CmdError, match="Invalid command"):
+        game.apply(0, "join", "Player")
+    with pytest.raises(CmdError, match="not your turn"):
+        game.apply(1 - game._current_player_id, "play", str(CARDS[0]))
+
+    while game.game_status is GameStatus.STARTED:
+        player_id = game._current_player_id
+        card = game.current_player.hand[0]
+        events = game.apply(player_id, "play", str(card))
+        assert events[0] == Event(("play_card", player_id, card))
+
+    # same results as test_briscola.test_full_game, without touching the websockets
+    assert events[-1] == Event(("results", 110, 10))
+    assert not websockets[0]._messages
+
+
+def encode_state(game: BaseGame[Any]) -> bytes:
+    writer = Writer()
+    game.encode_state(writer)
+    return writer.getvalue()
+
+
+@pytest.mark.parametrize("seed", [123])
+async def test_rejected_commands(scopa: Game[Scopa], seed: int) -> None:
+    game, _ = scopa
+    game.start()
+    player_id = game._current_player_id
+    not_in_hand = next(x for x in CARDS if x not in game.current_player.hand)
+
+    state = encode_state(game)
+    commands: list[tuple[int, tuple[str, ...]]] = [
+        (1 - player_id, ("play", str(game._players[1 - player_id].hand[0]))),
+        (player_id, ("play", str(not_in_hand))),
+        (player_id, ("play", "denari:11")),
+        (player_id, ("take_choice", str(game.current_player.hand[0]))),
+        (player_id, ("rematch",)),
+    ]
+    for command_player_id, command in commands:
+        with pytest.raises(CmdError):
+            game.apply(command_player_id, *command)
+        assert encode_state(game) == state
+        assert not game._take_events()
+
+
+@pytest.mark.parametrize("seed", [123])
+async def test_replay(scopa: Game[Scopa], seed: int) -> None:
+    game, _ = scopa
+    events = game.start()
+    commands = []
+    while game.game_status is GameStatus.STARTED:
+        player_id = game._current_player_id
+        if game._playing_status is ScopaPlayingStatus.CAPTURE:
+            command = ("take_choice", str(game._takeable_cards[-1]))
+        else:
+            command = ("play", str(game.current_player.hand[-1]))
+        commands.append((player_id, command))
+        events += game.apply(player_id, *command)
+
+    # the seed and the commands are enough to replay the whole game
+    replayed_game, _ = make_game(Scopa, game.seed)
+    replayed_events = replayed_game.start()
+    for player_id, command in commands:
+        replayed_events += replayed_game.apply(player_id, *command)
+    assert replayed_events == events
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+
+from carte.bench import CASES, Result, compare, dump, load
+from carte.bench.runner import measure
+
+
+@pytest.mark.parametrize("name", CASES)
+async def test_cases(name: str) -> None:
+    assert await CASES[name](2) > 0
+
+
+async def test_measure() -> None:
+    calls = []
+
+    async def case(loops: int) -> float:
+        calls.append(loops)
+        return loops * 0.001
+
+    result = await measure(case, samples=3, min_time=0.05)
+    # the loops grow until a sample lasts long enough
+    assert calls[0] == 1
+    assert result.loops >= 50
+    assert calls[-3:] == [result.loops] * 3
+    assert result.samples == 3
+    assert result.median == pytest.approx(0.001)
+
+
+def test_compare(tmp_path: Path) -> None:
+    results = {
+        "fast": Result(median=1.0, min=1.0, stdev=0.0, loops=1, samples=1),
+        "slow": Result(median=1.5, min=1.5, stdev=0.0, loops=1, samples=1),
+        "new": Result(median=1.0, min=1.0, stdev=0.0, loops=1, samples=1),
+    }
+    path = tmp_path / "results.json"
+    dump({k: v for k, v in results.items() if k != "new"}, path)
+    baseline = load(path)
+    assert baseline == {"fast": results["fast"], "slow": results["slow"]}
+
+    baseline["slow"] = baseline["fast"]
+    comparisons = {x.name: x for x in compare(results, baseline, 0.2)}
+    assert comparisons["fast"].ratio == 1
+    assert not comparisons["fast"].regression
+    assert comparisons["slow"].ratio == 1.5
+    assert comparisons["slow"].regression
+    assert comparisons["new"].ratio is None
+    assert not comparisons["new"].regression
+
+    path.write_text('{"version": 0}')
+    with pytest.raises(ValueError, match="Unsupported"):
+        load(path)
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from carte.bots import BotPool
+from carte.games import BaseGame, Briscola, Scopa
+from carte.games.scopa import ScopaPlayingStatus
+from carte.games.search import Budget, Difficulty
+from carte.types import GameStatus
+from tests.conftest import DummyWebsocketResponse, Game
+
+
+async def wait_bots(game: BaseGame[Any]) -> bool:
+    """Wait for the bots to play, return whether the game is still going on."""
+    if game._bots_task is not None:
+        await game._bots_task
+    return game.game_status is GameStatus.STARTED
+
+
+@pytest.mark.parametrize("game_type", [Briscola, Scopa])
+async def test_bot_game(game_type: type[Briscola | Scopa]) -> None:
+    bot_pool = BotPool(max_workers=1, max_searches=1)
+    try:
+        game: BaseGame[Any] = game_type("", 1)
+        game.bot_pool = bot_pool
+        bot = game.add_bot(Difficulty.EASY)
+        player = game.add_player("player")
+        assert bot is not None
+        assert player is not None
+        ws = DummyWebsocketResponse()
+        game.websockets.add(ws)
+        player.websockets.add(ws)
+
+        await game.handle_cmd(ws, player, "join", "Player")
+        while await wait_bots(game):
+            assert game.current_player == player
+            if (
+                isinstance(game, Scopa)
+                and game._playing_status is ScopaPlayingStatus.CAPTURE
+            ):
+                card = game._takeable_cards[0]
+                await game.handle_cmd(ws, player, "take_choice", str(card))
+            else:
+                await game.handle_cmd(ws, player, "play", str(player.hand[0]))
+
+        # the bot is always ready for a rematch
+        assert bot.ready
+        await game.handle_cmd(ws, player, "rematch")
+        assert await wait_bots(game)
+        assert game.current_player == player
+    finally:
+        await bot_pool.close()
+
+    assert bot_pool.metrics.searches > 0
+    assert bot_pool.metrics.running == 0
+    assert bot_pool.metrics.errors == 0
+
+
+async def test_max_searches(briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    game.start()
+    bot_pool = BotPool(max_workers=2, max_searches=1)
+    try:
+        state = game.search_state()
+        moves = await asyncio.gather(
+            *(bot_pool.search(state, Budget(playouts=20)) for _ in range(4))
+        )
+    finally:
+        await bot_pool.close()
+
+    assert all(move in state.moves() for move in moves)
+    assert bot_pool.metrics.searches == 4
+    assert bot_pool.metrics.max_waiting > 1
+
+
+async def test_endgame_analysis(
+    monkeypatch: pytest.MonkeyPatch, briscola: Game[Briscola]
+) -> None:
+    monkeypatch.setattr(BaseGame, "analyze_endgames", True)
+    game, websockets = briscola
+    bot_pool = BotPool(max_workers=1, max_searches=1)
+    game.bot_pool = bot_pool
+    try:
+        game.start()
+        while game.game_status is GameStatus.STARTED:
+            player = game.current_player
+            await game.handle_cmd(websockets[0], player, "play", str(player.hand[0]))
+        assert game._endgame is not None
+        assert game._analysis_task is not None
+        await game._analysis_task
+    finally:
+        await bot_pool.close()
+
+    assert game._best_play is not None
+    best = websockets[0]._get_message("results_best")
+    assert best == ["results_best", *map(str, game._best_play)]
+    assert list(game._results())[-1] == ["results_best", *game._best_play]
+    assert bot_pool.metrics.endgames == 1
+    assert bot_pool.metrics.transposition_lookups > 0
+
+
+async def test_endgame_search(briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    game.start()
+    state = game.search_state()
+    while state.deck:
+        state.play(state.moves()[0])
+    bot_pool = BotPool(max_workers=1, max_searches=1)
+    try:
+        assert await bot_pool.search(state, Difficulty.NORMAL.budget) in state.moves()
+        await bot_pool.search(state, Difficulty.EASY.budget)
+    finally:
+        await bot_pool.close()
+
+    # only the stronger bots solve the endgames
+    assert bot_pool.metrics.searches == 2
+    assert bot_pool.metrics.endgames == 1
@@ -1,16 +1,21 @@
+import itertools
+import pickle
+
 import pytest
 
+from carte import codec
 from carte.games import Briscola
-from carte.types import GameStatus
-from tests.conftest import Game
+from carte.games.briscola import CARD_POINTS, POINTS, trick_winner
+from carte.types import CARDS, GameStatus, SavedGame, Suit
+from tests.conftest import Game, start_game
 
 
 @pytest.mark.parametrize(
     ("seed", "results"),
     [
-        (123, [50, 70]),
-        (321, [60, 60]),
-        (111, [27, 93]),
+        (123, [110, 10]),
+        (321, [48, 72]),
+        (111, [67, 53]),
     ],
 )
 async def test_full_game(
@@ -18,7 +23,7 @@ async def test_full_game(
 ) -> None:
     game, websockets = briscola
 
-    await game._prepare_start()
+    await start_game(game)
 
     while game._game_status is GameStatus.STARTED:
         player_id = game._current_player_id
@@ -28,3 +33,42 @@ async def test_full_game(
         )
 
     assert results == [int(x) for x in websockets[0]._get_message("results")[1:]]
+
+
+def test_trick_winner() -> None:
+    card_order = list(CARD_POINTS)
+    for trump_id, trump in enumerate(Suit):
+        for first, second in itertools.permutations(CARDS, 2):
+            if second.suit == first.suit:
+                second_wins = card_order.index(second.number) > card_order.index(
+                    first.number
+                )
+            else:
+                second_wins = second.suit == trump
+            assert trick_winner([first.id, second.id], trump_id) == int(second_wins)
+
+    assert sum(POINTS) == 120
+
+
+@pytest.mark.parametrize("seed", [123])
+async def test_scores(briscola: Game[Briscola], seed: int) -> None:
+    game, websockets = briscola
+    await start_game(game)
+    for _ in range(10):
+        player_id = game._current_player_id
+        card = game.current_player.hand[0]
+        await game.handle_cmd(
+            websockets[player_id], game.current_player, "play", str(card)
+        )
+
+    scores = [sum(POINTS[card.id] for card in p.points) for p in game._players]
+    assert game._scores == scores
+    loaded_game = codec.loads(codec.dumps(SavedGame(game))).game
+    assert isinstance(loaded_game, Briscola)
+    assert loaded_game._scores == scores
+
+    state = pickle.loads(pickle.dumps(game)).__dict__
+    del state["_scores"]
+    restored_game = Briscola.__new__(Briscola)
+    restored_game.__setstate__(state)
+    assert restored_game._scores == scores
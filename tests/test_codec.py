@@ -0,0 +1,90 @@
+import pickle
+from typing import Any
+
+import pytest
+
+from carte import codec
+from carte.games import BaseGame, Briscola, Scopa
+from carte.games.scopa import ScopaPlayingStatus
+from carte.types import SavedGame
+from tests.conftest import Game, start_game
+
+
+@pytest.mark.parametrize("seed", [123, 321])
+async def test_briscola(briscola: Game[Briscola], seed: int) -> None:
+    game, websockets = briscola
+    await start_game(game)
+    for _ in range(5):
+        player_id = game._current_player_id
+        card = game.current_player.hand[0]
+        await game.handle_cmd(
+            websockets[player_id], game.current_player, "play", str(card)
+        )
+
+    saved_game = SavedGame(game)
+    data = codec.dumps(saved_game)
+    assert len(data) < len(pickle.dumps(saved_game))
+
+    loaded_game = codec.loads(data)
+    assert loaded_game.last_saved == saved_game.last_saved
+    restored_game = loaded_game.game
+    assert isinstance(restored_game, Briscola)
+    assert restored_game.game_status == game.game_status
+    assert restored_game.seed == game.seed
+    assert restored_game._deals == game._deals
+    assert restored_game._deck == game._deck
+    assert restored_game._current_player_id == game._current_player_id
+    assert restored_game._briscola == game._briscola
+    assert restored_game._played_cards == game._played_cards
+    for restored_player, player in zip(
+        restored_game._players, game._players, strict=True
+    ):
+        assert restored_player._token == player._token
+        assert restored_player.name == player.name
+        assert restored_player.hand == player.hand
+        assert restored_player.points == player.points
+
+
+@pytest.mark.parametrize("seed", [843, 176])
+async def test_scopa(scopa: Game[Scopa], seed: int) -> None:
+    game, websockets = scopa
+    await start_game(game)
+    while game._playing_status is not ScopaPlayingStatus.CAPTURE:
+        player_id = game._current_player_id
+        card = game.current_player.hand[0]
+        await game.handle_cmd(
+            websockets[player_id], game.current_player, "play", str(card)
+        )
+
+    saved_game: BaseGame[Any] = game
+    restored_game = codec.loads(codec.dumps(SavedGame(saved_game))).game
+    assert isinstance(restored_game, Scopa)
+    assert restored_game._deck == game._deck
+    assert restored_game._table == game._table
+    assert restored_game._playing_status == game._playing_status
+    assert restored_game._active_card == game._active_card
+    assert restored_game._takeable_cards == game._takeable_cards
+    assert restored_game._selected_cards == game._selected_cards
+    for restored_player, player in zip(
+        restored_game._players, game._players, strict=True
+    ):
+        assert restored_player.hand == player.hand
+        assert restored_player.points == player.points
+        assert restored_player.scopa_cards == player.scopa_cards
+
+
+def test_pickle_fallback(briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    saved_game = SavedGame(game)
+
+    loaded_game = codec.loads(pickle.dumps(saved_game))
+    assert loaded_game.last_saved == saved_game.last_saved
+    assert loaded_game.game.player_names == game.player_names
+
+
+def test_truncated(briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    data = codec.dumps(SavedGame(game))
+
+    with pytest.raises(ValueError, match="Truncated"):
+        codec.loads(data[:-1])
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from carte.games import Briscola, Scopa
+from carte.games.endgame import Bound, Entry, TranspositionTable, is_endgame, solve
+from carte.games.search import SearchState
+from tests.conftest import make_game
+
+
+def reach_endgame(
+    game_type: type[Briscola | Scopa], seed: int, moves: int = 0
+) -> SearchState:
+    game, _ = make_game(game_type, seed)
+    game.start()
+    rng = random.Random(seed)
+    state: SearchState = game.search_state()
+    while not is_endgame(state):
+        state.play(rng.choice(state.moves()))
+    for _ in range(moves):
+        state.play(rng.choice(state.moves()))
+    return state
+
+
+def margin(state: SearchState, points: list[int]) -> int:
+    return points[state.player_id] - points[1 - state.player_id]
+
+
+def minimax(state: SearchState) -> list[int]:
+    """Return the final points of the best play, without any pruning."""
+    if state.is_over():
+        return state.points()
+    results = []
+    for move in state.moves():
+        child = state.copy()
+        child.play(move)
+        results.append(minimax(child))
+    return max(results, key=lambda x: margin(state, x))
+
+
+@pytest.mark.parametrize(
+    ("game_type", "moves"), [(Briscola, 0), (Scopa, 6)], ids=["briscola", "scopa"]
+)
+@pytest.mark.parametrize("seed", [1, 2, 3, 4])
+def test_solve(game_type: type[Briscola | Scopa], moves: int, seed: int) -> None:
+    state = reach_endgame(game_type, seed, moves)
+    before = state.copy()
+    table = TranspositionTable()
+
+    solution = solve(state, table)
+    assert solution.move in state.moves()
+    assert margin(state, solution.points) == margin(state, minimax(state))
+    # the search doesn't touch the state
+    assert state.key() == before.key()
+
+    # the second time, the root is in the table
+    again = solve(state, table)
+    assert again.points == solution.points
+    assert again.hits > 0
+    assert again.nodes < solution.nodes
+
+
+def test_transposition_table() -> None:
+    table = TranspositionTable(max_entries=2)
+    assert table.hit_rate == 0
+    for key in range(3):
+        table.put(key, Entry(key, Bound.EXACT, key))
+    assert len(table) == 2
+    assert table.evictions == 1
+
+    # the oldest entry is dropped first
+    assert table.get(0) is None
+    assert table.get(2) == Entry(2, Bound.EXACT, 2)
+    assert table.hit_rate == 0.5
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from carte.games import Briscola
+from carte.idle_games import IdleGames, estimate_size
+from carte.journal import Journal
+from carte.store import SqliteGameStore
+from tests.conftest import make_game, start_game
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def test_idle_games(tmp_path: Path) -> None:
+    clock = Clock()
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        games = []
+        for i in range(5):
+            game, websockets = make_game(Briscola)
+            game.journal = Journal(store, "briscola", str(i))
+            game.add_viewer(websockets[0], "viewer", game._players[0])
+            await start_game(game)
+            games.append(game)
+        size = estimate_size(games[0])
+        # room for two games
+        idle_games = IdleGames(max_size=size * 5 // 2, ttl=10, clock=clock)
+
+        idle_games.park(("briscola", "0"), games[0])
+        idle_games.park(("briscola", "1"), games[1])
+        assert idle_games.metrics.size == size + estimate_size(games[1])
+        # a player came back before the game went cold
+        idle_games.take(("briscola", "0"))
+        assert await store.load("briscola", "0") is None
+        idle_games.park(("briscola", "0"), games[0])
+
+        # the least recently parked game is saved to make room, in the background
+        idle_games.park(("briscola", "2"), games[2])
+        metrics = idle_games.metrics
+        assert metrics.hits == 1
+        assert metrics.evicted == 1
+        assert metrics.games == 2
+        assert metrics.pending == 1
+        clock.now = 5
+        idle_games.park(("briscola", "3"), games[3])
+        assert idle_games.metrics.evicted == 2
+
+        clock.now = 12
+        idle_games.expire()
+        assert idle_games.metrics.expired == 1
+        assert idle_games.metrics.games == 1
+
+        # the messages recorded for the viewers count too, a game larger than the
+        # budget is saved right away
+        for _ in range(500):
+            games[4]._send("players", *games[4].player_names)
+        assert estimate_size(games[4]) > idle_games.max_size
+        idle_games.park(("briscola", "4"), games[4])
+        assert idle_games.metrics.evicted == 4
+        assert idle_games.metrics.games == 0
+
+        await idle_games.close()
+        assert idle_games.metrics.size == 0
+        assert idle_games.metrics.pending == 0
+        for i in range(5):
+            assert await store.load("briscola", str(i)) is not None
+    finally:
+        await store.close()
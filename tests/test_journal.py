@@ -0,0 +1,124 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from carte.games import Briscola, Scopa
+from carte.games.scopa import ScopaPlayingStatus
+from carte.journal import Journal
+from carte.store import SqliteGameStore
+from tests.conftest import Game, start_game
+
+
+@pytest.mark.parametrize("seed", [123, 321])
+async def test_restore_briscola(
+    tmp_path: Path, briscola: Game[Briscola], seed: int
+) -> None:
+    game, websockets = briscola
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        game.journal = Journal(store, "briscola", "", snapshot_interval=8)
+        await start_game(game)
+        await game.journal.snapshot(game)
+
+        for _ in range(13):
+            player_id = game._current_player_id
+            card = game.current_player.hand[0]
+            await game.handle_cmd(
+                websockets[player_id], game.current_player, "play", str(card)
+            )
+
+        restored_game = await Journal.restore(store, "briscola", "")
+        assert isinstance(restored_game, Briscola)
+        assert restored_game._deck == game._deck
+        assert restored_game._current_player_id == game._current_player_id
+        assert restored_game._played_cards == game._played_cards
+        for restored_player, player in zip(
+            restored_game._players, game._players, strict=True
+        ):
+            assert restored_player.hand == player.hand
+            assert restored_player.points == player.points
+    finally:
+        await store.close()
+
+
+@pytest.mark.parametrize("seed", [843, 176])
+async def test_restore_scopa(tmp_path: Path, scopa: Game[Scopa], seed: int) -> None:
+    game, websockets = scopa
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        game.journal = Journal(store, "scopa", "")
+        await start_game(game)
+        await game.journal.snapshot(game)
+
+        for _ in range(15):
+            player_id = game._current_player_id
+            if game._playing_status is ScopaPlayingStatus.HAND:
+                card = game.current_player.hand[0]
+                await game.handle_cmd(
+                    websockets[player_id], game.current_player, "play", str(card)
+                )
+            else:
+                card = game._takeable_cards[0]
+                await game.handle_cmd(
+                    websockets[player_id], game.current_player, "take_choice", str(card)
+                )
+
+        restored_game = await Journal.restore(store, "scopa", "")
+        assert isinstance(restored_game, Scopa)
+        assert restored_game._deck == game._deck
+        assert restored_game._table == game._table
+        assert restored_game._playing_status == game._playing_status
+        assert restored_game._selected_cards == game._selected_cards
+        for restored_player, player in zip(
+            restored_game._players, game._players, strict=True
+        ):
+            assert restored_player.hand == player.hand
+            assert restored_player.points == player.points
+    finally:
+        await store.close()
+
+
+@pytest.mark.parametrize("seed", [123])
+@pytest.mark.parametrize(
+    "bad_entry",
+    [
+        # a truncated entry
+        ("play", '["denari:'),
+        # an entry that can't be replayed
+        ("play", '["spade"]'),
+    ],
+)
+async def test_restore_bad_journal(
+    tmp_path: Path, briscola: Game[Briscola], seed: int, bad_entry: tuple[str, str]
+) -> None:
+    game, websockets = briscola
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        game.journal = Journal(store, "briscola", "")
+        await start_game(game)
+        await game.journal.snapshot(game)
+        hand = list(game.current_player.hand)
+        player_id = game._current_player_id
+        await game.handle_cmd(
+            websockets[player_id], game.current_player, "play", str(hand[0])
+        )
+
+        cmd, args = bad_entry
+        conn = sqlite3.connect(tmp_path / "games.sqlite3")
+        with conn:
+            conn.execute(
+                "INSERT INTO journal (game_type, game_id, player_id, cmd, args) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ("briscola", "", player_id, cmd, args),
+            )
+        conn.close()
+
+        # the game is rebuilt from its snapshot, and the journal is dropped
+        restored_game = await Journal.restore(store, "briscola", "")
+        assert isinstance(restored_game, Briscola)
+        assert restored_game._players[player_id].hand == hand
+        assert await store.load_journal("briscola", "") == []
+        assert await Journal.restore(store, "briscola", "") is not None
+    finally:
+        await store.close()
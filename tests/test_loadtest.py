@@ -0,0 +1,72 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestServer
+from typenv import Env
+
+from carte.app import create_app
+from carte.loadtest import percentiles, run
+from carte.monitor import LoopLagMonitor
+
+
+@pytest.fixture
+async def server(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> AsyncIterator[TestServer]:
+    monkeypatch.setenv("DATA_PATH", str(tmp_path))
+    monkeypatch.setenv("BOT_WORKERS", "1")
+    server = TestServer(create_app(Env()), host="127.0.0.1")
+    await server.start_server()
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+@pytest.mark.parametrize("game_type", ["briscola", "scopa"])
+async def test_run(server: TestServer, game_type: str) -> None:
+    report = await run(
+        str(server.make_url("")).rstrip("/"),
+        game_type,
+        clients=4,
+        games=2,
+        disconnect_rate=0.05,
+        duration=30,
+        seed=1,
+    )
+    assert report.unfinished == 0
+    assert report.games == 4
+    assert report.moves > 0
+    assert report.round_trip_p50 <= report.round_trip_p95 <= report.round_trip_p99
+    assert report.frames_per_second > 0
+    assert report.server_loop_lag is not None
+
+    with pytest.raises(ValueError, match="must be even"):
+        await run("", game_type, clients=3)
+
+
+def test_percentiles() -> None:
+    assert percentiles([]) == (0, 0, 0)
+    assert percentiles([0.5]) == (0.5, 0.5, 0.5)
+    p50, p95, p99 = percentiles([x / 100 for x in range(101)])
+    assert p50 == pytest.approx(0.5)
+    assert p95 == pytest.approx(0.95)
+    assert p99 == pytest.approx(0.99)
+
+
+async def test_loop_lag_monitor() -> None:
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    # block the event loop
+    asyncio.get_running_loop().call_soon(time.sleep, 0.05)
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+    metrics = monitor.metrics
+    assert metrics.samples > 1
+    assert metrics.max >= 0.03
+    assert metrics.p50 < metrics.max
@@ -0,0 +1,148 @@
+import asyncio
+from pathlib import Path
+
+import aiohttp
+import pytest
+from aiohttp.test_utils import TestServer
+from typenv import Env
+
+from carte import app_keys
+from carte.app import create_app
+from carte.games import BaseGame
+from carte.matchmaking import Matchmaker
+
+CAPACITIES = {k: v.number_of_players for k, v in BaseGame.GAMES.items()}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_find_table() -> None:
+    clock = Clock()
+    matchmaker = Matchmaker(CAPACITIES, clock=clock)
+
+    first = matchmaker.find_table("briscola", "a")
+    # the same player waits at the same table
+    assert matchmaker.find_table("briscola", "a") == first
+    assert matchmaker.find_table("scopa", "a") != first
+    clock.now = 2
+    assert matchmaker.find_table("briscola", "b") == first
+    # the table is complete, the next players wait at a new one
+    second = matchmaker.find_table("briscola", "c")
+    assert second != first
+
+    matchmaker.seated("briscola", first, "a")
+    assert matchmaker.metrics.matched == 0
+    clock.now = 5
+    matchmaker.seated("briscola", first, "b")
+    metrics = matchmaker.metrics
+    assert metrics.matched == 1
+    assert metrics.waiting == 2
+    assert metrics.tables == 2
+    assert metrics.wait_max == 5
+    assert metrics.wait_p50 == 4
+
+    # the player can leave, and join another table
+    matchmaker.left("briscola", second, "c")
+    assert matchmaker.find_table("briscola", "d") == second
+    # a private table isn't offered
+    matchmaker.seated("briscola", "private", "e")
+    assert matchmaker.metrics.tables == 2
+
+
+def test_left() -> None:
+    clock = Clock()
+    matchmaker = Matchmaker(CAPACITIES, timeout=10, clock=clock)
+
+    first = matchmaker.find_table("briscola", "a")
+    matchmaker.find_table("briscola", "b")
+    second = matchmaker.find_table("briscola", "c")
+    matchmaker.seated("briscola", first, "a")
+    matchmaker.seated("briscola", second, "c")
+
+    # the oldest table is filled first
+    matchmaker.left("briscola", first, "b")
+    assert matchmaker.find_table("briscola", "d") == first
+    matchmaker.seated("briscola", first, "d")
+    assert matchmaker.metrics.matched == 1
+
+    # a player that follows a link takes a free seat too
+    matchmaker.seated("briscola", second, "e")
+    assert matchmaker.metrics.matched == 2
+    assert matchmaker.metrics.waiting == 0
+
+
+def test_expire() -> None:
+    clock = Clock()
+    matchmaker = Matchmaker(CAPACITIES, timeout=10, clock=clock)
+
+    game_id = matchmaker.find_table("briscola", "a")
+    matchmaker.find_table("briscola", "b")
+    matchmaker.seated("briscola", game_id, "a")
+
+    # the second player never connected
+    clock.now = 11
+    matchmaker.expire()
+    assert matchmaker.metrics.timed_out == 1
+    assert matchmaker.find_table("briscola", "c") == game_id
+
+    # the players left, but one of them could come back
+    matchmaker.left("briscola", game_id, "a")
+    matchmaker.left("briscola", game_id, "c")
+    clock.now = 15
+    matchmaker.expire()
+    assert matchmaker.metrics.abandoned == 0
+    matchmaker.seated("briscola", game_id, "a")
+    matchmaker.left("briscola", game_id, "a")
+
+    clock.now = 30
+    matchmaker.expire()
+    metrics = matchmaker.metrics
+    assert metrics.abandoned == 1
+    assert metrics.tables == 0
+    assert metrics.waiting == 0
+    assert matchmaker.find_table("briscola", "d") != game_id
+
+
+def test_many_players() -> None:
+    matchmaker = Matchmaker(CAPACITIES)
+    game_ids = [matchmaker.find_table("briscola", str(i)) for i in range(10_000)]
+    assert len(set(game_ids)) == 5_000
+    for i, game_id in enumerate(game_ids):
+        matchmaker.seated("briscola", game_id, str(i))
+    assert matchmaker.metrics.matched == 5_000
+    assert matchmaker.metrics.tables == 0
+
+
+async def test_concurrent_players(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setenv("DATA_PATH", str(tmp_path))
+    monkeypatch.setenv("BOT_WORKERS", "1")
+    app = create_app(Env())
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    sessions = [
+        aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+        for _ in range(8)
+    ]
+    try:
+        url = server.make_url("/ws/briscola")
+        websockets = await asyncio.gather(*(s.ws_connect(url) for s in sessions))
+        games = list(app[app_keys.games].values())
+        assert len(games) == 4
+        assert all(len(game.player_names) == 2 for game in games)
+
+        async with sessions[0].get(server.make_url("/status/matchmaking.json")) as r:
+            assert (await r.json())["matched"] == 4
+
+        for ws in websockets:
+            await ws.close()
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+        await server.close()
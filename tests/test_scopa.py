@@ -1,9 +1,18 @@
+import itertools
+import pickle
+import random
+
 import pytest
 
 from carte.games import Scopa
-from carte.games.scopa import ScopaPlayingStatus
-from carte.types import GameStatus
-from tests.conftest import Game
+from carte.games.scopa import (
+    CARD_VALUES,
+    ScopaPlayer,
+    ScopaPlayingStatus,
+    takeable_cards,
+)
+from carte.types import CARDS, Card, GameStatus
+from tests.conftest import Game, start_game
 
 
 @pytest.mark.parametrize(
@@ -19,30 +28,30 @@ from tests.conftest import Game
     [
         (
             843,
-            [25, 15],
+            [22, 18],
             [6, 4],
-            [84, 66, "bastoni", 7, 1, "coppe", 7, 6, "denari", 7, 4, "spade", 7, 6],
-            [1, 0],
+            [73, 81, "bastoni", 1, 7, "coppe", 7, 6, "denari", 6, 7, "spade", 6, 7],
+            [0, 1],
             [0, 0],
-            [4, 0],
+            [2, 2],
         ),
         (
             176,
-            [14, 26],
-            [3, 7],
-            [78, 76, "bastoni", 7, 1, "coppe", 6, 7, "denari", 7, 6, "spade", 6, 7],
+            [21, 19],
+            [4, 6],
+            [81, 71, "bastoni", 7, 1, "coppe", 6, 7, "denari", 7, 6, "spade", 7, 1],
             [1, 0],
-            [0, 1],
-            [2, 3],
+            [1, 0],
+            [4, 1],
         ),
         (
             150,
-            [21, 19],
-            [7, 3],
-            [78, 78, "bastoni", 7, 6, "coppe", 7, 6, "denari", 6, 7, "spade", 6, 7],
-            [0, 1],
-            [2, 1],
-            [4, 2],
+            [24, 16],
+            [5, 5],
+            [84, 63, "bastoni", 7, 1, "coppe", 7, 5, "denari", 7, 6, "spade", 7, 4],
+            [1, 0],
+            [0, 0],
+            [3, 0],
         ),
     ],
 )
@@ -58,7 +67,7 @@ async def test_full_game(
 ) -> None:
     game, websockets = scopa
 
-    await game._prepare_start()
+    await start_game(game)
 
     while game._game_status is GameStatus.STARTED:
         player_id = game._current_player_id
@@ -101,3 +110,62 @@ async def test_full_game(
         int(x) for x in websockets[0]._get_message("results_detail|scopa")[2:]
     ]
     assert results == [int(x) for x in websockets[0]._get_message("results")[1:]]
+
+
+def _brute_force_takeable(
+    card: Card, table: list[Card], selected: list[Card]
+) -> list[Card]:
+    if not selected and (equal := [c for c in table if c.number == card.number]):
+        return equal
+
+    target = CARD_VALUES[card.number] - sum(CARD_VALUES[c.number] for c in selected)
+    others = [c for c in table if c not in selected]
+    valid_values = {
+        CARD_VALUES[c.number]
+        for n in range(1, len(others) + 1)
+        for subset in itertools.combinations(others, n)
+        if sum(CARD_VALUES[c.number] for c in subset) == target
+        for c in subset
+    }
+    return [c for c in table if CARD_VALUES[c.number] in valid_values]
+
+
+def test_takeable_cards() -> None:
+    rng = random.Random(42)
+    for _ in range(2000):
+        card, *table = rng.sample(CARDS, rng.randint(2, 11))
+        selected = rng.sample(table, rng.randint(0, min(2, len(table))))
+        if sum(CARD_VALUES[c.number] for c in selected) > CARD_VALUES[card.number]:
+            selected = []
+        assert takeable_cards(card, table, selected) == _brute_force_takeable(
+            card, table, selected
+        )
+
+
+@pytest.mark.parametrize("seed", [843])
+async def test_tallies(scopa: Game[Scopa], seed: int) -> None:
+    game, websockets = scopa
+    await start_game(game)
+
+    while game._game_status is GameStatus.STARTED:
+        player = game.current_player
+        ws = websockets[game._current_player_id]
+        if game._playing_status is ScopaPlayingStatus.HAND:
+            await game.handle_cmd(ws, player, "play", str(player.hand[0]))
+        else:
+            await game.handle_cmd(
+                ws, player, "take_choice", str(game._takeable_cards[0])
+            )
+
+        for p in game._players:
+            state = pickle.loads(pickle.dumps(p)).__dict__
+            for attr in ("denari", "settebello", "primiera"):
+                del state[attr]
+            recounted = ScopaPlayer.__new__(ScopaPlayer)
+            recounted.__setstate__(state)
+            assert p.denari == recounted.denari
+            assert p.settebello == recounted.settebello
+            assert p.primiera == recounted.primiera
+
+    assert sum(p.denari for p in game._players) == 10
+    assert sum(p.settebello for p in game._players) == 1
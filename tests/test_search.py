@@ -0,0 +1,118 @@
+import random
+from typing import Any
+
+import pytest
+
+from carte import codec
+from carte.games import BaseGame, Briscola, Scopa
+from carte.games.briscola import BriscolaState
+from carte.games.scopa import ScopaPlayingStatus, ScopaState
+from carte.games.search import Budget, Difficulty, card_ids, card_mask, search
+from carte.types import CARDS, GameStatus, SavedGame
+from tests.conftest import Game, make_game
+
+
+def test_card_masks() -> None:
+    rng = random.Random(42)
+    for size in range(len(CARDS) + 1):
+        ids = sorted(rng.sample(range(len(CARDS)), size))
+        assert card_ids(card_mask(ids)) == ids
+
+
+@pytest.mark.parametrize("game_type", [Briscola, Scopa])
+@pytest.mark.parametrize("seed", [123, 321, 111])
+def test_states(game_type: type[Briscola | Scopa], seed: int) -> None:
+    game, _ = make_game(game_type, seed)
+    game.start()
+    rng = random.Random(seed)
+    state = game.search_state()
+
+    events = []
+    while game.game_status is GameStatus.STARTED:
+        move = rng.choice(state.moves())
+        for raw_cmd, *raw_args in game._move_commands(move):
+            events = game.apply(game._current_player_id, raw_cmd, *raw_args)
+        state.play(move)
+        if game.game_status is GameStatus.STARTED:
+            assert game.search_state() == state
+
+    # the states follow the same rules as the games
+    assert state.is_over()
+    assert events[-1].args == ("results", *state.points())
+
+
+@pytest.mark.parametrize("game_type", [Briscola, Scopa])
+@pytest.mark.parametrize("seed", [123, 321])
+def test_determinize(game_type: type[Briscola | Scopa], seed: int) -> None:
+    game, _ = make_game(game_type, seed)
+    game.start()
+    state = game.search_state()
+    assert isinstance(state, BriscolaState | ScopaState)
+    player_id = state.player_id
+
+    determinized = state.determinize(player_id, random.Random(seed))
+    assert determinized.hands[player_id] == state.hands[player_id]
+    assert determinized.moves() == state.moves()
+    # the hidden cards are shuffled, not replaced
+    hidden = sorted(state.deck + card_ids(state.hands[1 - player_id]))
+    assert sorted(determinized.deck + card_ids(determinized.hands[1 - player_id])) == (
+        hidden
+    )
+    assert determinized.hands[1 - player_id].bit_count() == (
+        state.hands[1 - player_id].bit_count()
+    )
+
+
+@pytest.mark.parametrize("seed", [843])
+def test_capture_state(scopa: Game[Scopa], seed: int) -> None:
+    game, _ = scopa
+    game.start()
+    while game._playing_status is not ScopaPlayingStatus.CAPTURE:
+        card = game.current_player.hand[0]
+        game.apply(game._current_player_id, "play", str(card))
+
+    # only the captures of the active card are left
+    state = game.search_state()
+    moves = state.moves()
+    assert moves
+    for move in moves:
+        card_id, captured = ScopaState.decode_move(move)
+        assert card_id == game._active_card.id
+        assert captured
+
+    move = search(state, Budget(playouts=50), seed)
+    assert move in moves
+    for raw_cmd, *raw_args in game._move_commands(move):
+        assert raw_cmd == "take_choice"
+        game.apply(game._current_player_id, raw_cmd, *raw_args)
+    assert game.search_state().active == -1
+
+
+@pytest.mark.parametrize("game_type", [Briscola, Scopa])
+def test_search(game_type: type[Briscola | Scopa]) -> None:
+    game, _ = make_game(game_type, 1)
+    game.start()
+    state = game.search_state()
+
+    move = search(state, Budget(playouts=100), 1)
+    assert move in state.moves()
+    # the search doesn't touch the state
+    assert game.search_state() == state
+    # the same seed and playouts give the same move
+    assert search(state, Budget(playouts=100), 1) == move
+
+    with pytest.raises(ValueError, match="needs a number of playouts"):
+        Budget()
+
+
+def test_bots_codec() -> None:
+    game = Scopa("", 1)
+    game.add_player("player")
+    bot = game.add_bot(Difficulty.HARD)
+    assert bot is not None
+    assert game.add_bot(Difficulty.EASY) is None
+
+    saved_game: BaseGame[Any] = game
+    restored_game = codec.loads(codec.dumps(SavedGame(saved_game))).game
+    assert isinstance(restored_game, Scopa)
+    assert restored_game._bots == {bot: Difficulty.HARD}
@@ -0,0 +1,70 @@
+import asyncio
+
+import aiohttp
+
+from carte.send_queue import SendQueue, SlowConsumerPolicy
+from tests.conftest import DummyWebsocketResponse
+
+
+async def no_resync() -> None:
+    pass
+
+
+async def test_send() -> None:
+    ws = DummyWebsocketResponse()
+    send_queue = SendQueue(
+        ws, maxsize=10, policy=SlowConsumerPolicy.RESYNC, resync=no_resync
+    )
+    writer = asyncio.create_task(send_queue.run())
+
+    for i in range(5):
+        send_queue.put(f"msg|{i}".encode())
+    await asyncio.sleep(0)
+
+    assert ws._messages == [f"msg|{i}" for i in range(5)]
+    assert send_queue.metrics.sent_frames == 5
+    assert send_queue.metrics.max_depth == 5
+    assert send_queue.metrics.depth == 0
+
+    send_queue.stop()
+    await writer
+
+
+async def test_resync() -> None:
+    ws = DummyWebsocketResponse()
+
+    async def resync() -> None:
+        send_queue.put(b"state")
+
+    send_queue = SendQueue(
+        ws, maxsize=3, policy=SlowConsumerPolicy.RESYNC, resync=resync
+    )
+    writer = asyncio.create_task(send_queue.run())
+
+    # the writer doesn't get to run before the queue overflows
+    for i in range(5):
+        send_queue.put(f"msg|{i}".encode())
+    await asyncio.sleep(0)
+
+    assert ws._messages == ["state"]
+    assert send_queue.metrics.overflows == 1
+    assert send_queue.metrics.dropped_frames == 5
+
+    send_queue.stop()
+    await writer
+
+
+async def test_close() -> None:
+    ws = DummyWebsocketResponse()
+    send_queue = SendQueue(
+        ws, maxsize=3, policy=SlowConsumerPolicy.CLOSE, resync=no_resync
+    )
+    writer = asyncio.create_task(send_queue.run())
+
+    for i in range(5):
+        send_queue.put(f"msg|{i}".encode())
+    await writer
+
+    assert ws._messages == []
+    assert ws.closed
+    assert ws._close_code == aiohttp.WSCloseCode.POLICY_VIOLATION
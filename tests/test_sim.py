@@ -0,0 +1,89 @@
+from typing import Any
+
+import numpy as np
+import pytest
+
+from carte.games import BaseGame, Briscola, Scopa
+from carte.games.scopa import ScopaPlayingStatus
+from carte.sim import POLICIES, random_decks, simulate_briscola, simulate_scopa
+from carte.types import Event, GameStatus
+from tests.conftest import Game
+
+
+def play_lowest(game: BaseGame[Any]) -> tuple[list[int], list[Event]]:
+    """Play a whole game, always choosing the card with the lowest id.
+
+    Return the deck the game was started with and the events emitted by the last
+    command, which include the results.
+    """
+    # the deck is derived from the seed, the game is started with the same one
+    deck = [card.id for card in game._shuffle_deck()]
+    game._prepare_start()
+
+    events = []
+    while game.game_status is GameStatus.STARTED:
+        player_id = game._current_player_id
+        if (
+            isinstance(game, Scopa)
+            and game._playing_status is ScopaPlayingStatus.CAPTURE
+        ):
+            takeable = set(game._takeable_cards) - set(game._selected_cards)
+            card = min(takeable, key=lambda c: c.id)
+            events = game.apply(player_id, "take_choice", str(card))
+        else:
+            card = min(game.current_player.hand, key=lambda c: c.id)
+            events = game.apply(player_id, "play", str(card))
+    return deck, events
+
+
+@pytest.mark.parametrize("seed", [123, 321, 111])
+async def test_briscola(briscola: Game[Briscola], seed: int) -> None:
+    game, _ = briscola
+    starting_player_id = game._starting_player_id
+    deck, events = play_lowest(game)
+
+    results = simulate_briscola(
+        np.array([deck], dtype=np.int8),
+        np.array([starting_player_id]),
+        POLICIES["lowest"],
+        np.random.default_rng(),
+    )
+    assert events[-1] == Event(("results", *results.points[0].tolist()))
+
+
+@pytest.mark.parametrize("seed", [843, 176, 150, 1, 2, 3])
+async def test_scopa(scopa: Game[Scopa], seed: int) -> None:
+    game, _ = scopa
+    starting_player_id = game._starting_player_id
+    deck, events = play_lowest(game)
+
+    results = simulate_scopa(
+        np.array([deck], dtype=np.int8),
+        np.array([starting_player_id]),
+        POLICIES["lowest"],
+        np.random.default_rng(),
+    )
+    details = {e.args[1]: e.args[2:4] for e in events if e.args[0] == "results_detail"}
+    assert details["cards"] == tuple(results.cards[0].tolist())
+    assert details["denari"] == tuple(results.denari[0].tolist())
+    assert details["primiera"] == tuple(results.primiera[0].tolist())
+    assert details["settebello"] == tuple(results.settebello[0].astype(int).tolist())
+    assert details["scopa"] == tuple(results.scope[0].tolist())
+    assert events[-1] == Event(("results", *results.points[0].tolist()))
+
+
+def test_random_policy() -> None:
+    rng = np.random.default_rng(42)
+    games = 1000
+    decks = random_decks(rng, games)
+    assert (np.sort(decks, axis=1) == np.arange(40)).all()
+    starting_player_ids = rng.integers(2, size=games)
+
+    briscola = simulate_briscola(decks, starting_player_ids, POLICIES["random"], rng)
+    assert (briscola.points.sum(axis=1) == 120).all()
+
+    scopa = simulate_scopa(decks, starting_player_ids, POLICIES["random"], rng)
+    assert (scopa.cards.sum(axis=1) == 40).all()
+    assert (scopa.denari.sum(axis=1) == 10).all()
+    assert (scopa.settebello.sum(axis=1) == 1).all()
+    assert (scopa.points.sum(axis=1) >= 1).all()
@@ -0,0 +1,139 @@
+import pickle
+import sqlite3
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from carte.games import BaseGame, Briscola, Scopa
+from carte.store import SqliteGameStore, _create_tables
+from carte.types import GameStatus, JournalEntry, SavedGame
+from tests.conftest import Game, start_game
+
+
+async def test_save_load(tmp_path: Path, briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    await start_game(game)
+
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        assert await store.load("briscola", "abc") is None
+
+        await store.save("briscola", "abc", SavedGame(game))
+        saved_game = await store.load("briscola", "abc")
+        assert saved_game is not None
+        assert saved_game.game._deck == game._deck
+        assert [x.hand for x in saved_game.game._players] == [
+            x.hand for x in game._players
+        ]
+        assert [
+            (info.game_type, info.game_id) for info in await store.index(limit=10)
+        ] == [("briscola", "abc")]
+
+        await store.delete("briscola", "abc")
+        assert await store.load("briscola", "abc") is None
+    finally:
+        await store.close()
+
+
+async def test_expire(tmp_path: Path, briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    await start_game(game)
+
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        expired_game = SavedGame(game)
+        expired_game.last_saved = datetime.now(UTC) - timedelta(days=8)
+        await store.save("briscola", "old", expired_game)
+        await store.save("briscola", "new", SavedGame(game))
+
+        before = datetime.now(UTC) - SavedGame.lifetime
+        assert await store.expire(before, limit=10) == 1
+        assert await store.expire(before, limit=10) == 0
+
+        assert await store.load("briscola", "old") is None
+        assert await store.load("briscola", "new") is not None
+    finally:
+        await store.close()
+
+
+async def test_expire_unsaved_journal(tmp_path: Path, briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    await start_game(game)
+
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        await store.save("briscola", "saved", SavedGame(game))
+        entry = JournalEntry(0, "name", ("A",))
+        await store.append("briscola", "saved", entry)
+        # the players of a table abandoned before it started renamed themselves
+        await store.append("briscola", "abandoned", JournalEntry(0, "name", ("A",)))
+        await store.append("briscola", "abandoned", JournalEntry(1, "name", ("B",)))
+
+        before = datetime.now(UTC) - SavedGame.lifetime
+        assert await store.expire(before, limit=10) == 0
+        assert await store.load_journal("briscola", "abandoned") == []
+        assert await store.load_journal("briscola", "saved") == [entry]
+    finally:
+        await store.close()
+
+
+async def test_migrate_expiry_index(tmp_path: Path, briscola: Game[Briscola]) -> None:
+    game, _ = briscola
+    await start_game(game)
+
+    expired_game = SavedGame(game)
+    expired_game.last_saved = datetime.now(UTC) - timedelta(days=8)
+    with sqlite3.connect(tmp_path / "games.sqlite3") as conn:
+        _create_tables(conn)
+        conn.execute("PRAGMA user_version = 1")
+        conn.executemany(
+            "INSERT INTO games (game_type, game_id, data) VALUES (?, ?, ?)",
+            [
+                ("briscola", "old", pickle.dumps(expired_game)),
+                ("briscola", "new", pickle.dumps(SavedGame(game))),
+                ("briscola", "broken", b"broken"),
+            ],
+        )
+    conn.close()
+
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        before = datetime.now(UTC) - SavedGame.lifetime
+        assert await store.expire(before, limit=10) == 2
+        assert [
+            (info.game_id, info.players) for info in await store.index(limit=10)
+        ] == [("new", ("Player 0", "Player 1"))]
+    finally:
+        await store.close()
+
+
+async def test_index(
+    tmp_path: Path, briscola: Game[Briscola], scopa: Game[Scopa]
+) -> None:
+    briscola_game, _ = briscola
+    scopa_game, _ = scopa
+    await start_game(briscola_game)
+    await start_game(scopa_game)
+
+    store = SqliteGameStore(tmp_path / "games.sqlite3")
+    try:
+        for i in range(5):
+            game: BaseGame[Any] = briscola_game if i % 2 else scopa_game
+            saved_game = SavedGame(game)
+            saved_game.last_saved -= timedelta(minutes=i)
+            await store.save("briscola" if i % 2 else "scopa", str(i), saved_game)
+
+        first_page = await store.index(limit=3)
+        assert [info.game_id for info in first_page] == ["0", "1", "2"]
+        last = first_page[-1]
+        second_page = await store.index(
+            after=(last.last_saved, last.game_type, last.game_id), limit=3
+        )
+        assert [info.game_id for info in second_page] == ["3", "4"]
+
+        assert [
+            info.game_id for info in await store.index(game_type="briscola", limit=10)
+        ] == ["1", "3"]
+        assert await store.index(status=GameStatus.ENDED, limit=10) == []
+    finally:
+        await store.close()
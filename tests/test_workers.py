@@ -0,0 +1,128 @@
+import asyncio
+import socket
+from collections import Counter
+from pathlib import Path
+
+import aiohttp
+import pytest
+from typenv import Env
+
+from carte import app_keys
+from carte.app import create_app
+from carte.games import BaseGame, Briscola
+from carte.matchmaking import Matchmaker
+from carte.workers import Assignment, Front, Worker, owner
+
+CAPACITIES = {k: v.number_of_players for k, v in BaseGame.GAMES.items()}
+
+
+def test_owner() -> None:
+    assert owner("abc", 4) == owner("abc", 4)
+    counts = Counter(owner(f"game-{i}", 4) for i in range(1000))
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert min(counts.values()) > 200
+
+
+def test_route() -> None:
+    front = Front([socket.socket() for _ in range(4)], Matchmaker(CAPACITIES))
+
+    def route(target: str, session_id: str = "") -> tuple[int, Assignment | None]:
+        cookie = (
+            f"Cookie: theme=dark; session_id={session_id}\r\n" if session_id else ""
+        )
+        head = f"GET {target} HTTP/1.1\r\nHost: x\r\n{cookie}\r\n"
+        return front.route(head.encode())
+
+    assert route("/ws/briscola/abc?multiline=1") == (owner("abc", 4), None)
+
+    # the players looking for a table are seated at the same one
+    worker, assignment = route("/ws/briscola?viewer=1", "a")
+    assert assignment is not None
+    assert assignment.session_id == "a"
+    assert worker == owner(assignment.game_id, 4)
+    assert route("/ws/briscola", "b") == (worker, Assignment(assignment.game_id, "b"))
+    assert route("/ws/briscola", "a") == (worker, assignment)
+    third = route("/ws/briscola", "c")[1]
+    assert third is not None
+    assert third.game_id != assignment.game_id
+    # the players without a session get a new one
+    new = route("/ws/scopa")[1]
+    assert new is not None
+    assert new.session_id
+    assert new.game_id != third.game_id
+    # tables against the bots don't wait
+    bot = route("/ws/briscola?bot=easy", "d")[1]
+    assert bot is not None
+    assert bot.game_id not in {assignment.game_id, third.game_id}
+
+    # any other request goes to any worker
+    assert {route("/")[0] for _ in range(4)} == {0, 1, 2, 3}
+    assert route("/ws/unknown")[1] is None
+    assert front.route(b"garbage\r\n\r\n")[1] is None
+
+
+async def test_workers(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("DATA_PATH", str(tmp_path))
+    monkeypatch.setenv("BOT_WORKERS", "1")
+
+    channels = [socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET) for _ in "ab"]
+    for pair in channels:
+        for channel in pair:
+            channel.setblocking(False)
+    workers = [Worker(i, 2, channel) for i, (_, channel) in enumerate(channels)]
+    apps = [create_app(Env(), worker=worker) for worker in workers]
+    front = Front([channel for channel, _ in channels], Matchmaker(CAPACITIES))
+    listener = socket.create_server(("127.0.0.1", 0))
+    listener.setblocking(False)
+    base_url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+    tasks = [
+        asyncio.create_task(front.serve(listener)),
+        *(
+            asyncio.create_task(worker.serve(app))
+            for worker, app in zip(workers, apps, strict=True)
+        ),
+    ]
+    sessions = [
+        aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) for _ in "ab"
+    ]
+    try:
+        async with sessions[0].get(base_url) as response:
+            assert response.status == 200
+
+        websockets = [await s.ws_connect(f"{base_url}/ws/briscola") for s in sessions]
+        games = [game for app in apps for game in app[app_keys.games].values()]
+        assert len(games) == 1
+        game = games[0]
+        assert isinstance(game, Briscola)
+        assert len(game.player_names) == 2
+        assert apps[owner(game.game_id, 2)][app_keys.games]
+
+        # the workers tell the front when the players sit down
+        for _ in range(100):
+            if front.matchmaker.metrics.matched:
+                break
+            await asyncio.sleep(0.01)
+        assert front.matchmaker.metrics.matched == 1
+        assert front.matchmaker.metrics.waiting == 0
+        async with sessions[0].get(f"{base_url}/status/matchmaking.json") as response:
+            assert (await response.json())["matched"] == 1
+
+        # reconnecting reaches the same game, on the same worker
+        await websockets[0].close()
+        websockets[0] = await sessions[0].ws_connect(
+            f"{base_url}/ws/briscola/{game.game_id}"
+        )
+        assert len(game.websockets) == 2
+
+        for ws in websockets:
+            await ws.close()
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        listener.close()
+        for pair in channels:
+            for channel in pair:
+                channel.close()